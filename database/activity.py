@@ -0,0 +1,91 @@
+from .backup import reporting_connection
+from .core import now_epoch
+
+SECONDS_PER_DAY = 86400
+PUNISHMENT_METRICS = ('warn', 'mute', 'ban', 'voice_mute', 'blacklist', 'kick')
+REVOKE_METRIC = 'revoke'
+TICKET_CLOSED_METRIC = 'ticket_closed'
+LEADERBOARD_LIMIT = 10
+
+# Buckets are UTC days and Monday-based weeks counted from the epoch (1970-01-01 was a Thursday).
+ACTIVITY_BUCKET_SQL = {
+    'day': '({t}) / 86400',
+    'week': '(({t}) / 86400 + 3) / 7',
+}
+
+# Adds one to {metric} for {moderator} in the day and week containing {t}; used by the triggers.
+ACTIVITY_INCREMENT = f"""INSERT INTO moderator_activity (period, bucket, moderator_id, metric, count)
+    VALUES {', '.join(f"('{period}', {bucket}, {{moderator}}, {{metric}}, 1)"
+                      for period, bucket in ACTIVITY_BUCKET_SQL.items())}
+    ON CONFLICT DO UPDATE SET count = count + 1"""
+
+ACTIVITY_TOTALS = f"""SUM(CASE WHEN a.metric IN ({', '.join(f"'{m}'" for m in PUNISHMENT_METRICS)})
+                               THEN a.count ELSE 0 END) AS punishments,
+       SUM(CASE WHEN a.metric = '{REVOKE_METRIC}' THEN a.count ELSE 0 END) AS revocations,
+       SUM(CASE WHEN a.metric = '{TICKET_CLOSED_METRIC}' THEN a.count ELSE 0 END) AS tickets_closed"""
+
+LEADERBOARD_QUERY = f"""SELECT a.moderator_id, u.discord_id, u.mindustry_id, {ACTIVITY_TOTALS}
+    FROM ({{ranges}}) AS a
+    JOIN users u ON u.id = a.moderator_id
+    GROUP BY a.moderator_id
+    ORDER BY punishments + revocations + tickets_closed DESC
+    LIMIT ?"""
+
+MODERATOR_METRICS_QUERY = """SELECT a.metric, SUM(a.count) AS count
+    FROM ({ranges}) AS a
+    GROUP BY a.metric"""
+
+
+def _day(timestamp):
+    return timestamp // SECONDS_PER_DAY
+
+
+def _week_first_day(week):
+    return week * 7 - 3
+
+
+def _bucket_ranges(first_day, last_day):
+    # Whole weeks come from the weekly rollup and only the partial weeks at either end
+    # from the daily one, so any range reads at most 12 daily buckets per moderator.
+    first_week = -(-(first_day + 3) // 7)
+    last_week = (last_day + 4) // 7 - 1
+    if first_week > last_week:
+        return [('day', first_day, last_day)]
+    ranges = [('week', first_week, last_week)]
+    if first_day < _week_first_day(first_week):
+        ranges.append(('day', first_day, _week_first_day(first_week) - 1))
+    if last_day >= _week_first_day(last_week + 1):
+        ranges.append(('day', _week_first_day(last_week + 1), last_day))
+    return ranges
+
+
+def _ranges_sql(days, moderator_filter=False):
+    last_day = _day(now_epoch())
+    ranges = _bucket_ranges(last_day - days + 1, last_day)
+    moderator = ' AND moderator_id = ?' if moderator_filter else ''
+    sql = ' UNION ALL '.join(
+        f"SELECT moderator_id, metric, count FROM moderator_activity "
+        f"WHERE period = ? AND bucket BETWEEN ? AND ?{moderator}" for _ in ranges)
+    return sql, ranges
+
+
+def get_moderator_leaderboard(days=7, limit=LEADERBOARD_LIMIT):
+    ranges_sql, ranges = _ranges_sql(days)
+    params = [value for bucket_range in ranges for value in bucket_range]
+    with reporting_connection() as conn:
+        rows = conn.execute(LEADERBOARD_QUERY.format(ranges=ranges_sql), params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+
+def get_moderator_activity(moderator_internal_id, days=7):
+    ranges_sql, ranges = _ranges_sql(days, moderator_filter=True)
+    params = [value for bucket_range in ranges for value in (*bucket_range, moderator_internal_id)]
+    with reporting_connection() as conn:
+        rows = conn.execute(MODERATOR_METRICS_QUERY.format(ranges=ranges_sql), params)
+        metrics = {row['metric']: row['count'] for row in rows}
+    return {
+        'punishments': sum(metrics.get(metric, 0) for metric in PUNISHMENT_METRICS),
+        'revocations': metrics.get(REVOKE_METRIC, 0),
+        'tickets_closed': metrics.get(TICKET_CLOSED_METRIC, 0),
+        'by_metric': metrics,
+    }
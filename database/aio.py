@@ -0,0 +1,154 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from . import core, punishments, tickets, roles, search, transcripts, nicknames, backup, archive, activity
+from .write_queue import WriteQueue
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database")
+
+
+async def run_in_db_thread(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def _awaitable(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_in_db_thread(func, *args, **kwargs)
+    return wrapper
+
+
+write_queue = WriteQueue(run_in_db_thread)
+
+
+def _queued(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await write_queue.submit(func, *args, **kwargs)
+    return wrapper
+
+
+def _reporting(func):
+    # Reports mostly read a snapshot through their own connection, so they run beside the
+    # database thread; the live fallback is still serialized by the connection lock.
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return wrapper
+
+
+async def run_backup():
+    # Backups read through their own connection, so they must not occupy the database thread.
+    path = await asyncio.to_thread(backup.run_backup)
+    if os.path.exists(archive.archive_path()):
+        await asyncio.to_thread(backup.run_backup, source_path=archive.archive_path(), prefix='archive-')
+    return path
+
+
+async def archive_old_actions(older_than_days=archive.ARCHIVE_AFTER_DAYS, batch_size=archive.ARCHIVE_BATCH_SIZE):
+    # One batch per trip to the database thread, so bot queries interleave with the move.
+    cutoff = core.now_epoch() - older_than_days * 86400
+    total = 0
+    while True:
+        moved = await run_in_db_thread(archive.archive_batch, cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+
+
+def shutdown():
+    _executor.submit(core.close_db)
+    _executor.shutdown(wait=True)
+
+
+async def create_user(discord_id=None, mindustry_id=None):
+    # Known users are answered from the identity cache without touching the queue.
+    if bool(discord_id) != bool(mindustry_id):
+        platform, platform_id = ('discord', discord_id) if discord_id else ('mindustry', mindustry_id)
+        cached_id = core.get_cached_user_id(platform, platform_id)
+        if cached_id is not None:
+            return cached_id
+    return await write_queue.submit(core.create_user, discord_id, mindustry_id)
+
+
+async def get_user_internal_id(platform, platform_id):
+    cached_id = core.get_cached_user_id(platform, platform_id)
+    if cached_id is not None:
+        return cached_id
+    return await run_in_db_thread(core.get_user_internal_id, platform, platform_id)
+
+
+async def get_ticket_by_channel(channel_id):
+    # Ticket context is looked up on every moderation command, so known tickets skip the database thread.
+    record = tickets.get_cached_ticket(channel_id)
+    if record is not None:
+        return record
+    return await run_in_db_thread(tickets.get_ticket_by_channel, channel_id)
+
+
+async def get_ticket_db_id_by_channel(channel_id):
+    record = await get_ticket_by_channel(channel_id)
+    return record['id'] if record else None
+
+
+async def iter_user_history(user_internal_id, direction='received', action_types=None, is_active=None,
+                            page_size=core.HISTORY_PAGE_SIZE):
+    after = None
+    while True:
+        rows, after = await get_user_history_page(user_internal_id, direction, action_types, is_active, after,
+                                                  page_size)
+        for row in rows:
+            yield row
+        if after is None:
+            return
+
+
+init_db = _awaitable(core.init_db)
+resolve_user_ids = _queued(core.resolve_user_ids)
+get_active_punishment = _awaitable(core.get_active_punishment)
+deactivate_action = _queued(core.deactivate_action)
+count_active_warns = _awaitable(core.count_active_warns)
+get_moderation_state = _awaitable(core.get_moderation_state)
+deactivate_all_warns = _queued(core.deactivate_all_warns)
+revoke_action = _queued(core.revoke_action)
+check_ticket_has_punishment = _awaitable(core.check_ticket_has_punishment)
+get_full_user_data = _reporting(core.get_full_user_data)
+get_user_history_page = _awaitable(core.get_user_history_page)
+get_info_for_all_active_punishments = _awaitable(core.get_info_for_all_active_punishments)
+get_info_for_active_discord_complaints = _awaitable(core.get_info_for_active_discord_complaints)
+get_pending_expirations = _awaitable(core.get_pending_expirations)
+get_action_expiration = _awaitable(core.get_action_expiration)
+get_active_action_ids = _awaitable(core.get_active_action_ids)
+expire_actions = _queued(core.expire_actions)
+
+add_punishment = _queued(punishments.add_punishment)
+apply_punishment_transaction = _queued(punishments.apply_punishment_transaction)
+revoke_punishment = _queued(punishments.revoke_punishment)
+update_punishment_log_id = _queued(punishments.update_punishment_log_id)
+
+log_ticket_open = _queued(tickets.log_ticket_open)
+log_ticket_close = _queued(tickets.log_ticket_close)
+get_punishment_log_id_for_ticket = _awaitable(tickets.get_punishment_log_id_for_ticket)
+
+promotion = _queued(roles.promotion)
+demotion = _queued(roles.demotion)
+set_return_date_to_position = _queued(roles.set_return_date_to_position)
+set_return_date_to_staff = _queued(roles.set_return_date_to_staff)
+
+search_cases = _awaitable(search.search_cases)
+get_ticket_transcript = _awaitable(transcripts.get_ticket_transcript)
+record_ticket_messages = _queued(transcripts.record_ticket_messages)
+delete_ticket_messages = _queued(transcripts.delete_ticket_messages)
+mark_ticket_synced = _queued(transcripts.mark_ticket_synced)
+forget_ticket_channels = _queued(transcripts.forget_ticket_channels)
+prune_ticket_channels = _queued(transcripts.prune_ticket_channels)
+get_ticket_sync_point = _awaitable(transcripts.get_ticket_sync_point)
+get_ticket_message_versions = _queued(transcripts.get_ticket_message_versions)
+# Read through the write queue so messages recorded just before a close are included.
+get_ticket_messages = _queued(transcripts.get_ticket_messages)
+find_mindustry_complaints_by_nickname = _awaitable(nicknames.find_mindustry_complaints_by_nickname)
+get_moderator_leaderboard = _reporting(activity.get_moderator_leaderboard)
+get_moderator_activity = _reporting(activity.get_moderator_activity)
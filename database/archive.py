@@ -0,0 +1,100 @@
+import os
+import time
+
+from . import core
+from .core import logger, db_connection, now_epoch
+
+ARCHIVE_ENABLED = True
+ARCHIVE_FILENAME = 'archive.db'
+ARCHIVE_SCHEMA = 'archive'
+ARCHIVE_AFTER_DAYS = 180
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVE_SCHEMA_VERSION = 8
+
+# Archived rows are copied before they are deleted from the hot table, so after an
+# interrupted run a row can briefly exist in both; the view prefers the hot copy.
+ALL_USER_ACTIONS_VIEW = f"""CREATE TEMP VIEW IF NOT EXISTS all_user_actions AS
+   SELECT * FROM main.user_actions
+   UNION ALL
+   SELECT * FROM {ARCHIVE_SCHEMA}.user_actions AS a
+   WHERE NOT EXISTS (SELECT 1 FROM main.user_actions AS m WHERE m.id = a.id)"""
+
+HOT_ONLY_VIEW = "CREATE TEMP VIEW IF NOT EXISTS all_user_actions AS SELECT * FROM main.user_actions"
+
+
+def archive_path():
+    return os.path.join(os.path.dirname(core.DB_PATH), ARCHIVE_FILENAME)
+
+
+def _sync_archive_schema(conn):
+    hot_columns = [(row['name'], row['type']) for row in conn.execute('PRAGMA main.table_info(user_actions)')]
+    archived = {row['name'] for row in conn.execute(f'PRAGMA {ARCHIVE_SCHEMA}.table_info(user_actions)')}
+    if not archived:
+        columns = ', '.join(f'{name} {column_type}' + (' PRIMARY KEY' if name == 'id' else '')
+                            for name, column_type in hot_columns)
+        conn.execute(f'CREATE TABLE {ARCHIVE_SCHEMA}.user_actions ({columns})')
+    else:
+        for name, column_type in hot_columns:
+            if name not in archived:
+                conn.execute(f'ALTER TABLE {ARCHIVE_SCHEMA}.user_actions ADD COLUMN {name} {column_type}')
+    conn.execute(f'''CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_archive_actions_user_time_id
+                     ON user_actions(user_id, time, id)''')
+    conn.execute(f'''CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_archive_actions_performer_time_id
+                     ON user_actions(performed_by, time, id)''')
+
+
+def attach_archive(conn, create=False):
+    # The archive mirrors the final user_actions layout and relies on the
+    # archive-aware delete triggers, so nothing is attached before migration 8.
+    if conn.execute('PRAGMA main.user_version').fetchone()[0] < ARCHIVE_SCHEMA_VERSION:
+        return False
+
+    attached = {row['name'] for row in conn.execute('PRAGMA database_list')}
+    if ARCHIVE_SCHEMA not in attached:
+        # Opening a connection never creates archive.db; only the archiver does, once it has rows to move.
+        if not ARCHIVE_ENABLED or not (create or os.path.exists(archive_path())):
+            conn.execute(HOT_ONLY_VIEW)
+            return False
+        conn.execute(f'ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}', (archive_path(),))
+        # Replaces the hot-only view this connection may have been given before the archive existed.
+        conn.execute('DROP VIEW IF EXISTS temp.all_user_actions')
+    _sync_archive_schema(conn)
+    conn.execute(ALL_USER_ACTIONS_VIEW)
+    conn.commit()
+    return True
+
+
+def archive_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    with db_connection() as conn:
+        ids = [row['id'] for row in conn.execute(
+            'SELECT id FROM main.user_actions WHERE is_active = 0 AND time < ? ORDER BY id LIMIT ?',
+            (cutoff, batch_size))]
+        if not ids or not attach_archive(conn, create=True):
+            return 0
+        placeholders = ', '.join('?' * len(ids))
+
+        # Commits across attached WAL databases are not atomic together, so the copy
+        # is committed first and the hot rows are only deleted once it is durable.
+        conn.execute(f'''INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}.user_actions
+                         SELECT * FROM main.user_actions WHERE id IN ({placeholders})''', ids)
+        conn.commit()
+        conn.execute(f'''DELETE FROM main.user_actions WHERE id IN ({placeholders})
+                         AND id IN (SELECT id FROM {ARCHIVE_SCHEMA}.user_actions WHERE id IN ({placeholders}))''',
+                     ids + ids)
+        conn.commit()
+    return len(ids)
+
+
+def archive_old_actions(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    cutoff = now_epoch() - older_than_days * 86400
+    started = time.perf_counter()
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            break
+    if total:
+        logger.info(f"Archived {total} inactive actions older than {older_than_days} days "
+                    f"in {time.perf_counter() - started:.2f}s")
+    return total
@@ -0,0 +1,146 @@
+import argparse
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from . import core
+from .archive import ALL_USER_ACTIONS_VIEW, ARCHIVE_SCHEMA, HOT_ONLY_VIEW
+from .core import logger, db_connection
+
+BACKUP_DIRNAME = 'backups'
+BACKUP_RETENTION = 14
+BACKUP_PREFIX = 'database-'
+ARCHIVE_BACKUP_PREFIX = 'archive-'
+# Reports read the newest snapshot while it is younger than this; maintenance takes one every six hours.
+REPORT_SNAPSHOT_MAX_AGE_SECONDS = 7 * 3600
+
+
+def backup_dir_path():
+    return os.path.join(os.path.dirname(core.DB_PATH), BACKUP_DIRNAME)
+
+
+def list_backups(backup_dir=None, prefix=BACKUP_PREFIX):
+    backup_dir = backup_dir or backup_dir_path()
+    if not os.path.isdir(backup_dir):
+        return []
+    names = sorted(name for name in os.listdir(backup_dir)
+                   if name.startswith(prefix) and name.endswith('.db'))
+    return [os.path.join(backup_dir, name) for name in names]
+
+
+def check_integrity(path):
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        result = conn.execute('PRAGMA integrity_check').fetchall()
+    finally:
+        conn.close()
+    return [row[0] for row in result] == ['ok'], [row[0] for row in result]
+
+
+def rotate_backups(backup_dir=None, keep=BACKUP_RETENTION, prefix=BACKUP_PREFIX):
+    removed = []
+    for path in list_backups(backup_dir, prefix)[:-keep] if keep > 0 else []:
+        os.remove(path)
+        removed.append(path)
+        logger.info(f"Removed old backup {path}")
+    return removed
+
+
+def run_backup(backup_dir=None, keep=BACKUP_RETENTION, source_path=None, prefix=BACKUP_PREFIX):
+    backup_dir = backup_dir or backup_dir_path()
+    source_path = source_path or core.DB_PATH
+    os.makedirs(backup_dir, exist_ok=True)
+    target_path = os.path.join(backup_dir, f"{prefix}{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}.db")
+    partial_path = f"{target_path}.partial"
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+
+    # VACUUM INTO copies a single WAL read snapshot, so writes by the bot neither block it nor
+    # restart it the way they restart an online backup from another connection.
+    started = time.perf_counter()
+    source = sqlite3.connect(f'file:{source_path}?mode=ro', uri=True, timeout=core.BUSY_TIMEOUT_MS / 1000)
+    try:
+        source.execute('VACUUM INTO ?', (partial_path,))
+    finally:
+        source.close()
+
+    # Snapshots are standalone files; WAL mode would leave -wal/-shm files beside them.
+    target = sqlite3.connect(partial_path)
+    try:
+        target.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        target.close()
+
+    ok, problems = check_integrity(partial_path)
+    if not ok:
+        os.remove(partial_path)
+        raise RuntimeError(f"Backup failed integrity check: {'; '.join(problems[:5])}")
+
+    os.replace(partial_path, target_path)
+    logger.info(f"Backed up {source_path} to {target_path} in {time.perf_counter() - started:.2f}s")
+    rotate_backups(backup_dir, keep, prefix)
+    return target_path
+
+
+@contextmanager
+def snapshot_connection(path=None):
+    path = path or (list_backups() or [None])[-1]
+    if not path:
+        raise FileNotFoundError("No database snapshot available.")
+
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        # Queries written against the live connection expect all_user_actions, so the archive
+        # snapshot taken alongside is attached the same way archive.attach_archive does it.
+        archive_snapshot = (list_backups(os.path.dirname(path), ARCHIVE_BACKUP_PREFIX) or [None])[-1]
+        if archive_snapshot:
+            conn.execute(f'ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}', (f'file:{archive_snapshot}?mode=ro',))
+            conn.execute(ALL_USER_ACTIONS_VIEW)
+        else:
+            conn.execute(HOT_ONLY_VIEW)
+        conn.execute('PRAGMA query_only = 1')
+        yield conn
+    finally:
+        conn.close()
+
+
+def fresh_snapshot(max_age=REPORT_SNAPSHOT_MAX_AGE_SECONDS):
+    path = (list_backups() or [None])[-1]
+    if path and time.time() - os.path.getmtime(path) <= max_age:
+        return path
+    return None
+
+
+@contextmanager
+def reporting_connection(max_age=REPORT_SNAPSHOT_MAX_AGE_SECONDS):
+    # Heavy reports read a recent snapshot instead of the live database; without one they fall back to it.
+    path = fresh_snapshot(max_age)
+    if path:
+        with snapshot_connection(path) as conn:
+            yield conn
+    else:
+        with db_connection() as conn:
+            yield conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Take an online backup of the moderation database.")
+    parser.add_argument("--db", default=core.DB_PATH, help="Path to the SQLite database.")
+    parser.add_argument("--dir", help="Directory to store snapshots in, by default next to the database.")
+    parser.add_argument("--keep", type=int, default=BACKUP_RETENTION, help="Number of snapshots to retain.")
+    parser.add_argument("--check", metavar="SNAPSHOT", help="Only run an integrity check on an existing snapshot.")
+    args = parser.parse_args()
+
+    if args.check:
+        ok, problems = check_integrity(args.check)
+        print("ok" if ok else "\n".join(problems))
+        raise SystemExit(0 if ok else 1)
+
+    core.DB_PATH = args.db
+    print(run_backup(args.dir, args.keep))
+
+
+if __name__ == "__main__":
+    main()
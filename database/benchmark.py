@@ -0,0 +1,442 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+from collections import namedtuple
+
+from . import core, punishments, tickets, archive
+from .core import logger, db_connection
+from .nicknames import index_nickname, NICKNAME_TICKET_TYPE
+
+BENCHMARK_SEED = 1337
+BENCHMARK_ITERATIONS = 500
+BENCHMARK_CONCURRENCY = 32
+GENERATION_CHUNK_SIZE = 10000
+REGRESSION_THRESHOLD = 0.2
+REGRESSION_MIN_DELTA_MS = 0.05
+
+# users, actions, tickets
+DATASET_SCALES = {
+    '10k': (2000, 10000, 1000),
+    '100k': (20000, 100000, 10000),
+    '1m': (200000, 1000000, 100000),
+    '5m': (1000000, 5000000, 500000),
+}
+
+DISCORD_ID_BASE = 10 ** 17
+CHANNEL_ID_BASE = 10 ** 18
+HISTORY_SPAN_SECONDS = 2 * 365 * 86400
+# Offender ids every twentieth user are Mindustry-only and the next one is linked to both platforms.
+MINDUSTRY_ONLY_EVERY = 20
+
+ACTION_WEIGHTS = {
+    'warn': 50, 'mute': 20, 'kick': 8, 'ban': 7, 'voice_mute': 5, 'blacklist': 2, 'promotion': 4, 'demotion': 4,
+}
+ACTION_DURATIONS = {
+    'warn': (30 * 86400,), 'mute': (3600, 86400, 7 * 86400), 'ban': (86400, 7 * 86400, 30 * 86400),
+    'voice_mute': (3600, 86400), 'blacklist': (30 * 86400, 365 * 86400),
+}
+TICKET_TYPE_WEIGHTS = {
+    'Discord-Complaint': 35, NICKNAME_TICKET_TYPE: 30, 'Discord-Appeal': 12, 'Mindustry-Appeal': 12,
+    'Discord-Staff Application': 6, 'Mindustry-Staff Application': 5,
+}
+REASONS = ('spam in chat', 'griefing the core', 'insulting other players', 'advertising', 'flood',
+           'offensive nickname', 'ban evasion', 'toxic behaviour in voice', 'спам', 'оскорбления')
+NICKNAME_SYLLABLES = ('gr', 'ie', 'fer', 'xx', 'pro', 'mind', 'ust', 'ry', 'kil', 'ler', 'ne', 'ko', '_', '228')
+
+Case = namedtuple('Case', 'name module make_args iterations_scale')
+
+
+def discord_id(user_id):
+    return DISCORD_ID_BASE + user_id
+
+
+def mindustry_id(user_id):
+    return f'{user_id:016x}AAAAAAAA'
+
+
+def has_discord(user_id):
+    return user_id % MINDUSTRY_ONLY_EVERY != 0
+
+
+def has_mindustry(user_id):
+    return user_id % MINDUSTRY_ONLY_EVERY in (0, 1)
+
+
+class Dataset:
+    def __init__(self, users, actions, tickets_count, seed=BENCHMARK_SEED):
+        self.users = users
+        self.actions = actions
+        self.tickets = tickets_count
+        self.seed = seed
+        self.moderators = max(5, users // 100)
+        self.now = core.now_epoch()
+        self.next_channel = CHANNEL_ID_BASE + tickets_count + 1
+
+    # A small share of offenders collects most of the punishments, as in the real history.
+    def offender(self, rng):
+        user_id = self.moderators + 1 + int((self.users - self.moderators) * rng.random() ** 3)
+        return min(user_id, self.users)
+
+    def discord_offender(self, rng):
+        user_id = self.offender(rng)
+        return user_id if has_discord(user_id) else user_id + 1 if user_id < self.users else user_id - 1
+
+    def moderator(self, rng):
+        user_id = 1 + int(self.moderators * rng.random() ** 2)
+        return user_id if has_discord(user_id) else user_id + 1
+
+    def action_id(self, rng):
+        return rng.randint(1, self.actions)
+
+    def ticket_id(self, rng):
+        return rng.randint(1, self.tickets)
+
+    def new_channel(self):
+        self.next_channel += 1
+        return self.next_channel
+
+
+def _weighted(rng, weights):
+    return rng.choices(tuple(weights), weights=tuple(weights.values()))[0]
+
+
+def _nickname(rng):
+    return ''.join(rng.choice(NICKNAME_SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def _user_rows(dataset, rng):
+    for user_id in range(1, dataset.users + 1):
+        yield (user_id, discord_id(user_id) if has_discord(user_id) else None,
+               mindustry_id(user_id) if has_mindustry(user_id) else None,
+               dataset.now - rng.randint(0, HISTORY_SPAN_SECONDS))
+
+
+def _ticket_rows(dataset, rng):
+    for ticket_id in range(1, dataset.tickets + 1):
+        ticket_type = _weighted(rng, TICKET_TYPE_WEIGHTS)
+        created_at = dataset.now - rng.randint(0, HISTORY_SPAN_SECONDS)
+        offender = None
+        if ticket_type == NICKNAME_TICKET_TYPE:
+            offender = _nickname(rng)
+        elif ticket_type == 'Discord-Complaint':
+            offender = str(discord_id(dataset.discord_offender(rng)))
+        closed = rng.random() < 0.95
+        yield (ticket_id, dataset.discord_offender(rng), CHANNEL_ID_BASE + ticket_id,
+               CHANNEL_ID_BASE + ticket_id if closed else None, 'CLOSED' if closed else 'OPEN', created_at,
+               ticket_type, offender, dataset.moderator(rng) if closed else None,
+               created_at + rng.randint(600, 3 * 86400) if closed else None)
+
+
+def _action_rows(dataset, rng):
+    for _ in range(dataset.actions):
+        action_type = _weighted(rng, ACTION_WEIGHTS)
+        # Recent history is denser: ages follow an exponential distribution with a two month mean.
+        action_time = dataset.now - min(int(rng.expovariate(1 / (60 * 86400))), HISTORY_SPAN_SECONDS)
+        durations = ACTION_DURATIONS.get(action_type)
+        duration = rng.choice(durations) if durations else None
+        expires_at = action_time + duration if duration else None
+        is_active = int(expires_at is not None and expires_at > dataset.now)
+        revoked_by = revocation_time = revocation_reason = None
+        if is_active and rng.random() < 0.05:
+            is_active = 0
+            revoked_by = dataset.moderator(rng)
+            revocation_time = rng.randint(action_time, dataset.now)
+            revocation_reason = 'appeal accepted'
+        performer = dataset.moderator(rng)
+        user_id = dataset.moderator(rng) if action_type in ('promotion', 'demotion') else dataset.offender(rng)
+        ticket_id = dataset.ticket_id(rng) if rng.random() < 0.3 else None
+        yield (user_id, action_type, performer, ticket_id, rng.randint(CHANNEL_ID_BASE, 2 * CHANNEL_ID_BASE),
+               rng.choice(REASONS), action_time, duration, expires_at, is_active, revoked_by, revocation_reason,
+               revocation_time)
+
+
+def _insert_chunks(conn, query, rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= GENERATION_CHUNK_SIZE:
+            conn.executemany(query, chunk)
+            conn.commit()
+            chunk = []
+    if chunk:
+        conn.executemany(query, chunk)
+        conn.commit()
+
+
+def generate_dataset(path, dataset):
+    started = time.perf_counter()
+    # Generated under a temporary name so an interrupted run is never reused as a finished dataset.
+    partial_path = path + '.partial'
+    _remove_database(partial_path)
+    core.close_db()
+    core.DB_PATH = partial_path
+    # The dataset directory is shared between datasets, so no archive file is created next to them.
+    archive.ARCHIVE_ENABLED = False
+    core.init_db()
+    rng = random.Random(dataset.seed)
+    with db_connection() as conn:
+        _insert_chunks(conn, 'INSERT INTO users (id, discord_id, mindustry_id, created_at) VALUES (?, ?, ?, ?)',
+                       _user_rows(dataset, rng))
+        _insert_chunks(conn, '''INSERT INTO tickets (id, user_id, channel_id, log_message_id, status, created_at,
+                                                     ticket_type, offender_identifier, closed_by, closed_at)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', _ticket_rows(dataset, rng))
+        for row in conn.execute('SELECT id, offender_identifier FROM tickets WHERE ticket_type = ?',
+                                (NICKNAME_TICKET_TYPE,)).fetchall():
+            index_nickname(conn, row['id'], row['offender_identifier'])
+        conn.commit()
+        _insert_chunks(conn, '''INSERT INTO user_actions (user_id, action_type, performed_by, ticket_id,
+                                                          log_message_id, reason, time, duration_seconds, expires_at,
+                                                          is_active, revoked_by, revocation_reason, revocation_time)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', _action_rows(dataset, rng))
+        conn.execute('ANALYZE')
+        conn.commit()
+    core.close_db()
+    archive.ARCHIVE_ENABLED = True
+    os.replace(partial_path, path)
+    logger.warning(f"Generated {dataset.users} users, {dataset.tickets} tickets and {dataset.actions} actions "
+                   f"in {time.perf_counter() - started:.1f}s")
+
+
+def _remove_database(path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _copy_database(source, target):
+    _remove_database(target)
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+
+
+def _punishment_args(dataset, rng, action_type=None):
+    action_type = action_type or _weighted(rng, {'warn': 6, 'mute': 2, 'ban': 1, 'voice_mute': 1})
+    return ('discord', discord_id(dataset.discord_offender(rng)), discord_id(dataset.moderator(rng)),
+            rng.choice(REASONS), action_type, rng.choice(ACTION_DURATIONS[action_type]))
+
+
+CASES = (
+    Case('create_user', core, lambda d, r: (discord_id(d.discord_offender(r)),), 1),
+    Case('resolve_user_ids', core,
+         lambda d, r: ('discord', discord_id(d.discord_offender(r)), discord_id(d.moderator(r))), 1),
+    Case('get_user_internal_id', core, lambda d, r: ('discord', discord_id(d.discord_offender(r))), 1),
+    Case('get_active_punishment', core,
+         lambda d, r: (d.offender(r), r.choice(('mute', 'ban', 'voice_mute', 'blacklist', 'warn'))), 1),
+    Case('get_moderation_state', core, lambda d, r: (d.offender(r),), 1),
+    Case('count_active_warns', core, lambda d, r: (d.offender(r),), 1),
+    Case('check_ticket_has_punishment', core, lambda d, r: (d.ticket_id(r),), 1),
+    Case('get_full_user_data', core, lambda d, r: ('discord', discord_id(d.discord_offender(r))), 0.2),
+    Case('get_user_history_page', core, lambda d, r: (d.offender(r),), 1),
+    Case('get_info_for_all_active_punishments', core, lambda d, r: (d.offender(r),), 1),
+    Case('get_info_for_active_discord_complaints', core, lambda d, r: (d.offender(r),), 1),
+    Case('get_pending_expirations', core, lambda d, r: (), 0.02),
+    Case('get_action_expiration', core, lambda d, r: (d.action_id(r),), 1),
+    Case('deactivate_action', core, lambda d, r: (d.action_id(r),), 1),
+    Case('deactivate_all_warns', core, lambda d, r: (d.offender(r),), 1),
+    Case('revoke_action', core, lambda d, r: (d.action_id(r), d.moderator(r), 'benchmark'), 1),
+    Case('expire_actions', core, lambda d, r: ([d.action_id(r) for _ in range(10)],), 1),
+    Case('apply_punishment_transaction', punishments,
+         lambda d, r: _punishment_args(d, r, 'warn') + (None, 3, 'mute', 3600), 1),
+    Case('add_punishment', punishments, lambda d, r: _punishment_args(d, r), 1),
+    Case('revoke_punishment', punishments,
+         lambda d, r: ('discord', discord_id(d.discord_offender(r)), discord_id(d.moderator(r)), 'benchmark',
+                       r.choice(('mute', 'ban', 'voice_mute'))), 1),
+    Case('update_punishment_log_id', punishments,
+         lambda d, r: (d.action_id(r), r.randint(CHANNEL_ID_BASE, 2 * CHANNEL_ID_BASE)), 1),
+    Case('log_ticket_open', tickets,
+         lambda d, r: (discord_id(d.discord_offender(r)), d.new_channel(), NICKNAME_TICKET_TYPE, _nickname(r)), 1),
+    Case('log_ticket_close', tickets,
+         lambda d, r: (f'https://discord.com/channels/1/2/{r.randint(CHANNEL_ID_BASE, 2 * CHANNEL_ID_BASE)}',
+                       d.ticket_id(r), None, None, None, discord_id(d.moderator(r))), 1),
+    Case('get_ticket_db_id_by_channel', tickets, lambda d, r: (CHANNEL_ID_BASE + d.ticket_id(r),), 1),
+    Case('get_punishment_log_id_for_ticket', tickets, lambda d, r: (d.ticket_id(r),), 1),
+)
+
+
+def _summarize(latencies_ms, elapsed, errors):
+    ordered = sorted(latencies_ms)
+    count = len(ordered)
+    return {
+        'calls': count,
+        'errors': errors,
+        'p50_ms': round(ordered[int(0.5 * (count - 1))], 4),
+        'p99_ms': round(ordered[int(0.99 * (count - 1))], 4),
+        'mean_ms': round(sum(ordered) / count, 4),
+        'ops_per_sec': round(count / elapsed, 1) if elapsed else None,
+    }
+
+
+def _run_single(case, dataset, rng, iterations):
+    func = getattr(case.module, case.name)
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        args = case.make_args(dataset, rng)
+        call_started = time.perf_counter()
+        try:
+            func(*args)
+        except Exception:
+            errors += 1
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    return _summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def _run_concurrent(case, dataset, rng, iterations, concurrency):
+    from . import aio
+
+    func = getattr(aio, case.name)
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(args):
+        nonlocal errors
+        async with semaphore:
+            call_started = time.perf_counter()
+            try:
+                await func(*args)
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - call_started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call(case.make_args(dataset, rng)) for _ in range(iterations)))
+    return _summarize(latencies, time.perf_counter() - started, errors)
+
+
+def run_benchmarks(dataset, dataset_path, iterations=BENCHMARK_ITERATIONS, concurrency=BENCHMARK_CONCURRENCY,
+                   cases=CASES, modes=('single', 'concurrent')):
+    scratch_dir = tempfile.mkdtemp(prefix='benchmark-')
+    scratch_path = os.path.join(scratch_dir, 'database.db')
+    results = {}
+    try:
+        for case in cases:
+            case_iterations = max(5, int(iterations * case.iterations_scale))
+            results[case.name] = {}
+            for mode in modes:
+                # Every measurement starts from the same generated data, so write cases cannot skew later ones.
+                core.close_db()
+                _copy_database(dataset_path, scratch_path)
+                core.DB_PATH = scratch_path
+                core.invalidate_user_cache()
+                tickets.invalidate_ticket_cache()
+                rng = random.Random(f'{dataset.seed}:{case.name}:{mode}')
+                if mode == 'single':
+                    results[case.name][mode] = _run_single(case, dataset, rng, case_iterations)
+                else:
+                    results[case.name][mode] = asyncio.run(
+                        _run_concurrent(case, dataset, rng, case_iterations, concurrency))
+                logger.warning(f"{case.name} [{mode}]: {results[case.name][mode]}")
+    finally:
+        from . import aio
+        aio.shutdown()
+        for name in os.listdir(scratch_dir):
+            os.remove(os.path.join(scratch_dir, name))
+        os.rmdir(scratch_dir)
+    return {
+        'meta': {
+            'users': dataset.users, 'actions': dataset.actions, 'tickets': dataset.tickets, 'seed': dataset.seed,
+            'iterations': iterations, 'concurrency': concurrency, 'sqlite_version': sqlite3.sqlite_version,
+            'python': platform.python_version(), 'created_at': core.now_epoch(),
+        },
+        'results': results,
+    }
+
+
+def compare_runs(baseline, candidate, threshold=REGRESSION_THRESHOLD, min_delta_ms=REGRESSION_MIN_DELTA_MS):
+    rows = []
+    for name, modes in candidate['results'].items():
+        for mode, new in modes.items():
+            old = baseline['results'].get(name, {}).get(mode)
+            if not old:
+                continue
+            regressions = []
+            for metric in ('p50_ms', 'p99_ms'):
+                # Sub-tenth-of-a-millisecond jitter is noise, not a regression.
+                if new[metric] > old[metric] * (1 + threshold) and new[metric] - old[metric] >= min_delta_ms:
+                    regressions.append(metric)
+            if old['ops_per_sec'] and new['ops_per_sec'] and new['ops_per_sec'] < old['ops_per_sec'] / (1 + threshold):
+                regressions.append('ops_per_sec')
+            rows.append((name, mode, old, new, regressions))
+    return rows
+
+
+def _print_results(results):
+    print(f"{'case':<40} {'mode':<10} {'calls':>6} {'p50 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'ops/s':>10}")
+    for name, modes in results['results'].items():
+        for mode, stats in modes.items():
+            errors = f" ({stats['errors']} errors)" if stats['errors'] else ''
+            print(f"{name:<40} {mode:<10} {stats['calls']:>6} {stats['p50_ms']:>9.3f} {stats['p99_ms']:>9.3f} "
+                  f"{stats['mean_ms']:>9.3f} {stats['ops_per_sec'] or 0:>10.1f}{errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the database layer against a synthetic dataset.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="Generate or reuse a dataset and time every database function.")
+    run_parser.add_argument("--scale", choices=DATASET_SCALES, default='10k', help="Dataset size preset.")
+    run_parser.add_argument("--users", type=int, help="Override the number of users.")
+    run_parser.add_argument("--actions", type=int, help="Override the number of actions.")
+    run_parser.add_argument("--tickets", type=int, help="Override the number of tickets.")
+    run_parser.add_argument("--seed", type=int, default=BENCHMARK_SEED, help="Random seed for data and calls.")
+    run_parser.add_argument("--dataset-dir", default=tempfile.gettempdir(),
+                            help="Where generated datasets are cached between runs.")
+    run_parser.add_argument("--iterations", type=int, default=BENCHMARK_ITERATIONS, help="Calls per case and mode.")
+    run_parser.add_argument("--concurrency", type=int, default=BENCHMARK_CONCURRENCY,
+                            help="Calls in flight in concurrent mode.")
+    run_parser.add_argument("--cases", help="Comma separated subset of cases to run.")
+    run_parser.add_argument("--mode", choices=('single', 'concurrent', 'both'), default='both')
+    run_parser.add_argument("--out", help="Write the results as JSON to this file.")
+
+    compare_parser = subparsers.add_parser('compare', help="Compare two result files and flag regressions.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                                help="Relative slowdown that counts as a regression.")
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.candidate) as f:
+            candidate = json.load(f)
+        if baseline['meta']['actions'] != candidate['meta']['actions']:
+            print("warning: the runs used different dataset sizes")
+        regressed = False
+        for name, mode, old, new, regressions in compare_runs(baseline, candidate, args.threshold):
+            marker = 'REGRESSION ' + ', '.join(regressions) if regressions else 'ok'
+            regressed = regressed or bool(regressions)
+            print(f"{name:<40} {mode:<10} p50 {old['p50_ms']:.3f} -> {new['p50_ms']:.3f}  "
+                  f"p99 {old['p99_ms']:.3f} -> {new['p99_ms']:.3f}  {marker}")
+        raise SystemExit(1 if regressed else 0)
+
+    # Per-call INFO logging would dominate the timings.
+    logger.setLevel(logging.WARNING)
+    users, actions, tickets_count = DATASET_SCALES[args.scale]
+    dataset = Dataset(args.users or users, args.actions or actions, args.tickets or tickets_count, args.seed)
+    dataset_path = os.path.join(
+        args.dataset_dir, f'benchmark-{dataset.users}u-{dataset.actions}a-{dataset.tickets}t-{dataset.seed}.db')
+    if not os.path.exists(dataset_path):
+        generate_dataset(dataset_path, dataset)
+
+    cases = CASES
+    if args.cases:
+        wanted = {name.strip() for name in args.cases.split(',')}
+        cases = [case for case in CASES if case.name in wanted]
+    modes = ('single', 'concurrent') if args.mode == 'both' else (args.mode,)
+    results = run_benchmarks(dataset, dataset_path, args.iterations, args.concurrency, cases, modes)
+    _print_results(results)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 import sqlite3
-from datetime import datetime, timedelta
-import pytz
+import threading
+import time
 import logging
+from collections import OrderedDict
 from contextlib import contextmanager
 
+from . import metrics
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 handler = logging.StreamHandler()
@@ -13,104 +16,392 @@ logger.addHandler(handler)
 
 DB_PATH = '../database/database.db'
 
+# Set to False to open a fresh untuned connection for every call, as before.
+PERSISTENT_CONNECTION = True
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 16384
+MMAP_SIZE_BYTES = 64 * 1024 * 1024
+CACHED_STATEMENTS = 256
+IDENTITY_CACHE_SIZE = 10000
+# RETURNING and upserts without a conflict target need SQLite 3.35.
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+ACTIVE_PUNISHMENT_QUERY = """SELECT id, expires_at FROM user_actions
+   WHERE user_id = ? AND action_type = ? AND is_active = 1
+   ORDER BY time DESC LIMIT 1"""
+
+# user_moderation_state is kept current by triggers on user_actions (migration 4).
+MODERATION_STATE_QUERY = "SELECT * FROM user_moderation_state WHERE user_id = ?"
+
+STATE_PUNISHMENT_QUERIES = {
+    action_type: f"""SELECT {action_type}_action_id AS id, {action_type}_expires_at AS expires_at
+   FROM user_moderation_state
+   WHERE user_id = ? AND {action_type}_action_id IS NOT NULL"""
+    for action_type in ('mute', 'ban', 'voice_mute', 'blacklist')
+}
+
+ACTIVE_WARN_COUNT_QUERY = "SELECT active_warns AS warn_count FROM user_moderation_state WHERE user_id = ?"
+
+HISTORY_PAGE_SIZE = 25
+
+# Newest first over hot and archived rows; pages continue strictly after the (time, id) of the previous page's last row.
+USER_HISTORY_QUERIES = {
+    'received': """SELECT ua.id, ua.action_type, p_user.discord_id AS performed_by_discord_id,
+          ua.ticket_id, ua.role, ua.reason, ua.time, ua.duration_seconds, ua.expires_at,
+          ua.is_active, r_user.discord_id AS revoked_by_discord_id, ua.revocation_reason,
+          ua.revocation_time
+       FROM all_user_actions ua
+       LEFT JOIN users p_user ON ua.performed_by = p_user.id
+       LEFT JOIN users r_user ON ua.revoked_by = r_user.id
+       WHERE ua.user_id = ?{filters}
+       ORDER BY ua.time DESC, ua.id DESC
+       LIMIT ?""",
+    'performed': """SELECT ua.id, ua.action_type, t_user.discord_id AS target_discord_id,
+          t_user.mindustry_id AS target_mindustry_id,
+          ua.role, ua.reason, ua.time, ua.duration_seconds, ua.is_active
+       FROM all_user_actions ua
+       JOIN users t_user ON ua.user_id = t_user.id
+       WHERE ua.performed_by = ?{filters}
+       ORDER BY ua.time DESC, ua.id DESC
+       LIMIT ?""",
+}
+
+# The no-op DO UPDATE makes RETURNING yield the id of an already known user too.
+USER_UPSERT_QUERIES = {
+    'discord': """INSERT INTO users (discord_id, created_at) VALUES (?, ?)
+       ON CONFLICT(discord_id) DO UPDATE SET discord_id = excluded.discord_id
+       RETURNING id, created_at""",
+    'mindustry': """INSERT INTO users (mindustry_id, created_at) VALUES (?, ?)
+       ON CONFLICT(mindustry_id) DO UPDATE SET mindustry_id = excluded.mindustry_id
+       RETURNING id, created_at""",
+}
+
+TICKET_HAS_PUNISHMENT_QUERY = "SELECT 1 FROM user_actions WHERE ticket_id = ? LIMIT 1"
+
+ACTIVE_PUNISHMENT_LOGS_QUERY = """SELECT ua.action_type, t.log_message_id, t.channel_id
+   FROM user_actions AS ua
+   INNER JOIN tickets AS t ON ua.ticket_id = t.id
+   WHERE ua.user_id = ?
+     AND ua.is_active = 1
+   ORDER BY ua.time DESC"""
+
+ACTIVE_DISCORD_COMPLAINT_LOGS_QUERY = """SELECT ua.action_type, t.log_message_id, t.channel_id
+   FROM user_actions AS ua
+   INNER JOIN tickets AS t ON ua.ticket_id = t.id
+   WHERE ua.user_id = ?
+     AND ua.is_active = 1
+     AND t.ticket_type = 'Discord-Complaint'
+   ORDER BY ua.time DESC"""
+
+_connection = None
+_connection_lock = threading.RLock()
+_connection_depth = 0
+
+# (platform, platform_id) -> users.id, most recently used last.
+_identity_cache = OrderedDict()
+_identity_lock = threading.Lock()
+
+
+class _Cursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._record(sql, parameters, (time.perf_counter() - started) * 1000)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._record(sql, None, (time.perf_counter() - started) * 1000)
+        return self
+
+    def _record(self, sql, parameters, elapsed_ms):
+        caller = metrics.current_caller()
+        metrics.record_statement(caller, elapsed_ms, max(self.rowcount, 0))
+        # BEGIN IMMEDIATE only takes the write lock, so its duration is the time spent busy
+        # waiting on another connection that holds it.
+        if sql.lstrip().upper().startswith('BEGIN IMMEDIATE'):
+            metrics.record_lock_wait(caller, elapsed_ms)
+        if elapsed_ms >= metrics.SLOW_QUERY_MS:
+            plan = None
+            if parameters is not None and sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                try:
+                    plan = [row[3] for row in
+                            sqlite3.Connection.execute(self.connection, f'EXPLAIN QUERY PLAN {sql}', parameters)]
+                except sqlite3.Error:
+                    pass
+            metrics.log_slow_query(caller, sql, elapsed_ms, plan)
+
+    def _timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        result = fetch(*args)
+        rows = len(result) if isinstance(result, list) else int(result is not None)
+        metrics.record_fetch(metrics.current_caller(), (time.perf_counter() - started) * 1000, rows)
+        return result
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, size or self.arraysize)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+
+class _Connection(sqlite3.Connection):
+    defer_commit = False
+    savepoint = None
+
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        # Inside run_write_batch the helpers' own commits are folded into one: a commit only
+        # keeps the job's work so far and starts a new savepoint for whatever follows it.
+        if self.defer_commit:
+            self.execute(f'RELEASE {self.savepoint}')
+            self.execute(f'SAVEPOINT {self.savepoint}')
+        else:
+            super().commit()
+
+
+def _open_persistent_connection():
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=CACHED_STATEMENTS,
+        check_same_thread=False,
+        factory=_Connection
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KIB}')
+    conn.execute(f'PRAGMA mmap_size={MMAP_SIZE_BYTES}')
+    from .archive import attach_archive
+    attach_archive(conn)
+    logger.info(f"Opened persistent database connection to {DB_PATH}")
+    return conn
+
 
 @contextmanager
 def db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
-        conn.close()
+    caller = metrics.find_caller()
+    if not PERSISTENT_CONNECTION:
+        metrics.push_caller(caller)
+        conn = None
+        try:
+            conn = sqlite3.connect(DB_PATH, factory=_Connection)
+            conn.row_factory = sqlite3.Row
+            from .archive import attach_archive
+            attach_archive(conn)
+            yield conn
+        finally:
+            metrics.pop_caller()
+            if conn is not None:
+                conn.close()
+        return
+
+    global _connection, _connection_depth
+    with _connection_lock:
+        metrics.push_caller(caller)
+        try:
+            if _connection is None:
+                _connection = _open_persistent_connection()
+            _connection_depth += 1
+            try:
+                yield _connection
+            finally:
+                _connection_depth -= 1
+                # A helper that did not commit left a failed or aborted write behind;
+                # discard it just like closing a per-call connection would. Nested uses
+                # leave that to the outermost one, whose work is still in progress.
+                if _connection_depth == 0 and _connection.in_transaction and not _connection.defer_commit:
+                    _connection.rollback()
+        finally:
+            metrics.pop_caller()
+
+
+def close_db():
+    global _connection
+    with _connection_lock:
+        if _connection is not None:
+            _connection.close()
+            _connection = None
+            logger.info("Closed persistent database connection.")
+    invalidate_user_cache()
+
+
+@contextmanager
+def immediate_transaction():
+    with db_connection() as conn:
+        # Inside run_write_batch the batch already holds the write lock, the commit is
+        # deferred and a failure only rolls back this job's savepoint.
+        nested = conn.in_transaction
+        if not nested:
+            conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            if not nested:
+                conn.rollback()
+            invalidate_user_cache()
+            raise
+
+
+def run_write_batch(jobs):
+    results = []
+    if not PERSISTENT_CONNECTION:
+        for func, args, kwargs in jobs:
+            try:
+                results.append((True, func(*args, **kwargs)))
+            except Exception as e:
+                results.append((False, e))
+        return results
+
+    with db_connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.defer_commit = True
+        try:
+            for index, (func, args, kwargs) in enumerate(jobs):
+                savepoint = conn.savepoint = f'write_{index}'
+                conn.execute(f'SAVEPOINT {savepoint}')
+                try:
+                    results.append((True, func(*args, **kwargs)))
+                except Exception as e:
+                    results.append((False, e))
+                # Work after the helper's last commit would have been rolled back on its own,
+                # including a nested helper's commit followed by an error the caller swallowed.
+                conn.execute(f'ROLLBACK TO {savepoint}')
+                conn.execute(f'RELEASE {savepoint}')
+            conn.defer_commit = False
+            conn.commit()
+        except Exception:
+            conn.defer_commit = False
+            conn.rollback()
+            # Ids created inside the batch were cached before it was rolled back.
+            invalidate_user_cache()
+            raise
+    return results
+
+
+# SQL counterpart of now_epoch() that does not need unixepoch() from SQLite 3.38.
+NOW_EPOCH_SQL = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+
+def now_epoch():
+    return int(time.time())
+
+
+def normalize_action_type(action_type):
+    # Discord commands use "voice-mute" while the schema stores "voice_mute".
+    return action_type.replace('-', '_')
+
+
+def check_sqlite_version():
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        required = '.'.join(map(str, MIN_SQLITE_VERSION))
+        raise RuntimeError(f"SQLite {required} or newer is required, but Python is linked against SQLite "
+                           f"{sqlite3.sqlite_version}. Upgrade Python or its sqlite3 library.")
 
 
 def init_db():
+    check_sqlite_version()
+    from .migrations import migrate
+    from .archive import attach_archive
+    migrate()
     with db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            discord_id TEXT UNIQUE,
-            mindustry_id TEXT UNIQUE,
-            created_at TEXT NOT NULL
-        )''')
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tickets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            channel_id TEXT NOT NULL UNIQUE,
-            log_message_id TEXT,
-            status TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            ticket_type TEXT,
-            offender_identifier TEXT,
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-        )''')
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_actions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            action_type TEXT NOT NULL CHECK(action_type IN (
-                'promotion', 'demotion', 'mute', 'ban', 
-                'warn', 'kick', 'voice_mute', 'blacklist'
-            )),
-            performed_by INTEGER NOT NULL,
-            ticket_id INTEGER,
-            log_message_id TEXT,
-            role TEXT,
-            reason TEXT,
-            time TEXT NOT NULL,
-            duration_seconds INTEGER,
-            expires_at TEXT,
-            is_active INTEGER NOT NULL DEFAULT 1,
-            revoked_by INTEGER,
-            revocation_reason TEXT,
-            revocation_time TEXT,
-            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
-            FOREIGN KEY (performed_by) REFERENCES users (id) ON DELETE SET NULL,
-            FOREIGN KEY (revoked_by) REFERENCES users (id) ON DELETE SET NULL,
-            FOREIGN KEY (ticket_id) REFERENCES tickets (id) ON DELETE SET NULL
-        )''')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_discord_id ON users(discord_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_mindustry_id ON users(mindustry_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_actions_user_id ON user_actions(user_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_channel_id ON tickets(channel_id)')
-        conn.commit()
-        logger.info("Database initialized successfully.")
+        attach_archive(conn)
+        conn.execute('PRAGMA optimize')
+    logger.info("Database initialized successfully.")
+
+
+def _identity_key(platform, platform_id):
+    return (platform, int(platform_id)) if platform == 'discord' else (platform, str(platform_id))
+
+
+def get_cached_user_id(platform, platform_id):
+    key = _identity_key(platform, platform_id)
+    with _identity_lock:
+        internal_id = _identity_cache.get(key)
+        if internal_id is not None:
+            _identity_cache.move_to_end(key)
+        return internal_id
+
+
+def _cache_user_id(key, internal_id):
+    with _identity_lock:
+        _identity_cache[key] = internal_id
+        _identity_cache.move_to_end(key)
+        while len(_identity_cache) > IDENTITY_CACHE_SIZE:
+            _identity_cache.popitem(last=False)
+
+
+def invalidate_user_cache(platform=None, platform_id=None):
+    with _identity_lock:
+        if platform is None:
+            _identity_cache.clear()
+        else:
+            _identity_cache.pop(_identity_key(platform, platform_id), None)
 
 
 def create_user(discord_id=None, mindustry_id=None):
     if not discord_id and not mindustry_id:
         raise ValueError("At least one ID (discord_id or mindustry_id) must be provided.")
 
+    if discord_id and mindustry_id:
+        return _link_user(discord_id, mindustry_id)
+
+    platform, platform_id = ('discord', discord_id) if discord_id else ('mindustry', mindustry_id)
+    cached_id = get_cached_user_id(platform, platform_id)
+    if cached_id is not None:
+        return cached_id
+
     with db_connection() as conn:
-        cursor = conn.cursor()
+        internal_id = upsert_user(conn, platform, platform_id)
+        conn.commit()
+    return internal_id
+
+
+def upsert_user(conn, platform, platform_id):
+    key = _identity_key(platform, platform_id)
+    cached_id = get_cached_user_id(*key)
+    if cached_id is not None:
+        return cached_id
 
-        query = "SELECT id FROM users WHERE "
-        params = []
-        if discord_id:
-            query += "discord_id = ?"
-            params.append(str(discord_id))
-        if mindustry_id:
-            if discord_id: query += " OR "
-            query += "mindustry_id = ?"
-            params.append(str(mindustry_id))
-
-        cursor.execute(query, params)
+    current_time = now_epoch()
+    row = conn.execute(USER_UPSERT_QUERIES[platform], (key[1], current_time)).fetchone()
+    if row['created_at'] == current_time:
+        logger.info(f"Created new {platform} user: {platform_id}")
+    _cache_user_id(key, row['id'])
+    return row['id']
+
+
+def _link_user(discord_id, mindustry_id):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM users WHERE discord_id = ? OR mindustry_id = ?",
+                       (int(discord_id), str(mindustry_id)))
         existing_user = cursor.fetchone()
 
         if existing_user:
             return existing_user['id']
-        else:
-            gmt = pytz.timezone('GMT')
-            current_time = datetime.now(gmt).strftime('%Y-%m-%d %H:%M:%S')
-            cursor.execute(
-                'INSERT INTO users (discord_id, mindustry_id, created_at) VALUES (?, ?, ?)',
-                (str(discord_id) if discord_id else None, str(mindustry_id) if mindustry_id else None, current_time)
-            )
-            conn.commit()
-            logger.info(f"Created new user: discord_id={discord_id}, mindustry_id={mindustry_id}")
-            return cursor.lastrowid
+        cursor.execute(
+            'INSERT INTO users (discord_id, mindustry_id, created_at) VALUES (?, ?, ?)',
+            (int(discord_id), str(mindustry_id), now_epoch())
+        )
+        conn.commit()
+        logger.info(f"Created new user: discord_id={discord_id}, mindustry_id={mindustry_id}")
+        return cursor.lastrowid
 
 
 def resolve_user_ids(platform, main_user_id, performer_id):
@@ -122,8 +413,7 @@ def resolve_user_ids(platform, main_user_id, performer_id):
 
 def _add_action(user_id, performed_by_id, action_type, ticket_id=None, role=None, reason=None, duration_seconds=None,
                 expires_at=None):
-    gmt = pytz.timezone('GMT')
-    current_time = datetime.now(gmt).strftime('%Y-%m-%d %H:%M:%S')
+    current_time = now_epoch()
 
     with db_connection() as conn:
         cursor = conn.cursor()
@@ -139,17 +429,29 @@ def _add_action(user_id, performed_by_id, action_type, ticket_id=None, role=None
 
 
 def get_active_punishment(user_internal_id, action_type):
+    query = STATE_PUNISHMENT_QUERIES.get(action_type)
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            """SELECT id, expires_at FROM user_actions
-               WHERE user_id = ? AND action_type = ? AND is_active = 1
-               ORDER BY time DESC LIMIT 1""",
-            (user_internal_id, action_type)
-        )
+        if query:
+            cursor.execute(query, (user_internal_id,))
+        else:
+            cursor.execute(ACTIVE_PUNISHMENT_QUERY, (user_internal_id, action_type))
         return cursor.fetchone()
 
 
+def get_moderation_state(user_internal_id):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(MODERATION_STATE_QUERY, (user_internal_id,))
+        result = cursor.fetchone()
+        return dict(result) if result else None
+
+
+def _has_active_actions(user_internal_id):
+    state = get_moderation_state(user_internal_id)
+    return bool(state and state['active_actions'])
+
+
 def deactivate_action(action_id):
     with db_connection() as conn:
         cursor = conn.cursor()
@@ -164,12 +466,7 @@ def deactivate_action(action_id):
 def count_active_warns(user_internal_id):
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            """SELECT COUNT(*) as warn_count
-               FROM user_actions
-               WHERE user_id = ? AND action_type = 'warn' AND is_active = 1""",
-            (user_internal_id,)
-        )
+        cursor.execute(ACTIVE_WARN_COUNT_QUERY, (user_internal_id,))
         result = cursor.fetchone()
         return result['warn_count'] if result else 0
 
@@ -186,8 +483,7 @@ def deactivate_all_warns(user_internal_id):
 
 
 def revoke_action(action_id, revoked_by_internal_id, reason):
-    gmt = pytz.timezone('GMT')
-    revocation_time = datetime.now(gmt).strftime('%Y-%m-%d %H:%M:%S')
+    revocation_time = now_epoch()
 
     with db_connection() as conn:
         cursor = conn.cursor()
@@ -214,21 +510,27 @@ def check_ticket_has_punishment(ticket_db_id):
         return False
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            "SELECT 1 FROM user_actions WHERE ticket_id = ? LIMIT 1",
-            (ticket_db_id,)
-        )
+        cursor.execute(TICKET_HAS_PUNISHMENT_QUERY, (ticket_db_id,))
         result = cursor.fetchone()
         return result is not None
 
 
 def get_user_internal_id(platform, platform_id):
+    cached_id = get_cached_user_id(platform, platform_id)
+    if cached_id is not None:
+        return cached_id
+
     with db_connection() as conn:
         cursor = conn.cursor()
-        column = "discord_id" if platform == "discord" else "mindustry_id"
-        cursor.execute(f"SELECT id FROM users WHERE {column} = ?", (str(platform_id),))
+        if platform == "discord":
+            cursor.execute("SELECT id FROM users WHERE discord_id = ?", (int(platform_id),))
+        else:
+            cursor.execute("SELECT id FROM users WHERE mindustry_id = ?", (str(platform_id),))
         result = cursor.fetchone()
-        return result['id'] if result else None
+    if not result:
+        return None
+    _cache_user_id(_identity_key(platform, platform_id), result['id'])
+    return result['id']
 
 
 def get_full_user_data(platform, platform_id):
@@ -236,104 +538,198 @@ def get_full_user_data(platform, platform_id):
     if not internal_id:
         return None
 
-    with db_connection() as conn:
-        cursor = conn.cursor()
+    from .backup import reporting_connection
+    with reporting_connection() as conn:
+        result = _full_user_data(conn, internal_id)
+    if result is None:
+        # Users created since the snapshot only exist in the live database.
+        with db_connection() as conn:
+            result = _full_user_data(conn, internal_id)
+    return result
 
-        cursor.execute('SELECT * FROM users WHERE id = ?', (internal_id,))
-        user_data = cursor.fetchone()
-        if not user_data:
-            return None
 
-        result = {
-            'internal_id': user_data['id'],
-            'discord_id': user_data['discord_id'],
-            'mindustry_id': user_data['mindustry_id'],
-            'created_at': user_data['created_at'],
-            'profile_data': {
-                'promotions': [], 'demotions': [], 'mutes': [], 'bans': [],
-                'warns': [], 'kicks': [], 'voice_mutes': [], 'blacklists': []
-            },
-            'actions_taken': []
-        }
+def _full_user_data(conn, internal_id):
+    cursor = conn.cursor()
 
-        cursor.execute(
-            '''SELECT ua.id, ua.action_type, p_user.discord_id as performed_by_discord_id, 
-                   ua.ticket_id, ua.role, ua.reason, ua.time, ua.duration_seconds, ua.expires_at, 
-                   ua.is_active, r_user.discord_id as revoked_by_discord_id, ua.revocation_reason, 
-                   ua.revocation_time
-            FROM user_actions ua
-            LEFT JOIN users p_user ON ua.performed_by = p_user.id
-            LEFT JOIN users r_user ON ua.revoked_by = r_user.id
-            WHERE ua.user_id = ?''',
-            (internal_id,))
-        for action in cursor.fetchall():
-            action_data = {k: v for k, v in dict(action).items() if v is not None}
-            action_type_plural = f"{action['action_type']}s"
-            if action_type_plural in result['profile_data']:
-                result['profile_data'][action_type_plural].append(action_data)
+    cursor.execute('SELECT * FROM users WHERE id = ?', (internal_id,))
+    user_data = cursor.fetchone()
+    if not user_data:
+        return None
 
-        cursor.execute(
-            '''SELECT ua.action_type, t_user.discord_id as target_discord_id, 
-                   t_user.mindustry_id as target_mindustry_id,
-                   ua.role, ua.reason, ua.time, ua.duration_seconds
-            FROM user_actions ua
-            JOIN users t_user ON ua.user_id = t_user.id
-            WHERE ua.performed_by = ?''',
-            (internal_id,))
-        result['actions_taken'] = [dict(row) for row in cursor.fetchall()]
+    result = {
+        'internal_id': user_data['id'],
+        'discord_id': user_data['discord_id'],
+        'mindustry_id': user_data['mindustry_id'],
+        'created_at': user_data['created_at'],
+        'profile_data': {
+            'promotions': [], 'demotions': [], 'mutes': [], 'bans': [],
+            'warns': [], 'kicks': [], 'voice_mutes': [], 'blacklists': []
+        },
+        'actions_taken': []
+    }
+
+    cursor.execute(
+        '''SELECT ua.id, ua.action_type, p_user.discord_id as performed_by_discord_id, 
+               ua.ticket_id, ua.role, ua.reason, ua.time, ua.duration_seconds, ua.expires_at, 
+               ua.is_active, r_user.discord_id as revoked_by_discord_id, ua.revocation_reason, 
+               ua.revocation_time
+        FROM all_user_actions ua
+        LEFT JOIN users p_user ON ua.performed_by = p_user.id
+        LEFT JOIN users r_user ON ua.revoked_by = r_user.id
+        WHERE ua.user_id = ?''',
+        (internal_id,))
+    for action in cursor.fetchall():
+        action_data = {k: v for k, v in dict(action).items() if v is not None}
+        action_type_plural = f"{action['action_type']}s"
+        if action_type_plural in result['profile_data']:
+            result['profile_data'][action_type_plural].append(action_data)
+
+    cursor.execute(
+        '''SELECT ua.action_type, t_user.discord_id as target_discord_id, 
+               t_user.mindustry_id as target_mindustry_id,
+               ua.role, ua.reason, ua.time, ua.duration_seconds
+        FROM all_user_actions ua
+        JOIN users t_user ON ua.user_id = t_user.id
+        WHERE ua.performed_by = ?''',
+        (internal_id,))
+    result['actions_taken'] = [dict(row) for row in cursor.fetchall()]
 
     return result
 
 
+def get_user_history_page(user_internal_id, direction='received', action_types=None, is_active=None, after=None,
+                          limit=HISTORY_PAGE_SIZE):
+    if direction not in USER_HISTORY_QUERIES:
+        raise ValueError(f"Unknown history direction: {direction}")
+
+    filters = ''
+    params = [user_internal_id]
+    if after:
+        filters += ' AND (ua.time, ua.id) < (?, ?)'
+        params.extend(after)
+    if action_types:
+        action_types = [normalize_action_type(action_type) for action_type in action_types]
+        filters += f" AND ua.action_type IN ({', '.join('?' * len(action_types))})"
+        params.extend(action_types)
+    if is_active is not None:
+        filters += ' AND ua.is_active = ?'
+        params.append(int(is_active))
+    params.append(limit + 1)
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(USER_HISTORY_QUERIES[direction].format(filters=filters), params)
+        rows = [dict(row) for row in cursor.fetchall()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1]['time'], rows[-1]['id'])
+    return rows, next_cursor
+
+
+def iter_user_history(user_internal_id, direction='received', action_types=None, is_active=None,
+                      page_size=HISTORY_PAGE_SIZE):
+    after = None
+    while True:
+        rows, after = get_user_history_page(user_internal_id, direction, action_types, is_active, after, page_size)
+        yield from rows
+        if after is None:
+            return
+
+
 def get_info_for_all_active_punishments(user_internal_id):
-    if not user_internal_id:
+    if not user_internal_id or not _has_active_actions(user_internal_id):
         return []
     with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            """SELECT ua.action_type, t.log_message_id, t.channel_id
-               FROM user_actions AS ua
-               INNER JOIN tickets AS t ON ua.ticket_id = t.id
-               WHERE ua.user_id = ? 
-                 AND ua.is_active = 1
-               ORDER BY ua.time DESC""",
-            (user_internal_id,)
-        )
+        cursor.execute(ACTIVE_PUNISHMENT_LOGS_QUERY, (user_internal_id,))
         results = [dict(row) for row in cursor.fetchall()]
         return results
 
 
 def get_info_for_active_discord_complaints(user_internal_id):
-    if not user_internal_id:
+    if not user_internal_id or not _has_active_actions(user_internal_id):
         return []
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(ACTIVE_DISCORD_COMPLAINT_LOGS_QUERY, (user_internal_id,))
+        results = [dict(row) for row in cursor.fetchall()]
+        return results
+
+
+EXPIRING_ACTION_TYPES = ('warn', 'mute', 'ban', 'voice_mute', 'blacklist')
+
+
+def get_pending_expirations():
+    placeholders = ", ".join("?" for _ in EXPIRING_ACTION_TYPES)
     with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(
-            """SELECT ua.action_type, t.log_message_id, t.channel_id
+            f"""SELECT ua.id, ua.action_type, ua.expires_at, u.discord_id
                FROM user_actions AS ua
-               INNER JOIN tickets AS t ON ua.ticket_id = t.id
-               WHERE ua.user_id = ? 
-                 AND ua.is_active = 1
-                 AND t.ticket_type = 'Discord-Complaint'
-               ORDER BY ua.time DESC""",
-            (user_internal_id,)
+               INNER JOIN users AS u ON ua.user_id = u.id
+               WHERE ua.is_active = 1
+                 AND ua.expires_at IS NOT NULL
+                 AND ua.action_type IN ({placeholders})
+               ORDER BY ua.expires_at""",
+            EXPIRING_ACTION_TYPES
         )
-        results = [dict(row) for row in cursor.fetchall()]
-        return results
+        return [dict(row) for row in cursor.fetchall()]
 
 
-def find_mindustry_complaints_by_nickname(nickname):
-    if not nickname:
-        return []
+def get_action_expiration(action_id):
     with db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(
-            """SELECT log_message_id FROM tickets
-               WHERE ticket_type = 'Mindustry-Complaint'
-                 AND offender_identifier = ?
-                 AND status = 'CLOSED'
-                 AND log_message_id IS NOT NULL""",
-            (nickname,)
+            """SELECT ua.id, ua.action_type, ua.expires_at, u.discord_id
+               FROM user_actions AS ua
+               INNER JOIN users AS u ON ua.user_id = u.id
+               WHERE ua.id = ? AND ua.is_active = 1 AND ua.expires_at IS NOT NULL""",
+            (action_id,)
         )
-        results = [dict(row) for row in cursor.fetchall()]
-        return results
\ No newline at end of file
+        row = cursor.fetchone()
+        if not row or row['action_type'] not in EXPIRING_ACTION_TYPES:
+            return None
+        return dict(row)
+
+
+def get_active_action_ids(action_ids, batch_size=500):
+    active = set()
+    action_ids = list(action_ids)
+    with db_connection() as conn:
+        for start in range(0, len(action_ids), batch_size):
+            batch = action_ids[start:start + batch_size]
+            placeholders = ", ".join("?" for _ in batch)
+            active.update(row['id'] for row in conn.execute(
+                f"SELECT id FROM user_actions WHERE id IN ({placeholders}) AND is_active = 1", batch))
+    return active
+
+
+def expire_actions(action_ids, batch_size=500):
+    expired_ids = []
+    action_ids = list(action_ids)
+    if not action_ids:
+        return expired_ids
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        for start in range(0, len(action_ids), batch_size):
+            batch = action_ids[start:start + batch_size]
+            placeholders = ", ".join("?" for _ in batch)
+            cursor.execute(
+                f"SELECT id FROM user_actions WHERE id IN ({placeholders}) AND is_active = 1",
+                batch
+            )
+            still_active = [row['id'] for row in cursor.fetchall()]
+            if not still_active:
+                continue
+            placeholders = ", ".join("?" for _ in still_active)
+            cursor.execute(
+                f"UPDATE user_actions SET is_active = 0 WHERE id IN ({placeholders})",
+                still_active
+            )
+            expired_ids.extend(still_active)
+        conn.commit()
+    if expired_ids:
+        logger.info(f"Expired {len(expired_ids)} actions: {expired_ids}")
+    return expired_ids
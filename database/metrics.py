@@ -0,0 +1,147 @@
+import logging
+import os
+import sys
+import threading
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+SLOW_QUERY_MS = 100
+SLOW_QUERY_LOG_FILENAME = 'slow_queries.log'
+
+slow_query_logger = logging.getLogger('database.slow_queries')
+slow_query_logger.setLevel(logging.WARNING)
+slow_query_logger.propagate = False
+
+# Frames skipped when attributing a statement to the function that issued it.
+_INTERNAL_FUNCTIONS = {'db_connection', 'immediate_transaction'}
+
+_stats = {}
+_stats_lock = threading.Lock()
+_local = threading.local()
+
+
+class CallerStats:
+    __slots__ = ('statements', 'total_ms', 'max_ms', 'fetch_ms', 'rows', 'lock_wait_ms', 'buckets')
+
+    def __init__(self):
+        self.statements = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.fetch_ms = 0.0
+        self.rows = 0
+        self.lock_wait_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def percentile(self, fraction):
+        if not self.statements:
+            return 0.0
+        threshold = fraction * self.statements
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= threshold:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+
+def _stats_for(caller):
+    stats = _stats.get(caller)
+    if stats is None:
+        stats = _stats[caller] = CallerStats()
+    return stats
+
+
+def find_caller(depth=1):
+    frame = sys._getframe(depth)
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get('__name__', '')
+        if code.co_name not in _INTERNAL_FUNCTIONS and module != 'contextlib':
+            return f"{module.removeprefix('database.')}.{code.co_name}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+def push_caller(caller):
+    stack = getattr(_local, 'callers', None)
+    if stack is None:
+        stack = _local.callers = []
+    stack.append(caller)
+
+
+def pop_caller():
+    _local.callers.pop()
+
+
+def current_caller():
+    stack = getattr(_local, 'callers', None)
+    return stack[-1] if stack else 'unknown'
+
+
+def record_statement(caller, elapsed_ms, rows=0):
+    with _stats_lock:
+        stats = _stats_for(caller)
+        stats.statements += 1
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        stats.rows += rows
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                stats.buckets[index] += 1
+                break
+        else:
+            stats.buckets[-1] += 1
+
+
+def record_fetch(caller, elapsed_ms, rows):
+    with _stats_lock:
+        stats = _stats_for(caller)
+        stats.total_ms += elapsed_ms
+        stats.fetch_ms += elapsed_ms
+        stats.rows += rows
+
+
+def record_lock_wait(caller, wait_ms):
+    with _stats_lock:
+        _stats_for(caller).lock_wait_ms += wait_ms
+
+
+def _ensure_slow_query_handler():
+    if slow_query_logger.handlers:
+        return
+    from .core import DB_PATH
+    handler = logging.FileHandler(os.path.join(os.path.dirname(DB_PATH), SLOW_QUERY_LOG_FILENAME),
+                                  encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+    slow_query_logger.addHandler(handler)
+
+
+def log_slow_query(caller, sql, elapsed_ms, plan):
+    statement = ' '.join(sql.split())
+    plan_text = ' | '.join(plan) if plan else 'n/a'
+    try:
+        _ensure_slow_query_handler()
+    except OSError:
+        slow_query_logger.addHandler(logging.StreamHandler())
+    slow_query_logger.warning(f"{elapsed_ms:.1f}ms in {caller}: {statement} -- plan: {plan_text}")
+
+
+def snapshot():
+    with _stats_lock:
+        rows = [{
+            'caller': caller,
+            'statements': stats.statements,
+            'total_ms': round(stats.total_ms, 2),
+            'mean_ms': round(stats.total_ms / stats.statements, 3) if stats.statements else 0.0,
+            'p50_ms': stats.percentile(0.5),
+            'p99_ms': stats.percentile(0.99),
+            'max_ms': round(stats.max_ms, 2),
+            'fetch_ms': round(stats.fetch_ms, 2),
+            'rows': stats.rows,
+            'lock_wait_ms': round(stats.lock_wait_ms, 2),
+        } for caller, stats in _stats.items()]
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,553 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from collections import namedtuple
+
+from . import core
+from .core import db_connection, logger, NOW_EPOCH_SQL
+from .nicknames import normalize_nickname, index_nickname, NICKNAME_TICKET_TYPE
+from .activity import ACTIVITY_BUCKET_SQL, ACTIVITY_INCREMENT, REVOKE_METRIC, TICKET_CLOSED_METRIC
+
+DEFAULT_BATCH_SIZE = 5000
+
+Migration = namedtuple("Migration", "version description apply batched")
+
+MIGRATIONS = []
+
+
+def migration(version, description, batched=False):
+    def decorator(func):
+        MIGRATIONS.append(Migration(version, description, func, batched))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return decorator
+
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def latest_version():
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def copy_in_batches(conn, source, target, insert_columns, select_columns, batch_size):
+    last_id = conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {target}').fetchone()[0]
+    while True:
+        cursor = conn.execute(
+            f'''INSERT INTO {target} ({insert_columns})
+                SELECT {select_columns} FROM {source} WHERE id > ? ORDER BY id LIMIT ?''',
+            (last_id, batch_size)
+        )
+        copied = cursor.rowcount
+        conn.commit()
+        if copied < batch_size:
+            return
+        last_id = conn.execute(f'SELECT MAX(id) FROM {target}').fetchone()[0]
+
+
+def backfill_in_batches(conn, table, assignment, condition='1', batch_size=DEFAULT_BATCH_SIZE):
+    max_id = conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+    for start in range(0, max_id, batch_size):
+        conn.execute(
+            f'UPDATE {table} SET {assignment} WHERE id > ? AND id <= ? AND ({condition})',
+            (start, start + batch_size)
+        )
+        conn.commit()
+
+
+@migration(1, "base tables and hot-query indexes")
+def _v1_base_schema(conn, batch_size):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        discord_id TEXT UNIQUE,
+        mindustry_id TEXT UNIQUE,
+        created_at TEXT NOT NULL
+    )''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS tickets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        channel_id TEXT NOT NULL UNIQUE,
+        log_message_id TEXT,
+        status TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        ticket_type TEXT,
+        offender_identifier TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS user_actions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        action_type TEXT NOT NULL CHECK(action_type IN (
+            'promotion', 'demotion', 'mute', 'ban',
+            'warn', 'kick', 'voice_mute', 'blacklist'
+        )),
+        performed_by INTEGER NOT NULL,
+        ticket_id INTEGER,
+        log_message_id TEXT,
+        role TEXT,
+        reason TEXT,
+        time TEXT NOT NULL,
+        duration_seconds INTEGER,
+        expires_at TEXT,
+        is_active INTEGER NOT NULL DEFAULT 1,
+        revoked_by INTEGER,
+        revocation_reason TEXT,
+        revocation_time TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+        FOREIGN KEY (performed_by) REFERENCES users (id) ON DELETE SET NULL,
+        FOREIGN KEY (revoked_by) REFERENCES users (id) ON DELETE SET NULL,
+        FOREIGN KEY (ticket_id) REFERENCES tickets (id) ON DELETE SET NULL
+    )''')
+    _create_v1_indexes(conn)
+
+
+def _create_v1_indexes(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_discord_id ON users(discord_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_mindustry_id ON users(mindustry_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_actions_user_id ON user_actions(user_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tickets_channel_id ON tickets(channel_id)')
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_actions_active_user_type
+                    ON user_actions(user_id, action_type, time, expires_at) WHERE is_active = 1""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_actions_active_user_time
+                    ON user_actions(user_id, time, action_type, ticket_id) WHERE is_active = 1""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_actions_ticket
+                    ON user_actions(ticket_id, time, log_message_id) WHERE ticket_id IS NOT NULL""")
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_actions_performed_by ON user_actions(performed_by)')
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_tickets_closed_offender
+                    ON tickets(ticket_type, offender_identifier, log_message_id) WHERE status = 'CLOSED'""")
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_actions_active_expires ON user_actions(expires_at)
+                    WHERE is_active = 1 AND expires_at IS NOT NULL''')
+
+
+# v1 stored snowflakes as TEXT and times as 'YYYY-MM-DD HH:MM:SS' GMT strings.
+V2_TABLES = (
+    ('users', '''
+    CREATE TABLE IF NOT EXISTS users_v2 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        discord_id INTEGER UNIQUE,
+        mindustry_id TEXT UNIQUE,
+        created_at INTEGER NOT NULL
+    )''',
+     "id, discord_id, mindustry_id, created_at",
+     "id, CAST(discord_id AS INTEGER), mindustry_id, CAST(strftime('%s', created_at) AS INTEGER)"),
+    ('tickets', '''
+    CREATE TABLE IF NOT EXISTS tickets_v2 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        channel_id INTEGER NOT NULL UNIQUE,
+        log_message_id INTEGER,
+        status TEXT NOT NULL,
+        created_at INTEGER NOT NULL,
+        ticket_type TEXT,
+        offender_identifier TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )''',
+     "id, user_id, channel_id, log_message_id, status, created_at, ticket_type, offender_identifier",
+     """id, user_id, CAST(channel_id AS INTEGER), CAST(log_message_id AS INTEGER), status,
+        CAST(strftime('%s', created_at) AS INTEGER), ticket_type, offender_identifier"""),
+    ('user_actions', '''
+    CREATE TABLE IF NOT EXISTS user_actions_v2 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        action_type TEXT NOT NULL CHECK(action_type IN (
+            'promotion', 'demotion', 'mute', 'ban',
+            'warn', 'kick', 'voice_mute', 'blacklist'
+        )),
+        performed_by INTEGER NOT NULL,
+        ticket_id INTEGER,
+        log_message_id INTEGER,
+        role TEXT,
+        reason TEXT,
+        time INTEGER NOT NULL,
+        duration_seconds INTEGER,
+        expires_at INTEGER,
+        is_active INTEGER NOT NULL DEFAULT 1,
+        revoked_by INTEGER,
+        revocation_reason TEXT,
+        revocation_time INTEGER,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+        FOREIGN KEY (performed_by) REFERENCES users (id) ON DELETE SET NULL,
+        FOREIGN KEY (revoked_by) REFERENCES users (id) ON DELETE SET NULL,
+        FOREIGN KEY (ticket_id) REFERENCES tickets (id) ON DELETE SET NULL
+    )''',
+     """id, user_id, action_type, performed_by, ticket_id, log_message_id, role, reason, time, duration_seconds,
+        expires_at, is_active, revoked_by, revocation_reason, revocation_time""",
+     """id, user_id, action_type, performed_by, ticket_id, CAST(log_message_id AS INTEGER), role, reason,
+        CAST(strftime('%s', time) AS INTEGER), duration_seconds, CAST(strftime('%s', expires_at) AS INTEGER),
+        is_active, revoked_by, revocation_reason, CAST(strftime('%s', revocation_time) AS INTEGER)"""),
+)
+
+
+@migration(2, "integer snowflakes and epoch timestamps", batched=True)
+def _v2_compact_schema(conn, batch_size):
+    # Rows are copied into the *_v2 tables in committed chunks, so an interrupted
+    # run resumes from the highest copied id; only the final swap is one transaction.
+    for table, create_statement, insert_columns, select_columns in V2_TABLES:
+        conn.execute(create_statement)
+        copy_in_batches(conn, table, f'{table}_v2', insert_columns, select_columns, batch_size)
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for table in ('user_actions', 'tickets', 'users'):
+            conn.execute(f'DROP TABLE {table}')
+            conn.execute(f'ALTER TABLE {table}_v2 RENAME TO {table}')
+        _create_v1_indexes(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+@migration(3, "keyset indexes for paginated user history")
+def _v3_history_indexes(conn, batch_size):
+    # Both replace single-column indexes whose leading column they share.
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_actions_user_time_id ON user_actions(user_id, time, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_actions_performer_time_id ON user_actions(performed_by, time, id)')
+    conn.execute('DROP INDEX IF EXISTS idx_actions_user_id')
+    conn.execute('DROP INDEX IF EXISTS idx_actions_performed_by')
+
+
+STATE_PUNISHMENTS = ('mute', 'ban', 'voice_mute', 'blacklist')
+
+
+def _latest_active(action_type, column):
+    return f"""(SELECT {column} FROM user_actions
+                 WHERE user_id = s.user_id AND action_type = '{action_type}' AND is_active = 1
+                 ORDER BY time DESC, id DESC LIMIT 1)"""
+
+
+# Recomputes the summary row of every user produced by {users}, a query returning user_id.
+MODERATION_STATE_REFRESH = f"""INSERT OR REPLACE INTO user_moderation_state
+    (user_id, active_warns, active_actions,
+     {', '.join(f'{p}_action_id, {p}_expires_at' for p in STATE_PUNISHMENTS)})
+    SELECT s.user_id,
+        (SELECT COUNT(*) FROM user_actions WHERE user_id = s.user_id AND action_type = 'warn' AND is_active = 1),
+        (SELECT COUNT(*) FROM user_actions WHERE user_id = s.user_id AND is_active = 1),
+        {', '.join(f"{_latest_active(p, 'id')}, {_latest_active(p, 'expires_at')}" for p in STATE_PUNISHMENTS)}
+    FROM ({{users}}) AS s"""
+
+
+@migration(4, "trigger-maintained user_moderation_state summary")
+def _v4_moderation_state(conn, batch_size):
+    conn.execute(f'''
+    CREATE TABLE IF NOT EXISTS user_moderation_state (
+        user_id INTEGER PRIMARY KEY,
+        active_warns INTEGER NOT NULL DEFAULT 0,
+        active_actions INTEGER NOT NULL DEFAULT 0,
+        {', '.join(f'{p}_action_id INTEGER, {p}_expires_at INTEGER' for p in STATE_PUNISHMENTS)},
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    )''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_moderation_state_insert AFTER INSERT ON user_actions
+    BEGIN
+        {MODERATION_STATE_REFRESH.format(users='SELECT NEW.user_id AS user_id')};
+    END''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_moderation_state_update
+    AFTER UPDATE OF user_id, action_type, time, expires_at, is_active ON user_actions
+    BEGIN
+        {MODERATION_STATE_REFRESH.format(users='SELECT NEW.user_id AS user_id')};
+        {MODERATION_STATE_REFRESH.format(users='SELECT OLD.user_id AS user_id WHERE OLD.user_id <> NEW.user_id')};
+    END''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_moderation_state_delete AFTER DELETE ON user_actions
+    BEGIN
+        {MODERATION_STATE_REFRESH.format(users='SELECT OLD.user_id AS user_id')};
+    END''')
+    conn.execute(MODERATION_STATE_REFRESH.format(users='SELECT DISTINCT user_id FROM user_actions'))
+
+
+@migration(5, "full-text search index over reasons and ticket text")
+def _v5_search_index(conn, batch_size):
+    # kind is 'action' (ref_id = user_actions.id) or 'ticket' (ref_id = tickets.id);
+    # ticket text is indexed explicitly when the ticket is closed.
+    conn.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        kind UNINDEXED, ref_id UNINDEXED, body,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_search_action_insert AFTER INSERT ON user_actions
+    WHEN NEW.reason IS NOT NULL
+    BEGIN
+        INSERT INTO search_index (kind, ref_id, body) VALUES ('action', NEW.id, NEW.reason);
+    END''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_search_action_update AFTER UPDATE OF reason ON user_actions
+    BEGIN
+        DELETE FROM search_index WHERE kind = 'action' AND ref_id = OLD.id;
+        INSERT INTO search_index (kind, ref_id, body)
+            SELECT 'action', NEW.id, NEW.reason WHERE NEW.reason IS NOT NULL;
+    END''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_search_action_delete AFTER DELETE ON user_actions
+    BEGIN
+        DELETE FROM search_index WHERE kind = 'action' AND ref_id = OLD.id;
+    END''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_search_ticket_delete AFTER DELETE ON tickets
+    BEGIN
+        DELETE FROM search_index WHERE kind = 'ticket' AND ref_id = OLD.id;
+    END''')
+    conn.execute('''INSERT INTO search_index (kind, ref_id, body)
+                    SELECT 'action', id, reason FROM user_actions WHERE reason IS NOT NULL''')
+
+
+@migration(6, "compressed ticket transcript archive")
+def _v6_ticket_transcripts(conn, batch_size):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS ticket_transcripts (
+        ticket_id INTEGER PRIMARY KEY,
+        codec TEXT NOT NULL,
+        raw_size INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        created_at INTEGER NOT NULL,
+        FOREIGN KEY (ticket_id) REFERENCES tickets (id) ON DELETE CASCADE
+    )''')
+
+
+@migration(7, "normalized offender nicknames with a trigram index", batched=True)
+def _v7_nickname_trigrams(conn, batch_size):
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(tickets)')}
+    if 'offender_nickname_normalized' not in columns:
+        conn.execute('ALTER TABLE tickets ADD COLUMN offender_nickname_normalized TEXT')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS nickname_trigrams (
+        trigram TEXT NOT NULL,
+        ticket_id INTEGER NOT NULL,
+        PRIMARY KEY (trigram, ticket_id),
+        FOREIGN KEY (ticket_id) REFERENCES tickets (id) ON DELETE CASCADE
+    ) WITHOUT ROWID''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_nickname_trigrams_ticket_delete AFTER DELETE ON tickets
+    BEGIN
+        DELETE FROM nickname_trigrams WHERE ticket_id = OLD.id;
+    END''')
+    conn.execute('DROP INDEX IF EXISTS idx_tickets_closed_offender')
+    conn.commit()
+
+    # Normalization is Python-only, so rows are backfilled in committed id ranges;
+    # already normalized rows are skipped when an interrupted run resumes.
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            '''SELECT id, offender_identifier FROM tickets
+               WHERE id > ? AND ticket_type = ? AND offender_identifier IS NOT NULL
+                 AND offender_nickname_normalized IS NULL
+               ORDER BY id LIMIT ?''',
+            (last_id, NICKNAME_TICKET_TYPE, batch_size)
+        ).fetchall()
+        for row in rows:
+            if normalize_nickname(row['offender_identifier']):
+                index_nickname(conn, row['id'], row['offender_identifier'])
+        conn.commit()
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]['id']
+
+
+@migration(8, "keep summaries and search entries when inactive actions are archived")
+def _v8_archive_aware_triggers(conn, batch_size):
+    # Only the archiver deletes inactive actions: they never count towards the summary,
+    # and their reasons must stay searchable from the archive.
+    conn.execute('DROP TRIGGER IF EXISTS trg_moderation_state_delete')
+    conn.execute(f'''
+    CREATE TRIGGER trg_moderation_state_delete AFTER DELETE ON user_actions
+    WHEN OLD.is_active = 1
+    BEGIN
+        {MODERATION_STATE_REFRESH.format(users='SELECT OLD.user_id AS user_id')};
+    END''')
+    conn.execute('DROP TRIGGER IF EXISTS trg_search_action_delete')
+    conn.execute('''
+    CREATE TRIGGER trg_search_action_delete AFTER DELETE ON user_actions
+    WHEN OLD.is_active = 1
+    BEGIN
+        DELETE FROM search_index WHERE kind = 'action' AND ref_id = OLD.id;
+    END''')
+
+
+@migration(9, "per-moderator daily and weekly activity rollups")
+def _v9_moderator_activity(conn, batch_size):
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(tickets)')}
+    if 'closed_by' not in columns:
+        conn.execute('ALTER TABLE tickets ADD COLUMN closed_by INTEGER REFERENCES users (id) ON DELETE SET NULL')
+    if 'closed_at' not in columns:
+        conn.execute('ALTER TABLE tickets ADD COLUMN closed_at INTEGER')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS moderator_activity (
+        period TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        moderator_id INTEGER NOT NULL,
+        metric TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (period, bucket, moderator_id, metric)
+    ) WITHOUT ROWID''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_moderator_activity_moderator
+                    ON moderator_activity(moderator_id, period, bucket)''')
+
+    # Rollups are history: archiving or deleting actions never decrements them.
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_activity_action_insert AFTER INSERT ON user_actions
+    WHEN NEW.performed_by IS NOT NULL
+    BEGIN
+        {ACTIVITY_INCREMENT.format(t='NEW.time', moderator='NEW.performed_by', metric='NEW.action_type')};
+    END''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_activity_action_inserted_revoked AFTER INSERT ON user_actions
+    WHEN NEW.revoked_by IS NOT NULL
+    BEGIN
+        {ACTIVITY_INCREMENT.format(t='COALESCE(NEW.revocation_time, NEW.time)', moderator='NEW.revoked_by',
+                                   metric=f"'{REVOKE_METRIC}'")};
+    END''')
+    # unixepoch() would need SQLite 3.38, and a trigger body only fails once it fires.
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_activity_action_revoke AFTER UPDATE OF revoked_by ON user_actions
+    WHEN OLD.revoked_by IS NULL AND NEW.revoked_by IS NOT NULL
+    BEGIN
+        {ACTIVITY_INCREMENT.format(t=f'COALESCE(NEW.revocation_time, {NOW_EPOCH_SQL})', moderator='NEW.revoked_by',
+                                   metric=f"'{REVOKE_METRIC}'")};
+    END''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_activity_ticket_insert AFTER INSERT ON tickets
+    WHEN NEW.closed_by IS NOT NULL
+    BEGIN
+        {ACTIVITY_INCREMENT.format(t='COALESCE(NEW.closed_at, NEW.created_at)', moderator='NEW.closed_by',
+                                   metric=f"'{TICKET_CLOSED_METRIC}'")};
+    END''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_activity_ticket_close AFTER UPDATE OF closed_by ON tickets
+    WHEN OLD.closed_by IS NULL AND NEW.closed_by IS NOT NULL
+    BEGIN
+        {ACTIVITY_INCREMENT.format(t=f'COALESCE(NEW.closed_at, {NOW_EPOCH_SQL})', moderator='NEW.closed_by',
+                                   metric=f"'{TICKET_CLOSED_METRIC}'")};
+    END''')
+
+    # Archived actions are included when the archive is attached. Tickets closed before
+    # this migration have no recorded closer, so that metric starts from zero.
+    has_view = conn.execute(
+        "SELECT 1 FROM sqlite_temp_master WHERE type = 'view' AND name = 'all_user_actions'").fetchone()
+    source = 'all_user_actions' if has_view else 'user_actions'
+    for period, bucket in ACTIVITY_BUCKET_SQL.items():
+        conn.execute(f'''
+        INSERT INTO moderator_activity (period, bucket, moderator_id, metric, count)
+        SELECT '{period}', {bucket.format(t='time')}, performed_by, action_type, COUNT(*)
+        FROM {source} WHERE performed_by IS NOT NULL
+        GROUP BY 2, 3, 4
+        ON CONFLICT DO UPDATE SET count = count + excluded.count''')
+        conn.execute(f'''
+        INSERT INTO moderator_activity (period, bucket, moderator_id, metric, count)
+        SELECT '{period}', {bucket.format(t='COALESCE(revocation_time, time)')}, revoked_by, '{REVOKE_METRIC}',
+               COUNT(*)
+        FROM {source} WHERE revoked_by IS NOT NULL
+        GROUP BY 2, 3
+        ON CONFLICT DO UPDATE SET count = count + excluded.count''')
+
+
+@migration(10, "incrementally captured messages of open ticket channels")
+def _v10_ticket_messages(conn, batch_size):
+    # Keyed by channel, not ticket: the first messages arrive before the ticket row is logged.
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS ticket_messages (
+        channel_id INTEGER NOT NULL,
+        message_id INTEGER NOT NULL,
+        author_name TEXT NOT NULL,
+        created_at INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        attachments TEXT,
+        edited_at INTEGER,
+        PRIMARY KEY (channel_id, message_id)
+    ) WITHOUT ROWID''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS ticket_transcript_sync (
+        channel_id INTEGER PRIMARY KEY,
+        synced_through INTEGER NOT NULL
+    )''')
+
+
+@migration(11, "ticket metadata recorded at creation")
+def _v11_ticket_metadata(conn, batch_size):
+    # Type, platform, opener and offender already have columns; tickets opened before this
+    # migration keep NULLs here and are read from their Discord embed instead.
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(tickets)')}
+    for column in ('lang', 'title', 'form_data'):
+        if column not in columns:
+            conn.execute(f'ALTER TABLE tickets ADD COLUMN {column} TEXT')
+
+
+def _apply(conn, step, batch_size):
+    if step.batched:
+        step.apply(conn, batch_size)
+        conn.execute(f'PRAGMA user_version = {step.version}')
+        conn.commit()
+        return
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        step.apply(conn, batch_size)
+        conn.execute(f'PRAGMA user_version = {step.version}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def run_migrations(conn, batch_size=DEFAULT_BATCH_SIZE):
+    timings = []
+    version = get_schema_version(conn)
+    for step in MIGRATIONS:
+        if step.version <= version:
+            continue
+        started = time.perf_counter()
+        _apply(conn, step, batch_size)
+        elapsed = time.perf_counter() - started
+        timings.append((step.version, step.description, elapsed))
+        logger.info(f"Applied migration {step.version} ({step.description}) in {elapsed:.3f}s")
+    return timings
+
+
+def migrate(dry_run=False, batch_size=DEFAULT_BATCH_SIZE):
+    if not dry_run:
+        with db_connection() as conn:
+            return run_migrations(conn, batch_size)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        copy = sqlite3.connect(os.path.join(tmp_dir, 'dry_run.db'))
+        copy.row_factory = sqlite3.Row
+        try:
+            with db_connection() as conn:
+                conn.backup(copy)
+            return run_migrations(copy, batch_size)
+        finally:
+            copy.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending database schema migrations.")
+    parser.add_argument("--db", default=core.DB_PATH, help="Path to the SQLite database.")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Run pending migrations against a copy and report how long each step takes.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Rows per committed chunk in batched backfills.")
+    args = parser.parse_args()
+
+    core.DB_PATH = args.db
+    with db_connection() as conn:
+        current = get_schema_version(conn)
+    print(f"Schema version: {current}, latest: {latest_version()}")
+
+    timings = migrate(dry_run=args.dry_run, batch_size=args.batch_size)
+    if not timings:
+        print("Nothing to migrate.")
+    for version, description, elapsed in timings:
+        prefix = "would take" if args.dry_run else "took"
+        print(f"  v{version} {description}: {prefix} {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import re
+import unicodedata
+
+from .core import db_connection
+
+NICKNAME_MATCH_LIMIT = 10
+MIN_NICKNAME_SIMILARITY = 0.35
+NICKNAME_TICKET_TYPE = 'Mindustry-Complaint'
+
+# Mindustry markup: [red], [#ff0000ff], [] resets; "[[" is an escaped bracket.
+COLOR_TAG_PATTERN = re.compile(r'\[(?:#[0-9a-fA-F]{3,8}|[a-zA-Z]*)\]')
+
+# Cyrillic and Greek letters that render like Latin ones, after casefolding.
+CONFUSABLES = str.maketrans({
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'к': 'k', 'м': 'm', 'н': 'h', 'о': 'o', 'р': 'p', 'с': 'c',
+    'т': 't', 'у': 'y', 'х': 'x', 'і': 'i', 'ї': 'i', 'ј': 'j', 'ѕ': 's', 'ԁ': 'd', 'ɡ': 'g', 'һ': 'h',
+    'α': 'a', 'β': 'b', 'ε': 'e', 'η': 'n', 'ι': 'i', 'κ': 'k', 'ν': 'v', 'ο': 'o', 'ρ': 'p', 'τ': 't',
+    'υ': 'u', 'χ': 'x', 'ϲ': 'c',
+})
+
+NICKNAME_CANDIDATES_QUERY = """SELECT t.id, t.log_message_id, t.offender_identifier,
+          t.offender_nickname_normalized AS normalized, COUNT(*) AS shared
+   FROM nickname_trigrams AS g
+   JOIN tickets AS t ON t.id = g.ticket_id
+   WHERE g.trigram IN ({placeholders})
+     AND t.ticket_type = 'Mindustry-Complaint'
+     AND t.status = 'CLOSED'
+     AND t.log_message_id IS NOT NULL
+   GROUP BY t.id"""
+
+
+def normalize_nickname(nickname):
+    if not nickname:
+        return None
+    text = COLOR_TAG_PATTERN.sub('', nickname.replace('[[', '\0')).replace('\0', '[')
+    text = unicodedata.normalize('NFKD', unicodedata.normalize('NFKC', text))
+    text = ''.join(ch for ch in text if unicodedata.category(ch)[0] not in ('M', 'Z', 'C'))
+    text = text.casefold().translate(CONFUSABLES)
+    return text or None
+
+
+def nickname_trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def index_nickname(conn, ticket_db_id, nickname):
+    normalized = normalize_nickname(nickname)
+    conn.execute('UPDATE tickets SET offender_nickname_normalized = ? WHERE id = ?', (normalized, ticket_db_id))
+    conn.execute('DELETE FROM nickname_trigrams WHERE ticket_id = ?', (ticket_db_id,))
+    if normalized:
+        conn.executemany('INSERT OR IGNORE INTO nickname_trigrams (trigram, ticket_id) VALUES (?, ?)',
+                         [(trigram, ticket_db_id) for trigram in nickname_trigrams(normalized)])
+
+
+def find_mindustry_complaints_by_nickname(nickname, limit=NICKNAME_MATCH_LIMIT,
+                                          min_similarity=MIN_NICKNAME_SIMILARITY):
+    normalized = normalize_nickname(nickname)
+    if not normalized:
+        return []
+    trigrams = nickname_trigrams(normalized)
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(NICKNAME_CANDIDATES_QUERY.format(placeholders=', '.join('?' * len(trigrams))),
+                       tuple(trigrams))
+        candidates = cursor.fetchall()
+
+    matches = []
+    for row in candidates:
+        candidate_size = len(nickname_trigrams(row['normalized']))
+        similarity = row['shared'] / (len(trigrams) + candidate_size - row['shared'])
+        if similarity >= min_similarity:
+            matches.append({
+                'ticket_id': row['id'],
+                'log_message_id': row['log_message_id'],
+                'offender_identifier': row['offender_identifier'],
+                'exact': row['normalized'] == normalized,
+                'similarity': round(similarity, 3),
+            })
+    matches.sort(key=lambda match: (not match['exact'], -match['similarity'], -match['ticket_id']))
+    return matches[:limit]
@@ -1,69 +1,108 @@
-from datetime import datetime, timedelta
-import pytz
 from .core import (
-    _add_action, create_user, get_active_punishment, deactivate_action,
-    revoke_action, get_user_internal_id, logger, resolve_user_ids, db_connection
+    create_user, get_active_punishment, revoke_action, get_user_internal_id, logger, db_connection, now_epoch,
+    normalize_action_type, immediate_transaction, upsert_user, ACTIVE_WARN_COUNT_QUERY
 )
 
 
-def _handle_punishment_stacking(user_internal_id, action_type, new_end_time_dt):
-    existing_punishment = get_active_punishment(user_internal_id, action_type)
+STACKABLE_ACTIONS = ("mute", "ban", "blacklist", "voice_mute")
 
-    if existing_punishment:
-        gmt = pytz.timezone('GMT')
-        existing_end_time_str = existing_punishment['expires_at']
+# An active punishment that expires later (or never) blocks the new one.
+SUPERSEDE_SHORTER_PUNISHMENTS_QUERY = """UPDATE user_actions SET is_active = 0
+   WHERE user_id = ? AND action_type = ? AND is_active = 1
+     AND expires_at IS NOT NULL AND expires_at < ?"""
 
-        if not existing_end_time_str:
-            logger.info(
-                f"Skipped adding {action_type} for user_id {user_internal_id} as a permanent one already exists.")
-            return False
+INSERT_UNLESS_LONGER_ACTIVE_QUERY = """INSERT INTO user_actions
+   (user_id, performed_by, action_type, ticket_id, reason, time, duration_seconds, expires_at)
+   SELECT ?, ?, ?, ?, ?, ?, ?, ?
+   WHERE NOT EXISTS (
+       SELECT 1 FROM user_actions
+       WHERE user_id = ? AND action_type = ? AND is_active = 1
+         AND (expires_at IS NULL OR expires_at >= ?))
+   RETURNING id"""
 
-        existing_end_time_dt = gmt.localize(datetime.strptime(existing_end_time_str, '%Y-%m-%d %H:%M:%S'))
+INSERT_ACTION_QUERY = """INSERT INTO user_actions
+   (user_id, performed_by, action_type, ticket_id, reason, time, duration_seconds, expires_at)
+   VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
 
-        if new_end_time_dt > existing_end_time_dt:
-            deactivate_action(existing_punishment['id'])
-            return True
-        else:
-            logger.info(
-                f"Skipped adding {action_type} for user_id {user_internal_id} as a longer or equal punishment already exists.")
-            return False
-
-    return True
-
-
-def add_punishment(platform, main_user_id, performer_id, reason, action_type, duration_seconds=None, ticket_id=None):
-    main_user_internal_id, performer_internal_id = resolve_user_ids(platform, main_user_id, performer_id)
 
+def _insert_punishment(conn, user_internal_id, performer_internal_id, action_type, reason, duration_seconds,
+                       ticket_id, current_time):
     if action_type == "kick":
-        punishment_id = _add_action(main_user_internal_id, performer_internal_id, "kick", reason=reason, ticket_id=ticket_id)
-        return 'ADDED', punishment_id
+        cursor = conn.execute(INSERT_ACTION_QUERY, (user_internal_id, performer_internal_id, "kick", ticket_id, reason,
+                                                    current_time, None, None))
+        return 'ADDED', cursor.lastrowid
 
     if duration_seconds is None:
         raise ValueError(f"duration_seconds is required for '{action_type}'")
-
-    gmt = pytz.timezone('GMT')
-    end_time_dt = datetime.now(gmt) + timedelta(seconds=duration_seconds)
-    expires_at_str = end_time_dt.strftime('%Y-%m-%d %H:%M:%S')
+    expires_at = current_time + duration_seconds
 
     if action_type == "warn":
-        punishment_id = _add_action(main_user_internal_id, performer_internal_id, "warn", reason=reason,
-                    duration_seconds=duration_seconds,
-                    expires_at=expires_at_str, ticket_id=ticket_id)
-        return 'ADDED', punishment_id
-
-    stackable_actions = ["mute", "ban", "blacklist", "voice_mute"]
-    if action_type in stackable_actions:
-        if _handle_punishment_stacking(main_user_internal_id, action_type, end_time_dt):
-            punishment_id = _add_action(main_user_internal_id, performer_internal_id, action_type, reason=reason,
-                        duration_seconds=duration_seconds, expires_at=expires_at_str,
-                        ticket_id=ticket_id)
-            return 'ADDED', punishment_id
+        cursor = conn.execute(INSERT_ACTION_QUERY, (user_internal_id, performer_internal_id, "warn", ticket_id, reason,
+                                                    current_time, duration_seconds, expires_at))
+        return 'ADDED', cursor.lastrowid
+
+    if action_type not in STACKABLE_ACTIONS:
+        raise ValueError(f"Unsupported action type in add_punishment: {action_type}")
+
+    conn.execute(SUPERSEDE_SHORTER_PUNISHMENTS_QUERY, (user_internal_id, action_type, expires_at))
+    row = conn.execute(INSERT_UNLESS_LONGER_ACTIVE_QUERY, (
+        user_internal_id, performer_internal_id, action_type, ticket_id, reason, current_time, duration_seconds,
+        expires_at, user_internal_id, action_type, expires_at
+    )).fetchone()
+    if row is None:
+        logger.info(
+            f"Skipped adding {action_type} for user_id {user_internal_id} as a longer or equal punishment already exists.")
         return 'SKIPPED', None
+    return 'ADDED', row['id']
+
+
+def apply_punishment_transaction(platform, main_user_id, performer_id, reason, action_type, duration_seconds=None,
+                                 ticket_id=None, warns_until_action=None, action_on_warn_limit=None,
+                                 action_on_warn_duration_seconds=None):
+    action_type = normalize_action_type(action_type)
+    result = {'status': 'SKIPPED', 'punishment_id': None, 'warn_count': None, 'escalation': None}
+
+    with immediate_transaction() as conn:
+        user_internal_id = upsert_user(conn, platform, main_user_id)
+        performer_internal_id = upsert_user(conn, 'discord', performer_id)
+        current_time = now_epoch()
+
+        result['status'], result['punishment_id'] = _insert_punishment(
+            conn, user_internal_id, performer_internal_id, action_type, reason, duration_seconds, ticket_id, current_time)
+
+        if action_type != "warn" or not warns_until_action or not action_on_warn_limit:
+            logger.info(f"Applied {action_type} for user_id {user_internal_id}: {result['status']}")
+            return result
+
+        warn_count = conn.execute(ACTIVE_WARN_COUNT_QUERY, (user_internal_id,)).fetchone()['warn_count']
+        result['warn_count'] = warn_count
+        if warn_count > 0 and warn_count % warns_until_action == 0:
+            level = warn_count // warns_until_action
+            escalation_action = normalize_action_type(action_on_warn_limit)
+            escalation = {
+                'action_type': escalation_action,
+                'level': level,
+                'duration_seconds': action_on_warn_duration_seconds * level,
+                'reason': f"Automatic punishment (Level {level}) for reaching {warn_count} warnings.",
+            }
+            escalation['status'], escalation['punishment_id'] = _insert_punishment(
+                conn, user_internal_id, performer_internal_id, escalation_action, escalation['reason'],
+                escalation['duration_seconds'], ticket_id, current_time)
+            result['escalation'] = escalation
+
+    logger.info(f"Applied warn #{result['warn_count']} for user_id {user_internal_id}"
+                f"{' with escalation' if result['escalation'] else ''}")
+    return result
 
-    raise ValueError(f"Unsupported action type in add_punishment: {action_type}")
+
+def add_punishment(platform, main_user_id, performer_id, reason, action_type, duration_seconds=None, ticket_id=None):
+    result = apply_punishment_transaction(platform, main_user_id, performer_id, reason, action_type, duration_seconds,
+                                          ticket_id=ticket_id)
+    return result['status'], result['punishment_id']
 
 
 def revoke_punishment(platform, main_user_id, revoked_by_id, reason, action_type):
+    action_type = normalize_action_type(action_type)
     revoker_internal_id = create_user(discord_id=revoked_by_id)
     user_internal_id = get_user_internal_id(platform, main_user_id)
     if not user_internal_id:
@@ -84,7 +123,7 @@ def update_punishment_log_id(punishment_id, log_message_id):
             cursor = conn.cursor()
             cursor.execute(
                 "UPDATE user_actions SET log_message_id = ? WHERE id = ?",
-                (str(log_message_id), punishment_id)
+                (int(log_message_id), punishment_id)
             )
             conn.commit()
             logger.info(f"Updated log_message_id for punishment {punishment_id} to {log_message_id}")
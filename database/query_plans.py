@@ -0,0 +1,72 @@
+import argparse
+
+from . import core
+from .core import (
+    db_connection, ACTIVE_PUNISHMENT_QUERY, ACTIVE_WARN_COUNT_QUERY, TICKET_HAS_PUNISHMENT_QUERY,
+    ACTIVE_PUNISHMENT_LOGS_QUERY, ACTIVE_DISCORD_COMPLAINT_LOGS_QUERY,
+    USER_HISTORY_QUERIES, MODERATION_STATE_QUERY, STATE_PUNISHMENT_QUERIES
+)
+from .tickets import PUNISHMENT_LOG_FOR_TICKET_QUERY
+from .nicknames import NICKNAME_CANDIDATES_QUERY
+
+HOT_QUERIES = {
+    "get_active_punishment": (ACTIVE_PUNISHMENT_QUERY, (1, "warn")),
+    "get_active_punishment:mute": (STATE_PUNISHMENT_QUERIES['mute'], (1,)),
+    "count_active_warns": (ACTIVE_WARN_COUNT_QUERY, (1,)),
+    "get_moderation_state": (MODERATION_STATE_QUERY, (1,)),
+    "check_ticket_has_punishment": (TICKET_HAS_PUNISHMENT_QUERY, (1,)),
+    "get_info_for_all_active_punishments": (ACTIVE_PUNISHMENT_LOGS_QUERY, (1,)),
+    "get_info_for_active_discord_complaints": (ACTIVE_DISCORD_COMPLAINT_LOGS_QUERY, (1,)),
+    "find_mindustry_complaints_by_nickname": (
+        NICKNAME_CANDIDATES_QUERY.format(placeholders='?, ?, ?'), ("  n", " ni", "nic")),
+    "get_punishment_log_id_for_ticket": (PUNISHMENT_LOG_FOR_TICKET_QUERY, (1,)),
+    "get_user_history_page:received": (
+        USER_HISTORY_QUERIES['received'].format(filters=' AND (ua.time, ua.id) < (?, ?)'), (1, 0, 0, 26)),
+    "get_user_history_page:performed": (
+        USER_HISTORY_QUERIES['performed'].format(filters=' AND (ua.time, ua.id) < (?, ?)'), (1, 0, 0, 26)),
+}
+
+
+def explain(query, params):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"EXPLAIN QUERY PLAN {query}", params)
+        return [row['detail'] for row in cursor.fetchall()]
+
+
+def find_full_scans(queries=None):
+    full_scans = []
+    for name, (query, params) in (queries or HOT_QUERIES).items():
+        for detail in explain(query, params):
+            # "SEARCH ..." steps seek into an index; any "SCAN ..." step walks a whole table or index.
+            if detail.startswith("SCAN "):
+                full_scans.append((name, detail))
+    return full_scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that hot moderation queries are served by indexes.")
+    parser.add_argument("--db", default=core.DB_PATH, help="Path to the SQLite database to inspect.")
+    parser.add_argument("--analyze", action="store_true", help="Refresh planner statistics with ANALYZE first.")
+    args = parser.parse_args()
+
+    core.DB_PATH = args.db
+    if args.analyze:
+        with db_connection() as conn:
+            conn.execute("ANALYZE")
+
+    for name, (query, params) in HOT_QUERIES.items():
+        print(f"{name}:")
+        for detail in explain(query, params):
+            print(f"    {detail}")
+
+    full_scans = find_full_scans()
+    if full_scans:
+        for name, detail in full_scans:
+            print(f"FULL SCAN in {name}: {detail}")
+        raise SystemExit(1)
+    print("All hot queries use indexes.")
+
+
+if __name__ == "__main__":
+    main()
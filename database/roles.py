@@ -1,17 +1,13 @@
-from datetime import datetime, timedelta
-import pytz
-from .core import _add_action, resolve_user_ids
+from .core import _add_action, resolve_user_ids, now_epoch
 
 
 def _add_role_change(platform, role_changed_by_id, main_user_id, role, action_type, reason=None, duration_days=None):
     main_user_internal_id, performer_internal_id = resolve_user_ids(platform, main_user_id, role_changed_by_id)
-    gmt = pytz.timezone('GMT')
     expires_at = None
     duration_seconds = None
     if duration_days:
         duration_seconds = duration_days * 86400
-        end_time = datetime.now(gmt) + timedelta(days=duration_days)
-        expires_at = end_time.strftime('%Y-%m-%d %H:%M:%S')
+        expires_at = now_epoch() + duration_seconds
 
     _add_action(
         user_id=main_user_internal_id,
@@ -0,0 +1,41 @@
+from .core import db_connection, logger
+
+SEARCH_PAGE_SIZE = 5
+
+SEARCH_QUERY = """SELECT si.kind, si.ref_id,
+          snippet(search_index, 2, '**', '**', '…', 16) AS snippet,
+          ua.action_type, ua.time AS action_time, ua.log_message_id AS action_log_message_id,
+          t.id AS ticket_id, t.ticket_type, t.created_at AS ticket_created_at,
+          t.log_message_id AS ticket_log_message_id
+   FROM search_index AS si
+   LEFT JOIN all_user_actions AS ua ON si.kind = 'action' AND ua.id = si.ref_id
+   LEFT JOIN tickets AS t ON t.id = CASE si.kind WHEN 'ticket' THEN si.ref_id ELSE ua.ticket_id END
+   WHERE search_index MATCH ?
+   ORDER BY si.rank
+   LIMIT ? OFFSET ?"""
+
+
+def build_match_expression(text):
+    # Every word is quoted so FTS5 operators typed by staff are matched literally,
+    # and prefix-matched so "grief" also finds "griefing".
+    terms = [term.replace('"', '""') for term in text.split()]
+    return ' '.join(f'"{term}"*' for term in terms if term)
+
+
+def search_cases(text, page=0, page_size=SEARCH_PAGE_SIZE):
+    expression = build_match_expression(text)
+    if not expression:
+        return [], False
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SEARCH_QUERY, (expression, page_size + 1, page * page_size))
+        results = [dict(row) for row in cursor.fetchall()]
+    return results[:page_size], len(results) > page_size
+
+
+def index_ticket_text(conn, ticket_db_id, text):
+    conn.execute("DELETE FROM search_index WHERE kind = 'ticket' AND ref_id = ?", (ticket_db_id,))
+    if text:
+        conn.execute("INSERT INTO search_index (kind, ref_id, body) VALUES ('ticket', ?, ?)", (ticket_db_id, text))
+        logger.info(f"Indexed {len(text)} characters of text for ticket {ticket_db_id}")
@@ -1,11 +1,60 @@
-from datetime import datetime
-import pytz
-from .core import db_connection, create_user, logger
+import json
+import threading
+from collections import OrderedDict
 
+from .core import db_connection, create_user, logger, now_epoch
+from .search import index_ticket_text
+from .transcripts import compress_transcript, store_transcript
+from .nicknames import index_nickname, NICKNAME_TICKET_TYPE
 
-def log_ticket_open(opener_discord_id, channel_id, ticket_type, offender_identifier=None):
-    gmt = pytz.timezone('GMT')
-    current_time = datetime.now(gmt).strftime('%Y-%m-%d %H:%M:%S')
+PUNISHMENT_LOG_FOR_TICKET_QUERY = """SELECT log_message_id FROM user_actions
+   WHERE ticket_id = ? AND log_message_id IS NOT NULL
+   ORDER BY time DESC LIMIT 1"""
+
+TICKET_RECORD_QUERY = """SELECT t.id, t.channel_id, t.status, t.ticket_type, t.offender_identifier, t.lang, t.title,
+          t.form_data, u.discord_id AS opener_discord_id
+   FROM tickets t
+   JOIN users u ON u.id = t.user_id
+   WHERE t.channel_id = ?"""
+
+TICKET_CACHE_SIZE = 1000
+
+# channel_id -> ticket record, most recently used last. Only existing rows are cached,
+# and every write to a ticket evicts it.
+_ticket_cache = OrderedDict()
+_ticket_cache_lock = threading.Lock()
+
+
+def get_cached_ticket(channel_id):
+    with _ticket_cache_lock:
+        record = _ticket_cache.get(int(channel_id))
+        if record is not None:
+            _ticket_cache.move_to_end(int(channel_id))
+        return record
+
+
+def _cache_ticket(record):
+    with _ticket_cache_lock:
+        _ticket_cache[record['channel_id']] = record
+        _ticket_cache.move_to_end(record['channel_id'])
+        while len(_ticket_cache) > TICKET_CACHE_SIZE:
+            _ticket_cache.popitem(last=False)
+
+
+def invalidate_ticket_cache(channel_id=None, ticket_db_id=None):
+    with _ticket_cache_lock:
+        if channel_id is None and ticket_db_id is None:
+            _ticket_cache.clear()
+        elif channel_id is not None:
+            _ticket_cache.pop(int(channel_id), None)
+        else:
+            for key in [key for key, record in _ticket_cache.items() if record['id'] == ticket_db_id]:
+                del _ticket_cache[key]
+
+
+def log_ticket_open(opener_discord_id, channel_id, ticket_type, offender_identifier=None, lang=None, title=None,
+                    form_data=None):
+    current_time = now_epoch()
 
     internal_user_id = create_user(discord_id=opener_discord_id)
 
@@ -14,42 +63,80 @@ def log_ticket_open(opener_discord_id, channel_id, ticket_type, offender_identif
         try:
             cursor.execute(
                 '''INSERT INTO tickets 
-                   (user_id, channel_id, status, created_at, ticket_type, offender_identifier) 
-                   VALUES (?, ?, ?, ?, ?, ?)''',
-                (internal_user_id, str(channel_id), 'OPEN', current_time, ticket_type, offender_identifier)
+                   (user_id, channel_id, status, created_at, ticket_type, offender_identifier, lang, title, form_data)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                (internal_user_id, int(channel_id), 'OPEN', current_time, ticket_type, offender_identifier, lang,
+                 title, json.dumps(form_data, ensure_ascii=False) if form_data is not None else None)
             )
+            if ticket_type == NICKNAME_TICKET_TYPE and offender_identifier:
+                index_nickname(conn, cursor.lastrowid, offender_identifier)
             conn.commit()
+            invalidate_ticket_cache(channel_id=channel_id)
             logger.info(
                 f"Logged new OPEN ticket for channel {channel_id}, type: {ticket_type}, offender_identifier: {offender_identifier}")
+            return cursor.lastrowid
         except Exception as e:
             logger.error(f"Failed to log open ticket for channel {channel_id}: {e}")
 
 
-def log_ticket_close(channel_id_or_db_id, log_message_url):
+def log_ticket_close(log_message_url, ticket_db_id=None, channel_id=None, search_text=None, transcript=None,
+                     closed_by_discord_id=None):
+    if ticket_db_id:
+        identifier_column, identifier = 'id', ticket_db_id
+    elif channel_id:
+        identifier_column, identifier = 'channel_id', channel_id
+    else:
+        raise ValueError("Either ticket_db_id or channel_id must be provided.")
+
+    compressed_transcript = compress_transcript(transcript) if transcript else None
+    closed_by = create_user(discord_id=closed_by_discord_id) if closed_by_discord_id else None
+
     with db_connection() as conn:
         cursor = conn.cursor()
         try:
-            log_message_id = log_message_url.split('/')[-1]
-
-            identifier_column = 'id' if isinstance(channel_id_or_db_id, int) else 'channel_id'
+            log_message_id = int(log_message_url.split('/')[-1])
 
             cursor.execute(
-                f'UPDATE tickets SET status = ?, log_message_id = ? WHERE {identifier_column} = ?',
-                ('CLOSED', log_message_id, str(channel_id_or_db_id))
+                f'''UPDATE tickets SET status = ?, log_message_id = ?, closed_by = COALESCE(closed_by, ?),
+                       closed_at = COALESCE(closed_at, ?)
+                    WHERE {identifier_column} = ?''',
+                ('CLOSED', log_message_id, closed_by, now_epoch(), int(identifier))
             )
+            if (search_text or transcript) and not ticket_db_id:
+                row = conn.execute("SELECT id FROM tickets WHERE channel_id = ?", (int(channel_id),)).fetchone()
+                ticket_db_id = row['id'] if row else None
+            if ticket_db_id and search_text:
+                index_ticket_text(conn, ticket_db_id, search_text)
+            if ticket_db_id and transcript:
+                store_transcript(conn, ticket_db_id, transcript, compressed_transcript)
             conn.commit()
+            if identifier_column == 'channel_id':
+                invalidate_ticket_cache(channel_id=identifier)
+            else:
+                invalidate_ticket_cache(ticket_db_id=int(identifier))
             logger.info(
-                f"Logged CLOSED ticket for {identifier_column} {channel_id_or_db_id} with log message {log_message_id}")
+                f"Logged CLOSED ticket for {identifier_column} {identifier} with log message {log_message_id}")
         except Exception as e:
-            logger.error(f"Failed to log closed ticket for {channel_id_or_db_id}: {e}")
+            logger.error(f"Failed to log closed ticket for {identifier_column} {identifier}: {e}")
 
 
-def get_ticket_db_id_by_channel(channel_id):
+def get_ticket_by_channel(channel_id):
+    record = get_cached_ticket(channel_id)
+    if record is not None:
+        return record
     with db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM tickets WHERE channel_id = ?", (str(channel_id),))
-        result = cursor.fetchone()
-        return result['id'] if result else None
+        row = conn.execute(TICKET_RECORD_QUERY, (int(channel_id),)).fetchone()
+    if not row:
+        return None
+    record = dict(row)
+    record['form_data'] = json.loads(record['form_data']) if record['form_data'] else None
+    _cache_ticket(record)
+    return record
+
+
+def get_ticket_db_id_by_channel(channel_id):
+    record = get_ticket_by_channel(channel_id)
+    return record['id'] if record else None
 
 
 def get_punishment_log_id_for_ticket(ticket_db_id):
@@ -58,12 +145,7 @@ def get_punishment_log_id_for_ticket(ticket_db_id):
     try:
         with db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(
-                """SELECT log_message_id FROM user_actions
-                   WHERE ticket_id = ? AND log_message_id IS NOT NULL
-                   ORDER BY time DESC LIMIT 1""",
-                (ticket_db_id,)
-            )
+            cursor.execute(PUNISHMENT_LOG_FOR_TICKET_QUERY, (ticket_db_id,))
             result = cursor.fetchone()
             return result['log_message_id'] if result else None
     except Exception as e:
@@ -0,0 +1,121 @@
+import zlib
+
+from .core import db_connection, logger, now_epoch
+
+TRANSCRIPT_CODEC = 'zlib'
+TRANSCRIPT_COMPRESSION_LEVEL = 9
+
+TRANSCRIPT_QUERY = "SELECT codec, data FROM ticket_transcripts WHERE ticket_id = ?"
+
+# Edits overwrite the captured message; the author and time of a message never change.
+TICKET_MESSAGE_UPSERT = """INSERT INTO ticket_messages
+   (channel_id, message_id, author_name, created_at, content, attachments, edited_at)
+   VALUES (?, ?, ?, ?, ?, ?, ?)
+   ON CONFLICT (channel_id, message_id) DO UPDATE SET content = excluded.content, attachments = excluded.attachments,
+       edited_at = excluded.edited_at"""
+
+TICKET_SYNC_UPSERT = """INSERT INTO ticket_transcript_sync (channel_id, synced_through) VALUES (?, ?)
+   ON CONFLICT (channel_id) DO UPDATE SET synced_through = MAX(synced_through, excluded.synced_through)"""
+
+TICKET_MESSAGES_QUERY = """SELECT message_id, author_name, created_at, content, attachments FROM ticket_messages
+   WHERE channel_id = ?
+   ORDER BY message_id"""
+
+
+def compress_transcript(text):
+    return zlib.compress(text.encode('utf-8'), TRANSCRIPT_COMPRESSION_LEVEL)
+
+
+def decompress_transcript(codec, data):
+    if codec != TRANSCRIPT_CODEC:
+        raise ValueError(f"Unsupported transcript codec: {codec}")
+    return zlib.decompress(data).decode('utf-8')
+
+
+def store_transcript(conn, ticket_db_id, text, compressed=None):
+    compressed = compressed if compressed is not None else compress_transcript(text)
+    raw_size = len(text.encode('utf-8'))
+    conn.execute(
+        '''INSERT OR REPLACE INTO ticket_transcripts (ticket_id, codec, raw_size, data, created_at)
+           VALUES (?, ?, ?, ?, ?)''',
+        (ticket_db_id, TRANSCRIPT_CODEC, raw_size, compressed, now_epoch())
+    )
+    logger.info(f"Archived transcript for ticket {ticket_db_id}: {raw_size} -> {len(compressed)} bytes")
+
+
+def get_ticket_transcript(ticket_db_id):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(TRANSCRIPT_QUERY, (ticket_db_id,))
+        row = cursor.fetchone()
+    if not row:
+        return None
+    return decompress_transcript(row['codec'], row['data'])
+
+
+def record_ticket_messages(channel_id, records, synced=False):
+    # records are (message_id, author_name, created_at, content, attachments, edited_at) tuples. A synced
+    # channel's log is complete up to its newest message, so the next catch-up crawl can start from there.
+    if not records:
+        return
+    with db_connection() as conn:
+        conn.executemany(TICKET_MESSAGE_UPSERT, [(int(channel_id), *record) for record in records])
+        if synced:
+            conn.execute(TICKET_SYNC_UPSERT, (int(channel_id), max(record[0] for record in records)))
+        conn.commit()
+
+
+def delete_ticket_messages(channel_id, message_ids):
+    with db_connection() as conn:
+        conn.executemany('DELETE FROM ticket_messages WHERE channel_id = ? AND message_id = ?',
+                         [(int(channel_id), int(message_id)) for message_id in message_ids])
+        conn.commit()
+
+
+def mark_ticket_synced(channel_id, synced_through):
+    with db_connection() as conn:
+        conn.execute(TICKET_SYNC_UPSERT, (int(channel_id), int(synced_through)))
+        conn.commit()
+
+
+def get_ticket_sync_point(channel_id):
+    with db_connection() as conn:
+        row = conn.execute('SELECT synced_through FROM ticket_transcript_sync WHERE channel_id = ?',
+                           (int(channel_id),)).fetchone()
+        return row['synced_through'] if row else None
+
+
+def get_ticket_message_versions(channel_id, through):
+    # message_id -> edited_at of the captured messages up to a point, compared against a fresh crawl.
+    with db_connection() as conn:
+        return {row['message_id']: row['edited_at'] for row in conn.execute(
+            'SELECT message_id, edited_at FROM ticket_messages WHERE channel_id = ? AND message_id <= ?',
+            (int(channel_id), int(through)))}
+
+
+def get_ticket_messages(channel_id):
+    with db_connection() as conn:
+        return [dict(row) for row in conn.execute(TICKET_MESSAGES_QUERY, (int(channel_id),))]
+
+
+def forget_ticket_channels(channel_ids):
+    with db_connection() as conn:
+        for table in ('ticket_messages', 'ticket_transcript_sync'):
+            conn.executemany(f'DELETE FROM {table} WHERE channel_id = ?',
+                             [(int(channel_id),) for channel_id in channel_ids])
+        conn.commit()
+
+
+def prune_ticket_channels(open_channel_ids):
+    # Drops captured logs of channels deleted while the bot was offline.
+    keep = {int(channel_id) for channel_id in open_channel_ids}
+    with db_connection() as conn:
+        removed = 0
+        for table in ('ticket_messages', 'ticket_transcript_sync'):
+            gone = [(row['channel_id'],) for row in conn.execute(f'SELECT DISTINCT channel_id FROM {table}')
+                    if row['channel_id'] not in keep]
+            removed += conn.executemany(f'DELETE FROM {table} WHERE channel_id = ?', gone).rowcount
+        conn.commit()
+    if removed:
+        logger.info(f"Pruned {removed} captured transcript rows of deleted ticket channels")
+    return removed
@@ -0,0 +1,285 @@
+import argparse
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from . import core
+from .core import logger, db_connection, invalidate_user_cache, NOW_EPOCH_SQL
+from .nicknames import index_nickname, NICKNAME_TICKET_TYPE
+from .search import index_ticket_text
+from .transcripts import decompress_transcript, store_transcript
+from .tickets import invalidate_ticket_cache
+
+TRANSFER_FORMATS = ('jsonl', 'csv')
+TRANSFER_CHUNK_SIZE = 1000
+
+TABLE_COLUMNS = {
+    'users': ('id', 'discord_id', 'mindustry_id', 'created_at'),
+    'tickets': ('id', 'user_id', 'channel_id', 'log_message_id', 'status', 'created_at', 'ticket_type',
+                'offender_identifier', 'closed_by', 'closed_at', 'lang', 'title', 'form_data'),
+    'user_actions': ('id', 'user_id', 'action_type', 'performed_by', 'ticket_id', 'log_message_id', 'role',
+                     'reason', 'time', 'duration_seconds', 'expires_at', 'is_active', 'revoked_by',
+                     'revocation_reason', 'revocation_time'),
+    'ticket_transcripts': ('ticket_id', 'transcript'),
+    'ticket_search_text': ('ticket_id', 'search_text'),
+}
+
+# Archived actions are exported too, so a dump always carries the full history.
+EXPORT_SOURCES = {'users': 'users', 'tickets': 'tickets', 'user_actions': 'all_user_actions'}
+
+# Ticket text lives compressed or in the full-text index, so it has its own queries.
+EXPORT_QUERIES = {
+    'ticket_transcripts': "SELECT ticket_id, codec, data FROM ticket_transcripts ORDER BY ticket_id",
+    'ticket_search_text': "SELECT ref_id, body FROM search_index WHERE kind = 'ticket' ORDER BY ref_id",
+}
+
+EXPORT_ROW_CONVERTERS = {
+    'ticket_transcripts': lambda row: (row['ticket_id'], decompress_transcript(row['codec'], row['data'])),
+}
+
+IMPORT_TEMP_TABLES = ('''CREATE TEMP TABLE IF NOT EXISTS import_user_map (
+                            old_id INTEGER PRIMARY KEY,
+                            new_id INTEGER NOT NULL)''',
+                      '''CREATE TEMP TABLE IF NOT EXISTS import_ticket_map (
+                            old_id INTEGER PRIMARY KEY,
+                            new_id INTEGER NOT NULL)''',
+                      # Highest action id handed out before the import, archived ones included.
+                      '''CREATE TEMP TABLE IF NOT EXISTS import_watermark AS
+                            SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'user_actions'), 0)
+                                   AS action_id''')
+
+IMPORT_USER_QUERY = f"""INSERT INTO users (discord_id, mindustry_id, created_at)
+                       VALUES (:discord_id, :mindustry_id, COALESCE(:created_at, {NOW_EPOCH_SQL}))
+                       ON CONFLICT DO NOTHING"""
+
+MAP_USER_QUERY = """INSERT OR REPLACE INTO temp.import_user_map (old_id, new_id)
+                    SELECT :id, COALESCE((SELECT id FROM users WHERE discord_id = :discord_id),
+                                         (SELECT id FROM users WHERE mindustry_id = :mindustry_id))
+                    WHERE :discord_id IS NOT NULL OR :mindustry_id IS NOT NULL"""
+
+IMPORT_TICKET_QUERY = """INSERT INTO tickets (user_id, channel_id, log_message_id, status, created_at, ticket_type,
+                                              offender_identifier, closed_by, closed_at, lang, title, form_data)
+                         SELECT u.new_id, :channel_id, :log_message_id, :status, :created_at, :ticket_type,
+                                :offender_identifier,
+                                (SELECT new_id FROM temp.import_user_map WHERE old_id = :closed_by), :closed_at,
+                                :lang, :title, :form_data
+                         FROM temp.import_user_map u
+                         WHERE u.old_id = :user_id
+                         ON CONFLICT (channel_id) DO NOTHING"""
+
+MAP_TICKET_QUERY = """INSERT OR REPLACE INTO temp.import_ticket_map (old_id, new_id)
+                      SELECT :id, id FROM tickets WHERE channel_id = :channel_id"""
+
+# Actions whose user or performer did not come through the users file are skipped. An action
+# that already existed before this import for the same user, performer, type and time is not
+# duplicated, so re-running an import is harmless.
+IMPORT_ACTION_QUERY = """INSERT INTO user_actions (user_id, action_type, performed_by, ticket_id, log_message_id, role,
+                                                   reason, time, duration_seconds, expires_at, is_active, revoked_by,
+                                                   revocation_reason, revocation_time)
+                         SELECT u.new_id, :action_type, p.new_id,
+                                (SELECT new_id FROM temp.import_ticket_map WHERE old_id = :ticket_id),
+                                :log_message_id, :role, :reason, :time, :duration_seconds, :expires_at,
+                                COALESCE(:is_active, 1),
+                                (SELECT new_id FROM temp.import_user_map WHERE old_id = :revoked_by),
+                                :revocation_reason, :revocation_time
+                         FROM temp.import_user_map u
+                         JOIN temp.import_user_map p ON p.old_id = :performed_by
+                         WHERE u.old_id = :user_id
+                           AND NOT EXISTS (SELECT 1 FROM all_user_actions ua
+                                           WHERE ua.user_id = u.new_id AND ua.time = :time
+                                             AND ua.action_type = :action_type AND ua.performed_by = p.new_id
+                                             AND ua.id <= (SELECT action_id FROM temp.import_watermark))"""
+
+
+def _table_path(directory, table, fmt):
+    return os.path.join(directory, f'{table}.{fmt}')
+
+
+def _write_rows(path, fmt, columns, rows):
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(columns)
+        for row in rows:
+            if fmt == 'csv':
+                writer.writerow(['' if value is None else value for value in row])
+            else:
+                f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def _read_rows(path, fmt, columns):
+    with open(path, encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            # CSV has no null, so empty cells are read back as NULL.
+            for record in csv.DictReader(f):
+                yield {column: record.get(column) or None for column in columns}
+        else:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield {column: record.get(column) for column in columns}
+
+
+def _cursor_rows(cursor, chunk_size):
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def _chunks(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_tables(directory, fmt='jsonl', tables=tuple(TABLE_COLUMNS), chunk_size=TRANSFER_CHUNK_SIZE):
+    os.makedirs(directory, exist_ok=True)
+    counts = {}
+    with db_connection() as conn:
+        # One read transaction keeps the tables consistent with each other without blocking writers.
+        conn.execute('BEGIN')
+        try:
+            for table in tables:
+                columns = TABLE_COLUMNS[table]
+                query = EXPORT_QUERIES.get(table) or \
+                    f"SELECT {', '.join(columns)} FROM {EXPORT_SOURCES[table]} ORDER BY id"
+                rows = _cursor_rows(conn.execute(query), chunk_size)
+                if table in EXPORT_ROW_CONVERTERS:
+                    rows = map(EXPORT_ROW_CONVERTERS[table], rows)
+                counts[table] = _write_rows(_table_path(directory, table, fmt), fmt, columns, rows)
+                logger.info(f"Exported {counts[table]} rows from {table}")
+        finally:
+            conn.rollback()
+    return counts
+
+
+# Row counts come from the cursor: total_changes would also count rows written by triggers.
+def _import_users(conn, chunk):
+    imported = conn.executemany(IMPORT_USER_QUERY, chunk).rowcount
+    conn.executemany(MAP_USER_QUERY, chunk)
+    return imported
+
+
+def _import_tickets(conn, chunk):
+    imported = conn.executemany(IMPORT_TICKET_QUERY, chunk).rowcount
+    conn.executemany(MAP_TICKET_QUERY, chunk)
+
+    complaints = [(row['id'], row['offender_identifier']) for row in chunk
+                  if row['ticket_type'] == NICKNAME_TICKET_TYPE and row['offender_identifier']]
+    for old_id, nickname in complaints:
+        mapped = conn.execute('SELECT new_id FROM temp.import_ticket_map WHERE old_id = ?', (old_id,)).fetchone()
+        if mapped:
+            index_nickname(conn, mapped['new_id'], nickname)
+    return imported
+
+
+def _import_actions(conn, chunk):
+    return conn.executemany(IMPORT_ACTION_QUERY, chunk).rowcount
+
+
+def _mapped_ticket_texts(conn, chunk, column):
+    for row in chunk:
+        if not row[column]:
+            continue
+        mapped = conn.execute('SELECT new_id FROM temp.import_ticket_map WHERE old_id = ?',
+                              (row['ticket_id'],)).fetchone()
+        if mapped:
+            yield mapped['new_id'], row[column]
+
+
+# Both replace whatever the ticket already has, so re-running an import is harmless here too.
+def _import_transcripts(conn, chunk):
+    imported = 0
+    for ticket_id, text in _mapped_ticket_texts(conn, chunk, 'transcript'):
+        store_transcript(conn, ticket_id, text)
+        imported += 1
+    return imported
+
+
+def _import_search_text(conn, chunk):
+    imported = 0
+    for ticket_id, text in _mapped_ticket_texts(conn, chunk, 'search_text'):
+        index_ticket_text(conn, ticket_id, text)
+        imported += 1
+    return imported
+
+
+IMPORTERS = {'users': _import_users, 'tickets': _import_tickets, 'user_actions': _import_actions,
+             'ticket_transcripts': _import_transcripts, 'ticket_search_text': _import_search_text}
+
+
+def import_tables(directory, fmt='jsonl', chunk_size=TRANSFER_CHUNK_SIZE):
+    counts = {}
+    with db_connection() as conn:
+        for statement in IMPORT_TEMP_TABLES:
+            conn.execute(statement)
+        try:
+            # Tables are imported in dependency order so every row can be remapped to local ids.
+            for table, importer in IMPORTERS.items():
+                path = _table_path(directory, table, fmt)
+                if not os.path.exists(path):
+                    continue
+                started = time.perf_counter()
+                imported = read = 0
+                for chunk in _chunks(_read_rows(path, fmt, TABLE_COLUMNS[table]), chunk_size):
+                    # A short write transaction per chunk lets the bot keep writing during long imports.
+                    conn.execute('BEGIN IMMEDIATE')
+                    try:
+                        imported += importer(conn, chunk)
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    read += len(chunk)
+                counts[table] = (imported, read - imported)
+                logger.info(f"Imported {imported} of {read} rows into {table} "
+                            f"in {time.perf_counter() - started:.2f}s")
+        finally:
+            conn.execute('DROP TABLE IF EXISTS temp.import_user_map')
+            conn.execute('DROP TABLE IF EXISTS temp.import_ticket_map')
+            conn.execute('DROP TABLE IF EXISTS temp.import_watermark')
+            invalidate_user_cache()
+            invalidate_ticket_cache()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import users, tickets with their transcripts and search text, "
+                                                 "and moderation history.")
+    parser.add_argument("mode", choices=("export", "import"))
+    parser.add_argument("directory", help="Directory holding one file per table.")
+    parser.add_argument("--db", default=core.DB_PATH, help="Path to the SQLite database.")
+    parser.add_argument("--format", choices=TRANSFER_FORMATS, default='jsonl', help="File format.")
+    parser.add_argument("--tables", default=','.join(TABLE_COLUMNS),
+                        help="Comma separated tables to export.")
+    parser.add_argument("--chunk-size", type=int, default=TRANSFER_CHUNK_SIZE,
+                        help="Rows fetched or inserted per round trip.")
+    args = parser.parse_args()
+
+    core.DB_PATH = args.db
+    if args.mode == 'export':
+        tables = [table.strip() for table in args.tables.split(',') if table.strip()]
+        unknown = set(tables) - set(TABLE_COLUMNS)
+        if unknown:
+            parser.error(f"unknown tables: {', '.join(sorted(unknown))}")
+        for table, count in export_tables(args.directory, args.format, tables, args.chunk_size).items():
+            print(f"{table}: {count} exported")
+    else:
+        core.init_db()
+        for table, (imported, skipped) in import_tables(args.directory, args.format, args.chunk_size).items():
+            print(f"{table}: {imported} imported, {skipped} skipped")
+    core.close_db()
+
+
+if __name__ == "__main__":
+    main()
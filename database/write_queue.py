@@ -0,0 +1,89 @@
+import asyncio
+
+from .core import run_write_batch, logger
+
+WRITE_BATCH_MAX_STATEMENTS = 100
+WRITE_BATCH_INTERVAL_SECONDS = 0.005
+
+
+class WriteQueue:
+    def __init__(self, runner, max_statements=WRITE_BATCH_MAX_STATEMENTS, interval=WRITE_BATCH_INTERVAL_SECONDS):
+        self.runner = runner
+        self.max_statements = max_statements
+        self.interval = interval
+        self._queue = None
+        self._task = None
+        self.batches = 0
+        self.statements = 0
+        self.largest_batch = 0
+        self.last_batch = 0
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def submit(self, func, *args, **kwargs):
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((func, args, kwargs, future))
+        return await future
+
+    async def _collect_batch(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.interval
+        while len(batch) < self.max_statements:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush_loop(self):
+        while True:
+            batch = await self._collect_batch()
+            try:
+                results = await self.runner(run_write_batch, [(func, args, kwargs) for func, args, kwargs, _ in batch])
+            except Exception as e:
+                logger.error(f"Write batch of {len(batch)} statements failed: {e}")
+                results = [(False, e)] * len(batch)
+
+            self.batches += 1
+            self.statements += len(batch)
+            self.last_batch = len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+            for (_, _, _, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+            for _ in batch:
+                self._queue.task_done()
+
+    async def close(self):
+        # Lets the writes already submitted reach the database before the loop goes away.
+        if self._task is None or self._task.done():
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'batches': self.batches,
+            'statements': self.statements,
+            'average_batch': self.statements / self.batches if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'last_batch': self.last_batch,
+        }
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+from collections import namedtuple
+
+import aiohttp
+import disnake
+
+log = logging.getLogger(__name__)
+
+MEDIA_DOWNLOAD_CONCURRENCY = 4
+MEDIA_CONNECTION_LIMIT = 8
+MEDIA_CHUNK_SIZE = 64 * 1024
+MEDIA_FILES_PER_MESSAGE = 10
+MEDIA_MAX_BYTES = 25 * 1024 * 1024
+MEDIA_RETRIES = 3
+MEDIA_TIMEOUT = aiohttp.ClientTimeout(total=120, sock_connect=10)
+
+DownloadedMedia = namedtuple("DownloadedMedia", "path filename size")
+
+
+class FileTooLarge(Exception):
+    pass
+
+
+def _retry_after(headers, attempt):
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return 2 ** attempt
+
+
+def pack_uploads(downloads, max_files=MEDIA_FILES_PER_MESSAGE, max_bytes=MEDIA_MAX_BYTES):
+    # Keeps transcript order; a new message starts when either limit would be exceeded.
+    batch, batch_size = [], 0
+    for media in downloads:
+        if batch and (len(batch) >= max_files or batch_size + media.size > max_bytes):
+            yield batch
+            batch, batch_size = [], 0
+        batch.append(media)
+        batch_size += media.size
+    if batch:
+        yield batch
+
+
+class MediaArchiver:
+    def __init__(self, concurrency=MEDIA_DOWNLOAD_CONCURRENCY, max_bytes=MEDIA_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._concurrency = concurrency
+        self._semaphore = None
+        self._session = None
+
+    async def session(self):
+        # One pooled session for the bot's lifetime instead of a new one per file.
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=MEDIA_CONNECTION_LIMIT),
+                                                  timeout=MEDIA_TIMEOUT)
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def download_all(self, items, directory, refresh_url=None):
+        # items are (message_id, attachment) pairs; refresh_url(message_id, filename) returns a
+        # fresh link when a stored one has expired.
+        await self.session()
+        results = await asyncio.gather(*(self._download(index, message_id, att, directory, refresh_url)
+                                         for index, (message_id, att) in enumerate(items)))
+        return [media for media in results if media is not None]
+
+    async def _download(self, index, message_id, att, directory, refresh_url):
+        if att.get("size") and att["size"] > self.max_bytes:
+            log.warning(f"Skipping attachment {att['filename']}: {att['size']} bytes is over the upload limit")
+            return None
+
+        path = os.path.join(directory, str(index))
+        url = att["url"]
+        async with self._semaphore:
+            for attempt in range(MEDIA_RETRIES + 1):
+                try:
+                    status, retry_after = await self._stream_to_file(url, path, attempt)
+                except FileTooLarge:
+                    log.warning(f"Skipping attachment {att['filename']}: over the upload limit")
+                    return None
+                except Exception as e:
+                    log.error(f"Error downloading attachment {url}: {e}")
+                    return None
+
+                if status == 200:
+                    return DownloadedMedia(path, att["filename"], os.path.getsize(path))
+                if status == 429 and attempt < MEDIA_RETRIES:
+                    await asyncio.sleep(retry_after)
+                    continue
+                if status in (403, 404) and refresh_url and url == att["url"]:
+                    # Attachment links captured long ago may have expired; the message carries a fresh one.
+                    url = await refresh_url(message_id, att["filename"])
+                    if url:
+                        continue
+                log.warning(f"Failed to download attachment {att['url']}, status: {status}")
+                return None
+        return None
+
+    async def _stream_to_file(self, url, path, attempt):
+        async with self._session.get(url) as resp:
+            if resp.status != 200:
+                return resp.status, _retry_after(resp.headers, attempt)
+            if resp.content_length and resp.content_length > self.max_bytes:
+                raise FileTooLarge()
+            written = 0
+            with open(path, "wb") as f:
+                async for chunk in resp.content.iter_chunked(MEDIA_CHUNK_SIZE):
+                    written += len(chunk)
+                    if written > self.max_bytes:
+                        raise FileTooLarge()
+                    f.write(chunk)
+            return resp.status, 0
+
+    async def upload(self, destination, downloads):
+        sent = 0
+        for batch in pack_uploads(downloads, max_bytes=self.max_bytes):
+            for attempt in range(MEDIA_RETRIES + 1):
+                try:
+                    # Files are reopened on every attempt because a send closes them.
+                    await destination.send(files=[disnake.File(media.path, filename=media.filename)
+                                                  for media in batch])
+                    sent += len(batch)
+                    break
+                except disnake.HTTPException as e:
+                    if e.status == 429 and attempt < MEDIA_RETRIES:
+                        await asyncio.sleep(_retry_after(e.response.headers, attempt))
+                        continue
+                    names = ", ".join(media.filename for media in batch)
+                    if e.status == 413:
+                        log.error(f"Failed to send attachments {names} to {destination.id}: Files are too large.")
+                    else:
+                        log.error(f"Failed to send attachments {names} to {destination.id}: {e}")
+                    break
+                except Exception as e:
+                    log.error(f"An unexpected error occurred while sending attachments to {destination.id}: {e}")
+                    break
+        return sent
+
+
+media_archiver = MediaArchiver()
@@ -2,27 +2,16 @@ import disnake
 from disnake import ui, Embed
 import io
 import logging
-import aiohttp
+import tempfile
 from configs.feedback_config import config, TEXTS, TICKET_COLORS
-from database.tickets import log_ticket_close, get_punishment_log_id_for_ticket
+from database.aio import log_ticket_close, get_punishment_log_id_for_ticket
+from webhook_manager import get_webhook, ticket_webhook_pool
+from .media import media_archiver
+from .transcript_capture import transcript_recorder, record_attachments, format_transcript_line
 
 log = logging.getLogger(__name__)
 
 
-async def get_webhook(channel, webhook_name):
-    if not webhook_name: return None
-    try:
-        webhooks = await channel.webhooks()
-        for webhook in webhooks:
-            if webhook.name == webhook_name:
-                return webhook
-    except disnake.Forbidden:
-        log.error(f"No permissions to get webhooks in {channel.name}")
-    except Exception as e:
-        log.error(f"Error getting webhooks in {channel.name}: {e}")
-    return None
-
-
 class ConfirmCloseModal(ui.View):
     def __init__(self, channel, opener, ticket_data, lang="en", ticket_db_id=None):
         super().__init__(timeout=60)
@@ -48,17 +37,24 @@ class ConfirmCloseModal(ui.View):
 
         closed_by = interaction.user
 
-        transcript, attachments = await self._collect_media_and_generate_transcript()
-        embed = self._create_embed(closed_by, interaction.guild.id)
+        # Media is streamed to disk and removed once it has been re-uploaded.
+        with tempfile.TemporaryDirectory(prefix="ticket-media-") as media_dir:
+            transcript, attachments = await self._collect_media_and_generate_transcript(media_dir)
+            embed = await self._create_embed(closed_by, interaction.guild.id)
 
-        message_link = await self._send_log_and_get_link(interaction, embed, transcript, attachments)
+            message_link = await self._send_log_and_get_link(interaction, embed, transcript, attachments)
 
         if message_link:
+            search_text = "\n".join([*map(str, self.ticket_data['content'].values()), transcript])
             try:
                 if self.ticket_db_id:
-                    log_ticket_close(self.ticket_db_id, message_link)
+                    await log_ticket_close(message_link, ticket_db_id=self.ticket_db_id,
+                                           search_text=search_text, transcript=transcript,
+                                           closed_by_discord_id=closed_by.id)
                 else:
-                    log_ticket_close(self.channel.id, message_link)
+                    await log_ticket_close(message_link, channel_id=self.channel.id,
+                                           search_text=search_text, transcript=transcript,
+                                           closed_by_discord_id=closed_by.id)
                     log.warning(
                         f"Could not find ticket_db_id for channel {self.channel.id}, logged close by channel_id.")
             except Exception as e:
@@ -70,6 +66,7 @@ class ConfirmCloseModal(ui.View):
             embed=disnake.Embed(description=self.texts["success"], color=disnake.Color.green()), ephemeral=True)
 
         try:
+            await ticket_webhook_pool.evacuate(self.channel)
             await self.channel.delete(reason=f"Ticket closed by {closed_by.display_name}")
         except disnake.NotFound:
             pass
@@ -86,46 +83,26 @@ class ConfirmCloseModal(ui.View):
         await interaction.response.edit_message(embed=embed, content=None, view=None)
         self.stop()
 
-    async def _collect_media_and_generate_transcript(self):
+    async def _collect_media_and_generate_transcript(self, media_dir):
         transcript_lines = []
-        attachments_to_upload = []
-
-        async for message in self.channel.history(limit=None, oldest_first=True):
-            content_part = ""
-            if message.content:
-                content_part = message.clean_content.replace('\n', ' ')
-            elif message.embeds:
-                embed = message.embeds[0]
-                content_part = f"[{embed.title or 'Embed'}]"
-                if embed.description:
-                    desc = ' '.join(embed.description.splitlines())
-                    content_part += f" {desc}"
-
-            attachment_part = ""
-            if message.attachments:
-                attachment_descriptions = [f"[File: {att.filename} | URL: {att.url}]" for att in message.attachments]
-                attachment_part = " ".join(attachment_descriptions)
-
-                for att in message.attachments:
-                    try:
-                        async with aiohttp.ClientSession() as session:
-                            async with session.get(att.url) as resp:
-                                if resp.status == 200:
-                                    file_bytes = await resp.read()
-                                    attachments_to_upload.append(
-                                        disnake.File(io.BytesIO(file_bytes), filename=att.filename)
-                                    )
-                                else:
-                                    log.warning(f"Failed to download attachment {att.url}, status: {resp.status}")
-                    except Exception as e:
-                        log.error(f"Error processing attachment {att.url}: {e}")
-
-            full_line = f"[{message.created_at.strftime('%Y-%m-%d %H:%M:%S')}] {message.author.display_name}: {content_part} {attachment_part}".strip()
-            transcript_lines.append(full_line)
-
-        return "\n".join(transcript_lines), attachments_to_upload
-
-    def _create_embed(self, closed_by, guild_id):
+        media_items = []
+
+        # Messages were captured as they arrived; only a gap left by downtime is crawled here.
+        for record in await transcript_recorder.messages_for(self.channel):
+            media_items.extend((record["message_id"], att) for att in record_attachments(record))
+            transcript_lines.append(format_transcript_line(record))
+
+        attachments = await media_archiver.download_all(media_items, media_dir, self._refresh_attachment_url)
+        return "\n".join(transcript_lines), attachments
+
+    async def _refresh_attachment_url(self, message_id, filename):
+        try:
+            message = await self.channel.fetch_message(message_id)
+        except disnake.HTTPException:
+            return None
+        return next((att.url for att in message.attachments if att.filename == filename), None)
+
+    async def _create_embed(self, closed_by, guild_id):
         texts = TEXTS[self.lang]["modals"]["embed_titles"]
         ticket_type = self.ticket_data['type']
 
@@ -147,7 +124,7 @@ class ConfirmCloseModal(ui.View):
 
         if self.ticket_db_id:
             try:
-                log_message_id = get_punishment_log_id_for_ticket(self.ticket_db_id)
+                log_message_id = await get_punishment_log_id_for_ticket(self.ticket_db_id)
                 if log_message_id:
                     punishments_channel_id = config.channels["channels"]["📌│punishments"]["id"]
                     log_url = f"https://discord.com/channels/{guild_id}/{punishments_channel_id}/{log_message_id}"
@@ -204,20 +181,9 @@ class ConfirmCloseModal(ui.View):
 
                 if thread:
                     log.info(f"Created thread '{thread.name}' for {len(attachments)} attachments.")
-                    for attachment_file in attachments:
-                        try:
-                            attachment_file.fp.seek(0)
-                            await thread.send(file=attachment_file)
-                        except disnake.HTTPException as e:
-                            if e.status == 413:
-                                log.error(
-                                    f"Failed to send attachment {attachment_file.filename} to thread {thread.id}: File is too large (over 25MB).")
-                            else:
-                                log.error(
-                                    f"Failed to send attachment {attachment_file.filename} to thread {thread.id}: {e}")
-                        except Exception as e:
-                            log.error(
-                                f"An unexpected error occurred while sending attachment {attachment_file.filename} to thread {thread.id}: {e}")
+                    sent = await media_archiver.upload(thread, attachments)
+                    if sent < len(attachments):
+                        log.warning(f"Only {sent} of {len(attachments)} attachments reached thread {thread.id}.")
 
             return message.jump_url
         except Exception as e:
@@ -2,8 +2,9 @@ import disnake
 import logging
 from datetime import timedelta
 
-from database.punishments import add_punishment, revoke_punishment
-from database.core import create_user, count_active_warns, get_user_internal_id
+from database.aio import (
+    add_punishment, apply_punishment_transaction, revoke_punishment
+)
 from .constants import (
     DEFAULT_BAN_SECONDS, DEFAULT_MUTE_SECONDS, DEFAULT_VOICE_MUTE_SECONDS,
     DEFAULT_BLACKLIST_SECONDS, DEFAULT_WARN_DURATION_SECONDS, WARNS_UNTIL_ACTION,
@@ -14,6 +15,15 @@ from .helpers import clear_user_messages
 log = logging.getLogger(__name__)
 
 
+async def _track_expiry(inter, punishment_id):
+    scheduler = getattr(inter.bot, "expiry_scheduler", None)
+    if scheduler and punishment_id:
+        try:
+            await scheduler.track(punishment_id)
+        except Exception as e:
+            log.error(f"Failed to schedule expiry for punishment {punishment_id}: {e}")
+
+
 async def apply_punishment(inter, offender, action, duration_delta, reason, delete_days, moderation_roles,
                            ticket_db_id):
     deleted_count = 0
@@ -27,26 +37,23 @@ async def apply_punishment(inter, offender, action, duration_delta, reason, dele
     try:
         if action == "warn":
             duration_seconds = int(duration_delta.total_seconds()) if duration_delta else DEFAULT_WARN_DURATION_SECONDS
-            user_internal_id = get_user_internal_id("discord", offender.id) or create_user(discord_id=offender.id)
-
-            status_db, punishment_id = add_punishment("discord", offender.id, inter.author.id, reason, "warn", duration_seconds,
-                                                ticket_id=ticket_db_id)
-
-            current_warns = count_active_warns(user_internal_id)
-
-            if current_warns > 0 and current_warns % WARNS_UNTIL_ACTION == 0:
-                multiplier = current_warns // WARNS_UNTIL_ACTION
-                auto_action_duration_seconds = ACTION_ON_WARN_DURATION_SECONDS * multiplier
-
-                auto_action_reason = f"Automatic punishment (Level {multiplier}) for reaching {current_warns} warnings."
-                auto_action = ACTION_ON_WARN_LIMIT
-                auto_action_role = inter.guild.get_role(moderation_roles.get(auto_action))
-
+            result = await apply_punishment_transaction(
+                "discord", offender.id, inter.author.id, reason, "warn", duration_seconds, ticket_id=ticket_db_id,
+                warns_until_action=WARNS_UNTIL_ACTION, action_on_warn_limit=ACTION_ON_WARN_LIMIT,
+                action_on_warn_duration_seconds=ACTION_ON_WARN_DURATION_SECONDS
+            )
+            punishment_id = result['punishment_id']
+            await _track_expiry(inter, punishment_id)
+
+            escalation = result['escalation']
+            if escalation:
+                auto_action_role = inter.guild.get_role(moderation_roles.get(ACTION_ON_WARN_LIMIT))
                 if auto_action_role:
-                    await offender.add_roles(auto_action_role, reason=auto_action_reason)
+                    await offender.add_roles(auto_action_role, reason=escalation['reason'])
 
-                status_db, punishment_id = add_punishment("discord", offender.id, inter.author.id, auto_action_reason, auto_action,
-                               auto_action_duration_seconds, ticket_id=ticket_db_id)
+                if escalation['punishment_id']:
+                    punishment_id = escalation['punishment_id']
+                    await _track_expiry(inter, punishment_id)
 
                 return 'SUCCESS_WARN_AND_PUNISH', deleted_count, punishment_id
             else:
@@ -63,18 +70,19 @@ async def apply_punishment(inter, offender, action, duration_delta, reason, dele
 
         if action == "kick":
             await offender.kick(reason=reason)
-            status_db, punishment_id = add_punishment("discord", offender.id, inter.author.id, reason, "kick", ticket_id=ticket_db_id)
+            status_db, punishment_id = await add_punishment("discord", offender.id, inter.author.id, reason, "kick", ticket_id=ticket_db_id)
         elif action == "blacklist":
             await inter.guild.ban(offender, reason=reason, delete_message_days=0)
-            status_db, punishment_id = add_punishment("discord", offender.id, inter.author.id, reason, "blacklist", duration_seconds,
+            status_db, punishment_id = await add_punishment("discord", offender.id, inter.author.id, reason, "blacklist", duration_seconds,
                                        ticket_id=ticket_db_id)
         else:
             if role:
                 await offender.add_roles(role, reason=reason)
-            status_db, punishment_id = add_punishment("discord", offender.id, inter.author.id, reason, action, duration_seconds,
+            status_db, punishment_id = await add_punishment("discord", offender.id, inter.author.id, reason, action, duration_seconds,
                                        ticket_id=ticket_db_id)
 
         if status_db == 'ADDED':
+            await _track_expiry(inter, punishment_id)
             return 'SUCCESS', deleted_count, punishment_id
         elif status_db == 'SKIPPED':
             return 'ALREADY_LONGER', deleted_count, None
@@ -88,7 +96,7 @@ async def apply_punishment(inter, offender, action, duration_delta, reason, dele
 
 async def apply_revocation(inter, user_to_revoke, action, reason, moderation_roles):
     try:
-        success_db = revoke_punishment(
+        success_db = await revoke_punishment(
             platform="discord", main_user_id=user_to_revoke.id,
             revoked_by_id=inter.author.id, reason=reason, action_type=action
         )
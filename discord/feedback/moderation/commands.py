@@ -5,12 +5,11 @@ import re
 from datetime import timedelta
 
 from .constants import *
-from .helpers import get_webhook_for_channel, get_webhook, parse_duration, find_offender_in_ticket, has_permission
+from .helpers import get_webhook, parse_duration, find_offender_in_ticket, has_permission
 from .views import ConfirmPunishmentView, ConfirmRevokeView
 from .actions import apply_punishment, apply_revocation
-from database.core import check_ticket_has_punishment
-from database.tickets import get_ticket_db_id_by_channel
-from database.punishments import update_punishment_log_id
+from database.aio import check_ticket_has_punishment, get_ticket_db_id_by_channel, update_punishment_log_id
+from webhook_manager import ticket_webhook_pool
 
 log = logging.getLogger(__name__)
 
@@ -50,7 +49,7 @@ def setup_moderation_commands(bot, channels_config, roles_config):
         offender = None
         try:
             offender_id = int(clean_tag)
-            offender = await inter.guild.fetch_member(offender_id)
+            offender = inter.guild.get_member(offender_id) or await inter.guild.fetch_member(offender_id)
         except (ValueError, disnake.NotFound):
             offender = inter.guild.get_member_named(clean_tag)
         if not offender:
@@ -68,11 +67,11 @@ def setup_moderation_commands(bot, channels_config, roles_config):
             except ValueError as e:
                 return await inter.response.send_message(f"❌ Format error: {e}\nExample: `7d 3h 30m`", ephemeral=True)
 
-        ticket_db_id = get_ticket_db_id_by_channel(inter.channel.id)
+        ticket_db_id = await get_ticket_db_id_by_channel(inter.channel.id)
         if not ticket_db_id:
             log.warning(f"Could not find ticket in DB for channel {inter.channel.id}. Punishment will not be linked.")
 
-        if check_ticket_has_punishment(ticket_db_id):
+        if await check_ticket_has_punishment(ticket_db_id):
             return await inter.response.send_message(
                 "❌ A punishment has already been issued in this ticket. Only one punishment is allowed per ticket.",
                 ephemeral=True
@@ -111,9 +110,7 @@ def setup_moderation_commands(bot, channels_config, roles_config):
             delete_days=delete_days, moderation_roles=moderation_roles, ticket_db_id=ticket_db_id
         )
 
-        webhook = await get_webhook_for_channel(inter.channel, channels_config, "❓│Помощь / Support")
-        if not webhook:
-            return await inter.response.send_message("❌ Could not get a webhook for this channel.", ephemeral=True)
+        webhook = ticket_webhook_pool.sender(inter.channel)
 
         await inter.response.send_message("⏳ Waiting for punishment confirmation...", ephemeral=True)
         confirmation_msg = await webhook.send(embed=embed, view=view, wait=True)
@@ -186,7 +183,7 @@ def setup_moderation_commands(bot, channels_config, roles_config):
                         response_embed.description += f"\n**[View Log]({punishment_log_msg.jump_url})**"
                         if punishment_id:
                             try:
-                                update_punishment_log_id(punishment_id, punishment_log_msg.id)
+                                await update_punishment_log_id(punishment_id, punishment_log_msg.id)
                             except Exception as e:
                                 log.error(f"Failed to update log_message_id for punishment {punishment_id}: {e}")
 
@@ -210,7 +207,8 @@ def setup_moderation_commands(bot, channels_config, roles_config):
                                                    color=disnake.Color.red()))
         finally:
             try:
-                await confirmation_msg.delete()
+                # The pooled webhook may point elsewhere by now, so the message is deleted through the channel.
+                await inter.channel.get_partial_message(confirmation_msg.id).delete()
             except disnake.NotFound:
                 pass
 
@@ -260,9 +258,7 @@ def setup_moderation_commands(bot, channels_config, roles_config):
             reason=reason, moderation_roles=moderation_roles
         )
 
-        webhook = await get_webhook_for_channel(inter.channel, channels_config, "❓│Помощь / Support")
-        if not webhook:
-            return await inter.response.send_message("❌ Could not get a webhook for this channel.", ephemeral=True)
+        webhook = ticket_webhook_pool.sender(inter.channel)
 
         await inter.response.send_message("⏳ Waiting for revocation confirmation...", ephemeral=True)
         confirmation_msg = await webhook.send(embed=embed, view=view, wait=True)
@@ -321,7 +317,8 @@ def setup_moderation_commands(bot, channels_config, roles_config):
                                                    color=disnake.Color.red()))
         finally:
             try:
-                await confirmation_msg.delete()
+                # The pooled webhook may point elsewhere by now, so the message is deleted through the channel.
+                await inter.channel.get_partial_message(confirmation_msg.id).delete()
             except disnake.NotFound:
                 pass
 
@@ -503,15 +500,10 @@ def setup_moderation_commands(bot, channels_config, roles_config):
             return await inter.response.send_message("❌ An error occurred while trying to update channel permissions.",
                                                      ephemeral=True)
 
-        webhook = await get_webhook_for_channel(inter.channel, channels_config, "❓│Помощь / Support")
-
         invite_embed = disnake.Embed(
             description=f"👋 {member.mention} has been invited to this ticket by {inter.author.mention}.",
             color=disnake.Color.blue()
         )
-        if webhook:
-            await webhook.send(embed=invite_embed)
-        else:
-            await inter.channel.send(embed=invite_embed)
+        await ticket_webhook_pool.send(inter.channel, embed=invite_embed)
 
         await inter.response.send_message(f"✅ Successfully invited {member.mention} to this ticket.", ephemeral=True)
\ No newline at end of file
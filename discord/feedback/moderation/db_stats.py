@@ -0,0 +1,57 @@
+import disnake
+from disnake.ext import commands
+import logging
+
+from .helpers import has_permission
+from database.aio import write_queue
+from database.metrics import SLOW_QUERY_MS, snapshot, reset as reset_query_stats
+
+log = logging.getLogger(__name__)
+
+MAX_CALLERS = 10
+
+
+def build_stats_embed(stats, queue_stats):
+    embed = disnake.Embed(title="🗄️ Database query stats", color=disnake.Color.dark_teal())
+    embed.set_footer(text=f"Slow query threshold: {SLOW_QUERY_MS}ms. Percentiles are bucket upper bounds.")
+
+    if not stats:
+        embed.description = "No queries recorded since the last reset."
+    for entry in stats[:MAX_CALLERS]:
+        embed.add_field(
+            name=entry["caller"][:256],
+            value=(f"{entry['statements']} stmts, {entry['total_ms']:.1f}ms total\n"
+                   f"mean {entry['mean_ms']:.2f}ms · p50 ≤{entry['p50_ms']}ms · p99 ≤{entry['p99_ms']}ms · "
+                   f"max {entry['max_ms']:.1f}ms\n"
+                   f"{entry['rows']} rows in {entry['fetch_ms']:.1f}ms · lock wait {entry['lock_wait_ms']:.1f}ms"),
+            inline=False
+        )
+
+    embed.add_field(
+        name="Write queue",
+        value=(f"depth {queue_stats['queue_depth']} · {queue_stats['batches']} batches · "
+               f"{queue_stats['statements']} writes · avg {queue_stats['average_batch']:.1f} · "
+               f"largest {queue_stats['largest_batch']}"),
+        inline=False
+    )
+    return embed
+
+
+def setup_db_stats_command(bot, roles_config):
+    @bot.slash_command(
+        name="dbstats",
+        description="Shows per-caller database timings."
+    )
+    async def dbstats(
+            inter: disnake.ApplicationCommandInteraction,
+            reset: bool = commands.Param(default=False, description="Clear the counters after showing them")
+    ):
+        if not has_permission(inter.author, "dbstats", roles_config):
+            return await inter.response.send_message("❌ Insufficient permissions for this action!", ephemeral=True)
+
+        stats = snapshot()
+        if reset:
+            reset_query_stats()
+            log.info(f"Database query stats reset by {inter.author}.")
+
+        await inter.response.send_message(embed=build_stats_embed(stats, write_queue.stats()), ephemeral=True)
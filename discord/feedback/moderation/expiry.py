@@ -0,0 +1,175 @@
+import asyncio
+import heapq
+import logging
+import time
+
+import disnake
+
+from database.aio import get_pending_expirations, get_action_expiration, get_active_action_ids, expire_actions
+
+log = logging.getLogger(__name__)
+
+ROLE_ACTIONS = {"mute": "mute", "ban": "ban", "voice_mute": "voice-mute"}
+EXPIRY_RETRY_BASE_SECONDS = 30
+EXPIRY_RETRY_MAX_SECONDS = 3600
+
+
+class PunishmentExpiryScheduler:
+    def __init__(self, bot, guild_id, moderation_roles):
+        self.bot = bot
+        self.guild_id = guild_id
+        self.moderation_roles = moderation_roles
+        self._heap = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+        # action id -> failed lift attempts, for the retry backoff.
+        self._failures = {}
+
+    async def start(self):
+        if self._task and not self._task.done():
+            return
+
+        pending = await get_pending_expirations()
+        now = time.time()
+        overdue = [entry for entry in pending if entry["expires_at"] <= now]
+        self._heap = [(entry["expires_at"], entry["id"], entry) for entry in pending if entry["expires_at"] > now]
+        heapq.heapify(self._heap)
+        log.info(f"Loaded {len(self._heap)} upcoming expirations, {len(overdue)} missed while offline.")
+
+        if overdue:
+            await self._expire(overdue)
+
+        self._task = self.bot.loop.create_task(self._run())
+
+    async def track(self, action_id):
+        if not action_id:
+            return
+        entry = await get_action_expiration(action_id)
+        if entry:
+            self.schedule(entry)
+
+    def schedule(self, entry):
+        is_earliest = not self._heap or entry["expires_at"] < self._heap[0][0]
+        heapq.heappush(self._heap, (entry["expires_at"], entry["id"], entry))
+        if is_earliest:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                self._wakeup.clear()
+                if not self._heap:
+                    await self._wakeup.wait()
+                    continue
+
+                delay = self._heap[0][0] - time.time()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap)[2])
+                await self._expire(due)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Error in punishment expiry loop: {e}", exc_info=True)
+                await asyncio.sleep(5)
+
+    async def _expire(self, entries):
+        # Rows are only deactivated once the Discord side is lifted; otherwise a failed lift
+        # would never be retried and the role or ban would stay forever.
+        guild = self.bot.get_guild(self.guild_id)
+        if not guild:
+            log.warning(f"Guild {self.guild_id} not found, retrying {len(entries)} expirations later.")
+            for entry in entries:
+                self._retry(entry)
+            return
+
+        try:
+            active = await get_active_action_ids([entry["id"] for entry in entries])
+        except Exception as e:
+            log.error(f"Failed to re-check {len(entries)} due expirations: {e}")
+            for entry in entries:
+                self._retry(entry)
+            return
+
+        lifted = []
+        for entry in entries:
+            # Revoked or already expired in the meantime: nothing left to lift.
+            if entry["id"] not in active:
+                self._failures.pop(entry["id"], None)
+                continue
+            try:
+                if entry["discord_id"]:
+                    await self._lift(guild, entry)
+            except Exception as e:
+                log.error(f"Failed to lift expired {entry['action_type']} (action {entry['id']}): {e}")
+                self._retry(entry)
+                continue
+            lifted.append(entry)
+
+        if not lifted:
+            return
+        try:
+            await expire_actions([entry["id"] for entry in lifted])
+        except Exception as e:
+            # Lifting again is harmless, so the whole group is retried.
+            log.error(f"Failed to mark {len(lifted)} lifted punishments as expired: {e}")
+            for entry in lifted:
+                self._retry(entry)
+            return
+        for entry in lifted:
+            self._failures.pop(entry["id"], None)
+
+    def _retry(self, entry):
+        attempts = self._failures.get(entry["id"], 0) + 1
+        self._failures[entry["id"]] = attempts
+        delay = min(EXPIRY_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EXPIRY_RETRY_MAX_SECONDS)
+        self.schedule({**entry, "expires_at": time.time() + delay})
+
+    async def _lift(self, guild, entry):
+        action_type = entry["action_type"]
+        user_id = entry["discord_id"]
+        reason = f"Punishment expired (action {entry['id']})"
+
+        if action_type == "blacklist":
+            try:
+                await guild.unban(disnake.Object(id=user_id), reason=reason)
+                log.info(f"Unbanned user {user_id}: blacklist expired.")
+            except disnake.NotFound:
+                log.warning(f"Blacklist for user {user_id} expired but they were not banned.")
+            return
+
+        role_key = ROLE_ACTIONS.get(action_type)
+        if not role_key:
+            return
+
+        role_id = self.moderation_roles.get(role_key)
+        role = guild.get_role(role_id) if role_id else None
+        if not role:
+            return
+
+        member = guild.get_member(user_id)
+        if not member:
+            try:
+                member = await guild.fetch_member(user_id)
+            except disnake.NotFound:
+                return
+
+        if role in member.roles:
+            await member.remove_roles(role, reason=reason)
+            log.info(f"Removed {role_key} role from {member.display_name}: punishment expired.")
+
+
+async def setup_punishment_expiry(bot, roles_config, guild_id):
+    scheduler = getattr(bot, "expiry_scheduler", None)
+    if scheduler is None:
+        scheduler = PunishmentExpiryScheduler(bot, guild_id, roles_config.get("moderation_roles", {}))
+        bot.expiry_scheduler = scheduler
+    await scheduler.start()
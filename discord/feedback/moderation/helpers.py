@@ -3,32 +3,10 @@ import re
 import logging
 from datetime import datetime, timedelta
 
-log = logging.getLogger(__name__)
-
-
-async def get_webhook_for_channel(channel, config, category_name):
-    try:
-        webhook_config = config["categories"][category_name]["webhook"]
-        webhook_name = webhook_config.get("name")
-        webhooks = await channel.webhooks()
-        webhook = disnake.utils.get(webhooks, name=webhook_name)
-        if webhook:
-            return webhook
-        avatar_path = webhook_config.get("avatar")
-        avatar_bytes = None
-        if avatar_path:
-            with open(avatar_path, "rb") as f:
-                avatar_bytes = f.read()
-        return await channel.create_webhook(name=webhook_name, avatar=avatar_bytes)
-    except Exception as e:
-        log.error(f"Failed to get or create webhook in {channel.name}: {e}")
-        return None
+from webhook_manager import get_webhook
+from database.aio import get_ticket_by_channel
 
-
-async def get_webhook(channel, webhook_name):
-    if not webhook_name: return None
-    webhooks = await channel.webhooks()
-    return disnake.utils.get(webhooks, name=webhook_name)
+log = logging.getLogger(__name__)
 
 
 def parse_duration(duration_str: str) -> timedelta:
@@ -48,14 +26,36 @@ def parse_duration(duration_str: str) -> timedelta:
     return timedelta(seconds=total_seconds)
 
 
-async def find_offender_in_ticket(channel: disnake.TextChannel):
+PLATFORM_FIELD_NAMES = ("Platform", "Платформа")
+
+
+def _context_from_record(record):
+    platform, _, ticket_type = record["ticket_type"].partition("-")
+    form_data = record["form_data"] or {}
+    offender = form_data.get("offender")
+    # A Discord offender resolved when the ticket was opened beats the tag typed into the form.
+    if platform.lower() == "discord" and record["offender_identifier"]:
+        offender = record["offender_identifier"]
+    return {
+        "ticket_db_id": record["id"],
+        "ticket_type": ticket_type,
+        "platform": platform.lower(),
+        "lang": record["lang"],
+        "opener": str(record["opener_discord_id"]) if record["opener_discord_id"] else None,
+        "offender": offender,
+        "title": record["title"],
+        "form_data": form_data,
+    }
+
+
+async def _context_from_embed(channel, ticket_db_id):
     try:
         message = await channel.history(limit=1, oldest_first=True).next()
     except (disnake.NoMoreItems, disnake.NotFound):
         log.warning(f"Could not find the initial message in ticket channel {channel.id}")
-        return None, None
+        return None
     if not message.embeds:
-        return None, None
+        return None
 
     embed = message.embeds[0]
 
@@ -66,18 +66,37 @@ async def find_offender_in_ticket(channel: disnake.TextChannel):
             key, value = part.split(":", 1)
             metadata[key.strip()] = value.strip()
 
-    offender_tag = None
-    for field in embed.fields:
-        if field.name.lower() == "offender":
-            offender_tag = field.value
-            break
+    platform_field = next((field for field in embed.fields if field.name in PLATFORM_FIELD_NAMES), None)
+    offender_tag = next((field.value for field in embed.fields if field.name.lower() == "offender"), None)
+    return {
+        "ticket_db_id": ticket_db_id,
+        "ticket_type": metadata.get("ticket_type"),
+        "platform": platform_field.value.lower() if platform_field else None,
+        "lang": metadata.get("lang"),
+        "opener": metadata.get("opener"),
+        "offender": offender_tag,
+        "title": embed.title,
+        "form_data": {field.name: field.value for field in embed.fields if field.name not in PLATFORM_FIELD_NAMES},
+    }
 
-    opener_id = metadata.get("opener")
 
-    if metadata.get("ticket_type") == "Appeal":
-        return opener_id, metadata
+async def get_ticket_context(channel: disnake.TextChannel):
+    record = await get_ticket_by_channel(channel.id)
+    if record and record["lang"]:
+        return _context_from_record(record)
+    # Tickets opened before their metadata was stored only have it in the first embed.
+    return await _context_from_embed(channel, record["id"] if record else None)
+
+
+async def find_offender_in_ticket(channel: disnake.TextChannel):
+    context = await get_ticket_context(channel)
+    if not context:
+        return None, None
+
+    if context["ticket_type"] == "Appeal":
+        return context["opener"], context
 
-    return offender_tag or opener_id, metadata
+    return context["offender"] or context["opener"], context
 
 
 def has_permission(member, action, roles_config):
@@ -0,0 +1,70 @@
+import disnake
+from disnake.ext import commands
+import logging
+
+from .helpers import has_permission
+from database.aio import get_moderator_leaderboard, get_moderator_activity, get_user_internal_id
+
+log = logging.getLogger(__name__)
+
+
+def _moderator_label(row):
+    if row["discord_id"]:
+        return f"<@{row['discord_id']}>"
+    return f"`{row['mindustry_id']}`"
+
+
+def build_leaderboard_embed(rows, days):
+    embed = disnake.Embed(title=f"📊 Moderator activity, last {days} day(s)", color=disnake.Color.blurple())
+    if not rows:
+        embed.description = "No moderation activity in this period."
+        return embed
+
+    embed.description = "\n".join(
+        f"**{position}.** {_moderator_label(row)} — {row['punishments']} punishments · "
+        f"{row['revocations']} revocations · {row['tickets_closed']} tickets closed"
+        for position, row in enumerate(rows, start=1)
+    )
+    return embed
+
+
+def build_moderator_embed(member, activity, days):
+    embed = disnake.Embed(title=f"📊 {member.display_name}, last {days} day(s)", color=disnake.Color.blurple())
+    embed.add_field(name="Punishments", value=str(activity["punishments"]), inline=True)
+    embed.add_field(name="Revocations", value=str(activity["revocations"]), inline=True)
+    embed.add_field(name="Tickets closed", value=str(activity["tickets_closed"]), inline=True)
+
+    breakdown = [f"{metric.replace('_', ' ')}: {count}" for metric, count in sorted(activity["by_metric"].items())]
+    if breakdown:
+        embed.add_field(name="Breakdown", value="\n".join(breakdown), inline=False)
+    return embed
+
+
+def setup_modstats_command(bot, roles_config):
+    @bot.slash_command(
+        name="modstats",
+        description="Shows moderator activity from the daily and weekly rollups."
+    )
+    async def modstats(
+            inter: disnake.ApplicationCommandInteraction,
+            moderator: disnake.Member = commands.Param(default=None,
+                                                       description="Show one moderator instead of the leaderboard"),
+            days: int = commands.Param(default=7, ge=1, le=365, description="How many days back to count")
+    ):
+        if not has_permission(inter.author, "modstats", roles_config):
+            return await inter.response.send_message("❌ Insufficient permissions for this action!", ephemeral=True)
+
+        await inter.response.defer(ephemeral=True)
+        try:
+            if moderator is None:
+                embed = build_leaderboard_embed(await get_moderator_leaderboard(days), days)
+            else:
+                internal_id = await get_user_internal_id('discord', moderator.id)
+                activity = await get_moderator_activity(internal_id, days) if internal_id else {
+                    "punishments": 0, "revocations": 0, "tickets_closed": 0, "by_metric": {}}
+                embed = build_moderator_embed(moderator, activity, days)
+        except Exception as e:
+            log.error(f"Failed to load moderator activity: {e}")
+            return await inter.edit_original_response(content="❌ Could not load moderator activity.")
+
+        await inter.edit_original_response(embed=embed)
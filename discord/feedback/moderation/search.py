@@ -0,0 +1,103 @@
+import disnake
+from disnake.ext import commands
+from disnake.ui import View, Button
+import logging
+
+from .helpers import has_permission
+from database.aio import search_cases
+
+log = logging.getLogger(__name__)
+
+
+def _jump_link(guild_id, channel_id, message_id):
+    return f"https://discord.com/channels/{guild_id}/{channel_id}/{message_id}"
+
+
+def build_results_embed(query, results, page, guild_id, channels_config):
+    punishments_channel_id = channels_config["channels"]["📌│punishments"]["id"]
+    closed_tickets_channel_id = channels_config["channels"]["📌│closed-tickets"]["id"]
+
+    embed = disnake.Embed(title=f"🔎 Search: {query}"[:256], color=disnake.Color.blurple())
+    if not results:
+        embed.description = "No matches found." if page == 0 else "No more results."
+        return embed
+
+    for result in results:
+        links = []
+        if result["kind"] == "action":
+            # Only ticket numbers are accepted by /transcript, so the action id is labelled as such.
+            name = f"{result['action_type'].capitalize()} (action {result['ref_id']})"
+            if result["ticket_id"]:
+                name += f" · ticket #{result['ticket_id']}"
+            timestamp = result["action_time"]
+            if result["action_log_message_id"]:
+                links.append(f"[Punishment Log]({_jump_link(guild_id, punishments_channel_id, result['action_log_message_id'])})")
+        else:
+            name = f"{result['ticket_type'] or 'Ticket'} ticket #{result['ref_id']}"
+            timestamp = result["ticket_created_at"]
+        if result["ticket_log_message_id"]:
+            links.append(f"[Ticket Log]({_jump_link(guild_id, closed_tickets_channel_id, result['ticket_log_message_id'])})")
+
+        value = result["snippet"] or "—"
+        if timestamp:
+            value = f"<t:{timestamp}:d> {value}"
+        if links:
+            value += "\n" + " · ".join(links)
+        embed.add_field(name=name, value=value[:1024], inline=False)
+
+    embed.set_footer(text=f"Page {page + 1}")
+    return embed
+
+
+class SearchResultsView(View):
+    def __init__(self, author_id, query, channels_config, has_more):
+        super().__init__(timeout=300)
+        self.author_id = author_id
+        self.query = query
+        self.channels_config = channels_config
+        self.page = 0
+        self._update_buttons(has_more)
+
+    def _update_buttons(self, has_more):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = not has_more
+
+    async def _show_page(self, inter, page):
+        if inter.author.id != self.author_id:
+            return await inter.response.send_message("❌ This search belongs to someone else.", ephemeral=True)
+        results, has_more = await search_cases(self.query, page)
+        self.page = page
+        self._update_buttons(has_more)
+        embed = build_results_embed(self.query, results, page, inter.guild.id, self.channels_config)
+        await inter.response.edit_message(embed=embed, view=self)
+
+    @disnake.ui.button(label="Previous", style=disnake.ButtonStyle.secondary)
+    async def previous_page(self, button: Button, inter: disnake.MessageInteraction):
+        await self._show_page(inter, max(self.page - 1, 0))
+
+    @disnake.ui.button(label="Next", style=disnake.ButtonStyle.secondary)
+    async def next_page(self, button: Button, inter: disnake.MessageInteraction):
+        await self._show_page(inter, self.page + 1)
+
+
+def setup_search_command(bot, channels_config, roles_config):
+    @bot.slash_command(
+        name="search",
+        description="Full-text search over punishment reasons and closed ticket content."
+    )
+    async def search(
+            inter: disnake.ApplicationCommandInteraction,
+            query: str = commands.Param(description="Words to look for", max_length=200)
+    ):
+        if not has_permission(inter.author, "search", roles_config):
+            return await inter.response.send_message("❌ Insufficient permissions for this action!", ephemeral=True)
+
+        try:
+            results, has_more = await search_cases(query)
+        except Exception as e:
+            log.error(f"Search for '{query}' failed: {e}")
+            return await inter.response.send_message("❌ Search failed.", ephemeral=True)
+
+        embed = build_results_embed(query, results, 0, inter.guild.id, channels_config)
+        view = SearchResultsView(inter.author.id, query, channels_config, has_more)
+        await inter.response.send_message(embed=embed, view=view, ephemeral=True)
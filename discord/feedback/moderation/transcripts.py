@@ -0,0 +1,35 @@
+import disnake
+from disnake.ext import commands
+import io
+import logging
+
+from .helpers import has_permission
+from database.aio import get_ticket_transcript
+
+log = logging.getLogger(__name__)
+
+
+def setup_transcript_command(bot, roles_config):
+    @bot.slash_command(
+        name="transcript",
+        description="Retrieves the archived transcript of a closed ticket."
+    )
+    async def transcript(
+            inter: disnake.ApplicationCommandInteraction,
+            ticket_id: int = commands.Param(description="Ticket number, as shown by /search", ge=1)
+    ):
+        if not has_permission(inter.author, "search", roles_config):
+            return await inter.response.send_message("❌ Insufficient permissions for this action!", ephemeral=True)
+
+        try:
+            text = await get_ticket_transcript(ticket_id)
+        except Exception as e:
+            log.error(f"Failed to load transcript for ticket {ticket_id}: {e}")
+            return await inter.response.send_message("❌ Could not read the transcript archive.", ephemeral=True)
+
+        if text is None:
+            return await inter.response.send_message(f"❌ No archived transcript for ticket #{ticket_id}.",
+                                                     ephemeral=True)
+
+        transcript_file = disnake.File(io.BytesIO(text.encode('utf-8-sig')), filename=f"transcript_{ticket_id}.txt")
+        await inter.response.send_message(f"📄 Transcript of ticket #{ticket_id}", file=transcript_file, ephemeral=True)
@@ -8,7 +8,7 @@ from configs.feedback_config import config, TEXTS, TICKET_COLORS
 from .views import FeedbackView
 from .modals import ConfirmCloseModal
 from .moderation.helpers import find_offender_in_ticket
-from database.tickets import get_ticket_db_id_by_channel
+from webhook_manager import get_webhook, webhook_registry
 
 log = logging.getLogger(__name__)
 
@@ -16,19 +16,6 @@ user_states = {}
 last_cleanup = time.time()
 
 
-async def get_webhook(channel, webhook_name):
-    try:
-        webhooks = await channel.webhooks()
-        for webhook in webhooks:
-            if webhook.name == webhook_name:
-                return webhook
-    except disnake.Forbidden:
-        log.error(f"No permissions to get webhooks in {channel.name}")
-    except Exception as e:
-        log.error(f"Error getting webhooks in {channel.name}: {e}")
-    return None
-
-
 def has_close_permission(member, permission_key, roles_config):
     for role in member.roles:
         role_id = role.id
@@ -52,19 +39,19 @@ async def setup_feedback_channel(bot, channels_config, roles_config, guild_id):
 
         channel = interaction.channel
 
-        offender_tag, metadata = await find_offender_in_ticket(channel)
+        offender_tag, context = await find_offender_in_ticket(channel)
 
         texts_en = TEXTS["en"]["setup"]["errors"]
         texts_ru = TEXTS["ru"]["setup"]["errors"]
 
-        if not metadata:
+        if not context:
             await interaction.followup.send(texts_ru.get("invalid_metadata", texts_en["invalid_metadata"]),
                                             ephemeral=True)
             return
 
-        ticket_type = metadata.get("ticket_type")
-        lang = metadata.get("lang")
-        opener_id_str = metadata.get("opener")
+        ticket_type = context["ticket_type"]
+        lang = context["lang"]
+        opener_id_str = context["opener"]
 
         if not all([ticket_type, lang, opener_id_str]):
             await interaction.followup.send(texts_ru.get("invalid_metadata", texts_en["invalid_metadata"]),
@@ -74,17 +61,10 @@ async def setup_feedback_channel(bot, channels_config, roles_config, guild_id):
         opener_id = int(opener_id_str)
         texts = TEXTS.get(lang, TEXTS["en"])
 
-        message = await channel.fetch_message(interaction.message.id)
-        if not message.embeds:
-            await interaction.followup.send(texts_ru.get("ticket_info", texts_en["ticket_info"]), ephemeral=True)
-            return
-        embed = message.embeds[0]
-
-        platform_field = next((field for field in embed.fields if field.name in ["Platform", "Платформа"]), None)
-        if not platform_field:
+        platform = context["platform"]
+        if not platform:
             await interaction.followup.send(texts["setup"]["errors"]["platform"], ephemeral=True)
             return
-        platform = platform_field.value.lower()
 
         is_opener = interaction.author.id == opener_id
         permission_key = f"{platform.capitalize()}-{ticket_type}"
@@ -99,7 +79,7 @@ async def setup_feedback_channel(bot, channels_config, roles_config, guild_id):
             offender = None
             try:
                 offender_id = int(clean_tag)
-                offender = await interaction.guild.fetch_member(offender_id)
+                offender = interaction.guild.get_member(offender_id) or await interaction.guild.fetch_member(offender_id)
             except (ValueError, disnake.NotFound):
                 offender = interaction.guild.get_member_named(clean_tag)
 
@@ -115,12 +95,7 @@ async def setup_feedback_channel(bot, channels_config, roles_config, guild_id):
                 await interaction.followup.send(texts["setup"]["errors"]["opener"], ephemeral=True)
                 return
 
-        form_data = {}
-        for field in embed.fields:
-            if field.name not in ["Platform", "Платформа"]:
-                form_data[field.name] = field.value
-
-        ticket_db_id = get_ticket_db_id_by_channel(channel.id)
+        ticket_db_id = context["ticket_db_id"]
         if not ticket_db_id:
             log.warning(f"Could not find ticket_db_id for channel {channel.id} during close.")
 
@@ -128,10 +103,10 @@ async def setup_feedback_channel(bot, channels_config, roles_config, guild_id):
             channel=channel,
             opener=opener,
             ticket_data={
-                'title': embed.title,
+                'title': context["title"],
                 'type': ticket_type,
                 'platform': platform,
-                'content': form_data
+                'content': context["form_data"]
             },
             lang=lang,
             ticket_db_id=ticket_db_id
@@ -173,7 +148,7 @@ async def setup_feedback_channel(bot, channels_config, roles_config, guild_id):
                     except FileNotFoundError:
                         log.warning(f"Avatar file for webhook {webhook_name} not found: {webhook_avatar_path}")
 
-                webhook = await channel.create_webhook(name=webhook_name, avatar=avatar_bytes)
+                webhook = await webhook_registry.get_or_create(channel, webhook_name, avatar_bytes)
                 log.info(f"Created new webhook: {webhook_name}")
             except Exception as e:
                 log.error(f"Error creating webhook: {e}")
@@ -2,11 +2,11 @@ import disnake
 from disnake import Embed
 import logging
 from configs.feedback_config import config, TEXTS, TICKET_COLORS
+from webhook_manager import ticket_webhook_pool
 import re
-from database.tickets import log_ticket_open
-from database.core import (
-    get_user_internal_id, get_info_for_all_active_punishments, create_user,
-    get_info_for_active_discord_complaints, find_mindustry_complaints_by_nickname
+from database.aio import (
+    log_ticket_open, get_user_internal_id, get_info_for_active_discord_complaints,
+    find_mindustry_complaints_by_nickname
 )
 
 log = logging.getLogger(__name__)
@@ -24,7 +24,6 @@ async def create_ticket_channel(interaction, title, platform, form_data, lang="e
 
         cat_data = channels_config["categories"]["❓│Помощь / Support"]
         category_id = cat_data.get("id")
-        category_webhook_config = cat_data.get("webhook", {})
 
         log.debug(f"Category ID: {category_id}")
         category = interaction.guild.get_channel(category_id)
@@ -119,19 +118,6 @@ async def create_ticket_channel(interaction, title, platform, form_data, lang="e
                                                               overwrites=overwrites)
         log.info(f"Channel created: {channel.name} (ID: {channel.id})")
 
-        webhook_name = category_webhook_config.get("name", "Tickets Bot")
-        webhook_avatar_path = category_webhook_config.get("avatar")
-        avatar_bytes = None
-        if webhook_avatar_path:
-            try:
-                with open(webhook_avatar_path, "rb") as f:
-                    avatar_bytes = f.read()
-            except FileNotFoundError:
-                log.error(f"Error reading webhook avatar file: {webhook_avatar_path}")
-
-        webhook = await channel.create_webhook(name=webhook_name, avatar=avatar_bytes)
-        log.info(f"Webhook created: {webhook.name}")
-
         texts_en = TEXTS["en"]["ticket_utils"]
         title_text = texts_en["ticket_title"].format(title=title, user=interaction.author.display_name)
         color_name = TICKET_COLORS.get(title, "green")
@@ -143,10 +129,10 @@ async def create_ticket_channel(interaction, title, platform, form_data, lang="e
             log.info(f"Appeal ticket detected from user {interaction.author.id} on platform {platform}.")
 
             if platform.lower() == "discord":
-                user_internal_id = get_user_internal_id("discord", interaction.author.id)
+                user_internal_id = await get_user_internal_id("discord", interaction.author.id)
                 if user_internal_id:
                     log.info(f"Searching for active punishments from Discord complaints for user {user_internal_id}.")
-                    active_punishments = get_info_for_active_discord_complaints(user_internal_id)
+                    active_punishments = await get_info_for_active_discord_complaints(user_internal_id)
 
                     if active_punishments:
                         log.info(f"Found {len(active_punishments)} active punishments for user {user_internal_id}.")
@@ -172,7 +158,7 @@ async def create_ticket_channel(interaction, title, platform, form_data, lang="e
                 appellant_nick = form_data.get("username")
                 if appellant_nick:
                     log.info(f"Searching for Mindustry complaints against '{appellant_nick}'.")
-                    found_complaints = find_mindustry_complaints_by_nickname(appellant_nick)
+                    found_complaints = await find_mindustry_complaints_by_nickname(appellant_nick)
 
                     if found_complaints:
                         log.info(f"Found {len(found_complaints)} related Mindustry complaints.")
@@ -184,7 +170,9 @@ async def create_ticket_channel(interaction, title, platform, form_data, lang="e
                             log_message_id = complaint.get('log_message_id')
                             if log_message_id:
                                 link = f"https://discord.com/channels/{server_id}/{closed_tickets_channel_id}/{log_message_id}"
-                                complaint_links.append(f"**Complaint #{i + 1}**: [View Log]({link})")
+                                match_note = "" if complaint['exact'] else \
+                                    f" (`{complaint['offender_identifier']}`, {complaint['similarity']:.0%} match)"
+                                complaint_links.append(f"**Complaint #{i + 1}**{match_note}: [View Log]({link})")
 
                         if complaint_links:
                             embed.add_field(
@@ -226,20 +214,20 @@ async def create_ticket_channel(interaction, title, platform, form_data, lang="e
 
         from .views import CloseTicketView
         close_view = CloseTicketView(lang=lang)
-        await webhook.send(embed=embed, view=close_view)
-        log.info("Ticket message sent to channel via webhook")
+        await ticket_webhook_pool.send(channel, embed=embed, view=close_view)
+        log.info("Ticket message sent to channel via pooled webhook")
 
         formatted_ticket_type = f"{platform.capitalize()}-{title}"
-        log_ticket_open(
+        await log_ticket_open(
             opener_discord_id=interaction.author.id,
             channel_id=channel.id,
             ticket_type=formatted_ticket_type,
-            offender_identifier=offender_identifier
+            offender_identifier=offender_identifier,
+            lang=lang,
+            title=title_text,
+            form_data={field.name: field.value for field in embed.fields if field.name != "Platform"}
         )
 
-        await webhook.delete()
-        log.info("Webhook deleted")
-
         return channel
 
     except Exception as e:
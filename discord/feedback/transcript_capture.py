@@ -0,0 +1,241 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import disnake
+
+from database.aio import (
+    record_ticket_messages, delete_ticket_messages, mark_ticket_synced, forget_ticket_channels,
+    prune_ticket_channels, get_ticket_sync_point, get_ticket_message_versions, get_ticket_messages
+)
+
+log = logging.getLogger(__name__)
+
+TICKET_CATEGORY = "❓│Помощь / Support"
+BACKFILL_CHUNK_SIZE = 100
+
+
+def message_record(message):
+    content = ""
+    if message.content:
+        content = message.clean_content.replace('\n', ' ')
+    elif message.embeds:
+        embed = message.embeds[0]
+        content = f"[{embed.title or 'Embed'}]"
+        if embed.description:
+            desc = ' '.join(embed.description.splitlines())
+            content += f" {desc}"
+
+    attachments = [{"filename": att.filename, "url": att.url, "size": att.size} for att in message.attachments]
+    edited_at = int(message.edited_at.timestamp()) if message.edited_at else None
+    return (message.id, message.author.display_name, int(message.created_at.timestamp()), content,
+            json.dumps(attachments) if attachments else None, edited_at)
+
+
+def record_attachments(record):
+    return json.loads(record["attachments"]) if record["attachments"] else []
+
+
+def format_transcript_line(record):
+    created_at = datetime.fromtimestamp(record["created_at"], timezone.utc)
+    attachment_part = " ".join(f"[File: {att['filename']} | URL: {att['url']}]" for att in record_attachments(record))
+    return f"[{created_at.strftime('%Y-%m-%d %H:%M:%S')}] {record['author_name']}: {record['content']} {attachment_part}".strip()
+
+
+class TicketTranscriptRecorder:
+    def __init__(self):
+        self.bot = None
+        self.category_id = None
+        self.excluded_channel_ids = set()
+        # Snowflake of the moment the current gateway session started; everything after it arrives live.
+        self.live_since = None
+        self._connected_at = None
+        self._synced = set()
+        # channel_id -> newest message captured before a gap; edits and deletions of those messages made
+        # while the bot was offline are only picked up by a reconcile crawl before the transcript is used.
+        self._unreconciled = {}
+        self._locks = defaultdict(asyncio.Lock)
+        self._catch_up_task = None
+        self.backfilled = 0
+        self._listening = False
+
+    def listen(self, bot):
+        if self._listening:
+            return
+        self.bot = bot
+        bot.add_listener(self.on_connect, "on_connect")
+        bot.add_listener(self.on_ready, "on_ready")
+        bot.add_listener(self.on_message, "on_message")
+        bot.add_listener(self.on_message_edit, "on_message_edit")
+        bot.add_listener(self.on_raw_message_edit, "on_raw_message_edit")
+        bot.add_listener(self.on_raw_message_delete, "on_raw_message_delete")
+        bot.add_listener(self.on_raw_bulk_message_delete, "on_raw_bulk_message_delete")
+        bot.add_listener(self.on_guild_channel_delete, "on_guild_channel_delete")
+        self._listening = True
+
+    def is_ticket_channel(self, channel):
+        return (isinstance(channel, disnake.TextChannel) and channel.category_id == self.category_id
+                and channel.id not in self.excluded_channel_ids)
+
+    def _is_synced(self, channel):
+        if channel.id in self._synced:
+            return True
+        # A channel created during this session has no history from before it.
+        if self.live_since is not None and channel.id > self.live_since:
+            self._synced.add(channel.id)
+            return True
+        return False
+
+    async def _record(self, message):
+        try:
+            await record_ticket_messages(message.channel.id, [message_record(message)],
+                                         synced=self._is_synced(message.channel))
+        except Exception as e:
+            log.error(f"Failed to record message {message.id} of ticket channel {message.channel.id}: {e}")
+
+    async def on_connect(self):
+        self._connected_at = disnake.utils.time_snowflake(disnake.utils.utcnow())
+
+    async def on_ready(self):
+        # A resumed session replays missed events; only a new session leaves a gap to crawl.
+        self.live_since = self._connected_at or disnake.utils.time_snowflake(disnake.utils.utcnow())
+        self._synced.clear()
+        if self._catch_up_task and not self._catch_up_task.done():
+            self._catch_up_task.cancel()
+        self._catch_up_task = self.bot.loop.create_task(self._catch_up())
+
+    async def on_message(self, message):
+        if self.is_ticket_channel(message.channel):
+            await self._record(message)
+
+    async def on_message_edit(self, before, after):
+        if self.is_ticket_channel(after.channel):
+            await self._record(after)
+
+    async def on_raw_message_edit(self, payload):
+        # Cached messages are handled by on_message_edit.
+        if payload.cached_message is not None:
+            return
+        channel = self.bot.get_channel(payload.channel_id)
+        if not self.is_ticket_channel(channel):
+            return
+        try:
+            message = await channel.fetch_message(payload.message_id)
+        except disnake.NotFound:
+            return
+        except Exception as e:
+            log.warning(f"Could not fetch edited message {payload.message_id} in {channel.name}: {e}")
+            return
+        await self._record(message)
+
+    async def on_raw_message_delete(self, payload):
+        await self._forget_messages(payload.channel_id, [payload.message_id])
+
+    async def on_raw_bulk_message_delete(self, payload):
+        await self._forget_messages(payload.channel_id, payload.message_ids)
+
+    async def _forget_messages(self, channel_id, message_ids):
+        if not self.is_ticket_channel(self.bot.get_channel(channel_id)):
+            return
+        try:
+            await delete_ticket_messages(channel_id, message_ids)
+        except Exception as e:
+            log.error(f"Failed to drop deleted messages of ticket channel {channel_id}: {e}")
+
+    async def on_guild_channel_delete(self, channel):
+        if not self.is_ticket_channel(channel):
+            return
+        self._synced.discard(channel.id)
+        self._unreconciled.pop(channel.id, None)
+        self._locks.pop(channel.id, None)
+        try:
+            await forget_ticket_channels([channel.id])
+        except Exception as e:
+            log.error(f"Failed to drop the captured transcript of channel {channel.id}: {e}")
+
+    async def _catch_up(self):
+        category = self.bot.get_channel(self.category_id)
+        if not category:
+            log.error(f"Ticket category not found: {self.category_id}")
+            return
+
+        channels = [channel for channel in category.text_channels if self.is_ticket_channel(channel)]
+        backfilled = self.backfilled
+        try:
+            await prune_ticket_channels([channel.id for channel in channels])
+            for channel in channels:
+                try:
+                    await self.sync(channel)
+                except disnake.HTTPException as e:
+                    log.error(f"Could not catch up the transcript of {channel.name}: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error(f"Error while catching up ticket transcripts: {e}", exc_info=True)
+            return
+        log.info(f"Caught up {len(channels)} ticket transcripts, {self.backfilled - backfilled} messages backfilled")
+
+    async def sync(self, channel):
+        # Crawls only what was posted between the stored sync point and the start of this session.
+        async with self._locks[channel.id]:
+            if self._is_synced(channel):
+                return
+            live_since = self.live_since
+            after = await get_ticket_sync_point(channel.id)
+            if after is not None:
+                self._unreconciled[channel.id] = after
+            history = channel.history(limit=None, oldest_first=True,
+                                      after=disnake.Object(id=after) if after else None,
+                                      before=disnake.Object(id=live_since) if live_since else None)
+            chunk = []
+            async for message in history:
+                chunk.append(message_record(message))
+                if len(chunk) >= BACKFILL_CHUNK_SIZE:
+                    await record_ticket_messages(channel.id, chunk)
+                    self.backfilled += len(chunk)
+                    chunk = []
+            await record_ticket_messages(channel.id, chunk)
+            self.backfilled += len(chunk)
+
+            # Before the first session starts there is no boundary, so nothing can be marked complete.
+            if live_since is not None and live_since == self.live_since:
+                await mark_ticket_synced(channel.id, live_since)
+                self._synced.add(channel.id)
+
+    async def reconcile(self, channel):
+        # Fallback for tickets that stayed open across a gap: rereads the range captured before it and
+        # rewrites only the messages whose edit time changed or that no longer exist.
+        async with self._locks[channel.id]:
+            through = self._unreconciled.get(channel.id)
+            if through is None:
+                return
+            captured = await get_ticket_message_versions(channel.id, through)
+            changed = []
+            async for message in channel.history(limit=None, oldest_first=True,
+                                                 before=disnake.Object(id=through + 1)):
+                record = message_record(message)
+                if message.id not in captured or captured.pop(message.id) != record[5]:
+                    changed.append(record)
+            await record_ticket_messages(channel.id, changed)
+            if captured:
+                await delete_ticket_messages(channel.id, list(captured))
+            if self._unreconciled.get(channel.id) == through:
+                del self._unreconciled[channel.id]
+            log.info(f"Reconciled {channel.name}: {len(changed)} messages updated, {len(captured)} removed")
+
+    async def messages_for(self, channel):
+        await self.sync(channel)
+        await self.reconcile(channel)
+        return await get_ticket_messages(channel.id)
+
+
+transcript_recorder = TicketTranscriptRecorder()
+
+
+def setup_transcript_capture(bot, channels_config):
+    transcript_recorder.category_id = channels_config["categories"][TICKET_CATEGORY]["id"]
+    # Configured channels inside the category (e.g. feedback) are not tickets.
+    transcript_recorder.excluded_channel_ids = {data["id"] for data in channels_config["channels"].values()}
+    transcript_recorder.listen(bot)
@@ -5,6 +5,7 @@ import logging
 from configs.feedback_config import TYPE_OPTIONS_RU, TYPE_OPTIONS, PLATFORM_OPTIONS_RU, PLATFORM_OPTIONS, \
     MODAL_CONFIGS_RU, MODAL_CONFIGS, TEXTS, TICKET_COLORS
 from .ticket_utils import create_ticket_channel
+from webhook_manager import get_webhook
 import os
 import re
 
@@ -246,12 +247,4 @@ class FeedbackView(ui.View):
             log.error(f"Error updating message via webhook: {e}")
 
     async def find_webhook(self, channel, webhook_name):
-        try:
-            webhooks = await channel.webhooks()
-            for wh in webhooks:
-                if wh.name == webhook_name:
-                    return wh
-            return None
-        except Exception as e:
-            log.error(f"Error fetching webhooks: {e}")
-            return None
\ No newline at end of file
+        return await get_webhook(channel, webhook_name)
\ No newline at end of file
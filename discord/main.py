@@ -8,11 +8,20 @@ from utils.push import setup_slash_commands_push
 from test import test
 from utils.deleter.setup import setup_deleter
 from feedback.setup import setup_feedback_channel
-from webhook_manager import setup_webhooks
+from feedback.transcript_capture import setup_transcript_capture
+from feedback.media import media_archiver
+from webhook_manager import setup_webhooks, setup_ticket_webhook_pool
 from utils.server_stats import setup_server_stats
+from utils.db_backup import setup_database_maintenance
 from utils.edit_embed import setup_edit_embed_command
 from database.core import init_db
+from database.aio import write_queue, shutdown
 from discord.feedback.moderation.commands import setup_moderation_commands
+from discord.feedback.moderation.search import setup_search_command
+from discord.feedback.moderation.transcripts import setup_transcript_command
+from discord.feedback.moderation.db_stats import setup_db_stats_command
+from discord.feedback.moderation.modstats import setup_modstats_command
+from discord.feedback.moderation.expiry import setup_punishment_expiry
 
 config_path = os.path.join(os.path.dirname(__file__), "../configs/config.toml")
 channels_path = os.path.join(os.path.dirname(__file__), "../configs/channels_config.json")
@@ -25,7 +34,14 @@ with open(channels_path, "r", encoding="utf-8") as f:
 with open(roles_path, "r", encoding="utf-8") as f:
     roles_config = json.load(f)
 
-bot = commands.Bot(
+class Bot(commands.Bot):
+    async def close(self):
+        await super().close()
+        await write_queue.close()
+        await media_archiver.close()
+
+
+bot = Bot(
     command_prefix=config["bot"]["prefix"],
     activity=disnake.Game(config["bot"]["activity"]),
     intents=disnake.Intents.all(),
@@ -38,12 +54,18 @@ setup_slash_commands_push(bot,channels_config, roles_config)
 setup_deleter(bot, roles_config,channels_config)
 setup_edit_embed_command(bot, roles_config, channels_config)
 setup_moderation_commands(bot, channels_config, roles_config)
+setup_search_command(bot, channels_config, roles_config)
+setup_transcript_command(bot, roles_config)
+setup_db_stats_command(bot, roles_config)
+setup_modstats_command(bot, roles_config)
+setup_transcript_capture(bot, channels_config)
 
 test(bot, roles_config)
 
 @bot.event
 async def on_ready():
     await setup_webhooks(bot, channels_path)
+    await setup_ticket_webhook_pool(bot, channels_config)
     await setup_read_first(
         bot=bot,
         guild_id=config["server"]["id"],
@@ -61,5 +83,15 @@ async def on_ready():
         channels_config=channels_config,
         guild_id=config["server"]["id"])
 
+    await setup_punishment_expiry(
+        bot=bot,
+        roles_config=roles_config,
+        guild_id=config["server"]["id"])
+
+    await setup_database_maintenance(bot=bot)
+
 if __name__ == "__main__":
-    bot.run(config["bot"]["DISCORD_BOT_TOKEN"])
\ No newline at end of file
+    try:
+        bot.run(config["bot"]["DISCORD_BOT_TOKEN"])
+    finally:
+        shutdown()
\ No newline at end of file
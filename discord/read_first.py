@@ -1,20 +1,14 @@
-from database.core import create_user
+from database.aio import create_user
 import disnake
 from disnake import Embed, ui
 from disnake.ext import commands
 import asyncio
 from configs.read_first_config import messages
+from webhook_manager import get_webhook
 import logging
 
 log = logging.getLogger(__name__)
 
-async def get_webhook(channel, webhook_name):
-    webhooks = await channel.webhooks()
-    for webhook in webhooks:
-        if webhook.name == webhook_name:
-            return webhook
-    return None
-
 class LanguageSelect(ui.Select):
     def __init__(self, roles_config):
         self.roles_config = roles_config
@@ -45,7 +39,7 @@ class LanguageSelect(ui.Select):
         both_role = guild.get_role(self.roles_config["language_roles"]["bilingual"])
 
         try:
-            create_user(str(member.id))
+            await create_user(member.id)
             for role in [ru_role, en_role, both_role]:
                 if role and role in member.roles:
                     await member.remove_roles(role)
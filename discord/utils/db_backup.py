@@ -0,0 +1,49 @@
+from disnake.ext import tasks
+import logging
+
+from database.aio import run_backup, archive_old_actions
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_INTERVAL_HOURS = 6
+
+
+class DatabaseMaintenance:
+    def __init__(self, bot):
+        self.bot = bot
+        self.last_backup = None
+        self._task = None
+
+    async def start(self):
+        if self._task and self._task.is_running():
+            return
+
+        @tasks.loop(hours=MAINTENANCE_INTERVAL_HOURS)
+        async def maintain_database():
+            await self._backup()
+            await self._archive()
+
+        self._task = maintain_database
+        self._task.start()
+
+    async def _backup(self):
+        try:
+            self.last_backup = await run_backup()
+        except Exception as e:
+            logger.error(f"Database backup failed: {e}", exc_info=True)
+
+    async def _archive(self):
+        try:
+            archived = await archive_old_actions()
+            if archived:
+                logger.info(f"Moved {archived} old inactive actions to the archive.")
+        except Exception as e:
+            logger.error(f"Archiving old actions failed: {e}", exc_info=True)
+
+
+async def setup_database_maintenance(bot):
+    maintenance = getattr(bot, "database_maintenance", None)
+    if maintenance is None:
+        maintenance = DatabaseMaintenance(bot)
+        bot.database_maintenance = maintenance
+    await maintenance.start()
@@ -2,12 +2,7 @@ import disnake
 from disnake import TextInputStyle
 from disnake.ui import TextInput, Modal
 
-async def get_webhook(channel, webhook_name):
-    webhooks = await channel.webhooks()
-    for webhook in webhooks:
-        if webhook.name == webhook_name:
-            return webhook
-    return None
+from webhook_manager import get_webhook
 
 def setup_edit_embed_command(bot, roles_config, channels_config):
     editing_data = {}
@@ -2,13 +2,7 @@ import disnake
 from disnake import Option, OptionType, TextInputStyle, HTTPException
 from disnake.ui import TextInput, Modal
 
-
-async def get_webhook(channel, webhook_name):
-    webhooks = await channel.webhooks()
-    for webhook in webhooks:
-        if webhook.name == webhook_name:
-            return webhook
-    return None
+from webhook_manager import get_webhook
 
 
 def setup_slash_commands_push(bot, channels_config, roles_config):
@@ -1,16 +1,243 @@
+import asyncio
 import disnake
 import json
 import logging
-from typing import Dict
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
 
 log = logging.getLogger(__name__)
 
+TICKET_CATEGORY = "❓│Помощь / Support"
+TICKET_POOL_HOME_CHANNEL = "📌│closed-tickets"
+TICKET_POOL_SIZE = 3
+
+
+class WebhookRegistry:
+    def __init__(self):
+        # channel_id -> {webhook name -> webhook}; a cached channel holds its complete webhook list,
+        # so a missing name is answered without another REST call.
+        self._channels: Dict[int, Dict[str, disnake.Webhook]] = {}
+        self._locks = defaultdict(asyncio.Lock)
+        self.fetches = 0
+        self._listening = False
+
+    def listen(self, bot):
+        if not self._listening:
+            bot.add_listener(self.on_webhooks_update, "on_webhooks_update")
+            bot.add_listener(self.on_guild_channel_delete, "on_guild_channel_delete")
+            self._listening = True
+
+    async def _load(self, channel):
+        self.fetches += 1
+        webhooks = await channel.webhooks()
+        self._channels[channel.id] = {webhook.name: webhook for webhook in webhooks}
+        return self._channels[channel.id]
+
+    async def get(self, channel, webhook_name) -> Optional[disnake.Webhook]:
+        if not webhook_name or channel is None:
+            return None
+        cached = self._channels.get(channel.id)
+        if cached is None:
+            # Concurrent misses for the same channel share a single fetch.
+            async with self._locks[channel.id]:
+                cached = self._channels.get(channel.id)
+                if cached is None:
+                    try:
+                        cached = await self._load(channel)
+                    except disnake.Forbidden:
+                        log.error(f"No permissions to get webhooks in {channel.name}")
+                        return None
+                    except Exception as e:
+                        log.error(f"Error getting webhooks in {channel.name}: {e}")
+                        return None
+        return cached.get(webhook_name)
+
+    async def get_or_create(self, channel, webhook_name, avatar_bytes=None) -> Optional[disnake.Webhook]:
+        webhook = await self.get(channel, webhook_name)
+        if webhook:
+            return webhook
+        async with self._locks[channel.id]:
+            webhook = self._channels.get(channel.id, {}).get(webhook_name)
+            if webhook:
+                return webhook
+            webhook = await channel.create_webhook(name=webhook_name, avatar=avatar_bytes)
+            self.register(channel.id, webhook)
+            log.info(f"Created webhook: {webhook.name} in {channel.name}")
+            return webhook
+
+    def register(self, channel_id, webhook):
+        self._channels.setdefault(channel_id, {})[webhook.name] = webhook
+
+    def forget(self, channel_id):
+        self._channels.pop(channel_id, None)
+
+    async def on_guild_channel_delete(self, channel):
+        self.forget(channel.id)
+        self._locks.pop(channel.id, None)
+
+    async def on_webhooks_update(self, channel):
+        # Only channels somebody asked for are kept warm; others are loaded on first use.
+        if channel.id not in self._channels:
+            return
+        async with self._locks[channel.id]:
+            try:
+                await self._load(channel)
+            except Exception as e:
+                self.forget(channel.id)
+                log.warning(f"Dropped cached webhooks for {channel.name} after a failed refresh: {e}")
+
+
+webhook_registry = WebhookRegistry()
+
+
+class TicketWebhookPool:
+    def __init__(self, size=TICKET_POOL_SIZE):
+        self.size = size
+        self.name = None
+        self.avatar_bytes = None
+        self.home = None
+        self._webhooks: Dict[int, disnake.Webhook] = {}
+        self._free = []
+        self._available = asyncio.Condition()
+        self.repoints = 0
+        self._listening = False
+
+    def listen(self, bot):
+        if not self._listening:
+            bot.add_listener(self.on_guild_channel_delete, "on_guild_channel_delete")
+            self._listening = True
+
+    @property
+    def ready(self):
+        return self.home is not None
+
+    def _member_name(self, index):
+        # Each pool member needs its own name; messages are still sent under the category name.
+        return f"{self.name} #{index}"
+
+    async def start(self, bot, home_channel, name, avatar_bytes):
+        self.name = name
+        self.avatar_bytes = avatar_bytes
+        if not self._webhooks:
+            # Pool members survive restarts wherever they were last pointed, so they are found guild-wide.
+            member_names = {self._member_name(index) for index in range(1, self.size + 1)}
+            for webhook in await home_channel.guild.webhooks():
+                if webhook.name in member_names and webhook.user and webhook.user.id == bot.user.id:
+                    member_names.discard(webhook.name)
+                    self._add(webhook)
+            for member_name in sorted(member_names):
+                self._add(await home_channel.create_webhook(name=member_name, avatar=avatar_bytes))
+        self.home = home_channel
+        log.info(f"Ticket webhook pool ready with {len(self._webhooks)} webhooks")
+
+    def _add(self, webhook):
+        self._webhooks[webhook.id] = webhook
+        self._free.append(webhook)
+
+    async def _take(self, channel):
+        async with self._available:
+            while True:
+                # A webhook already pointed at the channel needs no re-pointing.
+                for webhook in self._free:
+                    if webhook.channel_id == channel.id:
+                        self._free.remove(webhook)
+                        return webhook
+                if self._free:
+                    return self._free.pop(0)
+                if len(self._webhooks) < self.size:
+                    missing = {self._member_name(index) for index in range(1, self.size + 1)}
+                    missing -= {webhook.name for webhook in self._webhooks.values()}
+                    webhook = await self.home.create_webhook(name=min(missing), avatar=self.avatar_bytes)
+                    self._webhooks[webhook.id] = webhook
+                    return webhook
+                await self._available.wait()
+
+    async def _give_back(self, webhook):
+        async with self._available:
+            if webhook.id in self._webhooks:
+                self._webhooks[webhook.id] = webhook
+                self._free.append(webhook)
+            self._available.notify()
+
+    @asynccontextmanager
+    async def lease(self, channel):
+        webhook = await self._take(channel)
+        try:
+            if webhook.channel_id != channel.id:
+                try:
+                    webhook = await webhook.edit(channel=channel)
+                except disnake.NotFound:
+                    # Deleted behind our back; the next lease recreates it.
+                    self._webhooks.pop(webhook.id, None)
+                    raise
+                self.repoints += 1
+            yield webhook
+        finally:
+            await self._give_back(webhook)
+
+    async def send(self, channel, **kwargs):
+        if self.ready:
+            try:
+                async with self.lease(channel) as webhook:
+                    return await webhook.send(**{"username": self.name, **kwargs, "wait": True})
+            except disnake.NotFound:
+                log.warning(f"Pooled webhook vanished while sending to {channel.name}, sending as the bot")
+        kwargs.pop("username", None)
+        kwargs.pop("wait", None)
+        return await channel.send(**kwargs)
+
+    def sender(self, channel):
+        return PooledWebhookSender(self, channel)
+
+    async def evacuate(self, channel):
+        # Deleting a channel deletes the webhooks in it, so pool members go back home first.
+        for webhook in list(self._webhooks.values()):
+            if webhook.channel_id != channel.id or not self.ready:
+                continue
+            async with self._available:
+                if webhook not in self._free:
+                    continue
+                self._free.remove(webhook)
+            try:
+                webhook = await webhook.edit(channel=self.home)
+            except Exception as e:
+                log.warning(f"Could not move pooled webhook {webhook.name} out of {channel.name}: {e}")
+            finally:
+                await self._give_back(webhook)
+
+    async def on_guild_channel_delete(self, channel):
+        lost = [webhook_id for webhook_id, webhook in self._webhooks.items() if webhook.channel_id == channel.id]
+        if not lost:
+            return
+        async with self._available:
+            for webhook_id in lost:
+                self._webhooks.pop(webhook_id, None)
+            self._free = [webhook for webhook in self._free if webhook.id in self._webhooks]
+        log.warning(f"Lost {len(lost)} pooled webhooks with channel {channel.name}; they will be recreated on demand")
+
+
+class PooledWebhookSender:
+    def __init__(self, pool, channel):
+        self.pool = pool
+        self.channel = channel
+
+    async def send(self, **kwargs):
+        return await self.pool.send(self.channel, **kwargs)
+
+
+ticket_webhook_pool = TicketWebhookPool()
+
+
+async def get_webhook(channel, webhook_name):
+    return await webhook_registry.get(channel, webhook_name)
+
 
 async def setup_webhooks(bot, config_path):
     with open(config_path, 'r', encoding='utf-8') as f:
         channels_config = json.load(f)
 
-    webhooks: Dict[str, disnake.Webhook] = {}
+    webhook_registry.listen(bot)
 
     for channel_name, channel_data in channels_config["channels"].items():
         if "webhook" not in channel_data:
@@ -26,13 +253,6 @@ async def setup_webhooks(bot, config_path):
                 log.warning(f"Channel not found: {channel_name} ({channel_data['id']})")
                 continue
 
-            channel_webhooks = await channel.webhooks()
-
-            webhook = next(
-                (wh for wh in channel_webhooks if wh.name == webhook_name),
-                None
-            )
-
             avatar_bytes = None
             if avatar_path:
                 try:
@@ -43,13 +263,11 @@ async def setup_webhooks(bot, config_path):
                 except Exception as e:
                     log.warning(f"Failed to load avatar for {channel_name}: {e}")
 
+            # A reconnect runs this again; the registry answers it from cache.
+            webhook = await webhook_registry.get(channel, webhook_name)
             if not webhook:
                 log.info(f"Creating new webhook for {channel_name}")
-                webhook = await channel.create_webhook(
-                    name=webhook_name,
-                    avatar=avatar_bytes
-                )
-                log.info(f"Created webhook: {webhook.name} ({webhook.url})")
+                webhook = await webhook_registry.get_or_create(channel, webhook_name, avatar_bytes)
             else:
                 log.debug(f"Using existing webhook for {channel_name}: {webhook.name}")
                 if avatar_bytes and not webhook.avatar:
@@ -58,9 +276,30 @@ async def setup_webhooks(bot, config_path):
                         log.info(f"Updated avatar for {channel_name}")
                     except Exception as e:
                         log.warning(f"Failed to update avatar for {channel_name}: {e}")
-
-            webhooks[channel_name] = webhook
         except disnake.Forbidden:
             log.error(f"Missing permissions to manage webhooks in #{channel_name}")
         except Exception as e:
-            log.error(f"Error processing webhook for {channel_name}: {str(e)}")
\ No newline at end of file
+            log.error(f"Error processing webhook for {channel_name}: {str(e)}")
+
+
+async def setup_ticket_webhook_pool(bot, channels_config):
+    webhook_config = channels_config["categories"][TICKET_CATEGORY].get("webhook", {})
+    home_channel = bot.get_channel(channels_config["channels"][TICKET_POOL_HOME_CHANNEL]["id"])
+    if not home_channel:
+        log.error(f"Home channel for the ticket webhook pool not found: {TICKET_POOL_HOME_CHANNEL}")
+        return
+
+    avatar_bytes = None
+    avatar_path = webhook_config.get("avatar")
+    if avatar_path:
+        try:
+            with open(avatar_path, "rb") as avatar_file:
+                avatar_bytes = avatar_file.read()
+        except FileNotFoundError:
+            log.warning(f"Avatar file not found for the ticket webhook pool: {avatar_path}")
+
+    ticket_webhook_pool.listen(bot)
+    try:
+        await ticket_webhook_pool.start(bot, home_channel, webhook_config.get("name", "Tickets Bot"), avatar_bytes)
+    except disnake.Forbidden:
+        log.error("Missing permissions to manage webhooks for the ticket webhook pool")
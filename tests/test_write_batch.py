@@ -0,0 +1,50 @@
+import pytest
+
+from database import core, tickets
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(core, 'DB_PATH', str(tmp_path / 'database.db'))
+    core.init_db()
+    yield
+    core.close_db()
+
+
+def _ticket_row(channel_id):
+    with core.db_connection() as conn:
+        return conn.execute('SELECT status, log_message_id, closed_by FROM tickets WHERE channel_id = ?',
+                            (channel_id,)).fetchone()
+
+
+def _fail(*args, **kwargs):
+    raise RuntimeError('transcript store failed')
+
+
+def test_swallowed_error_after_nested_commit_is_rolled_back(db, monkeypatch):
+    tickets.log_ticket_open(1, 100, 'Discord-Appeal')
+    monkeypatch.setattr(tickets, 'store_transcript', _fail)
+
+    results = core.run_write_batch([
+        (tickets.log_ticket_close, ('https://discord.com/channels/1/2/3',),
+         {'channel_id': 100, 'transcript': 'text', 'closed_by_discord_id': 2}),
+    ])
+
+    assert results == [(True, None)]
+    row = _ticket_row(100)
+    assert (row['status'], row['log_message_id'], row['closed_by']) == ('OPEN', None, None)
+    # create_user committed on its own before the failure, as it does outside a batch.
+    assert core.get_user_internal_id('discord', 2) is not None
+
+
+def test_failing_job_does_not_affect_its_neighbours(db):
+    results = core.run_write_batch([
+        (tickets.log_ticket_open, (1, 100, 'Discord-Appeal'), {}),
+        (lambda: 1 / 0, (), {}),
+        (tickets.log_ticket_open, (2, 101, 'Discord-Appeal'), {}),
+    ])
+
+    assert results[0][0] and results[2][0]
+    assert isinstance(results[1][1], ZeroDivisionError)
+    assert _ticket_row(100)['status'] == 'OPEN'
+    assert _ticket_row(101)['status'] == 'OPEN'